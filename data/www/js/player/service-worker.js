@@ -0,0 +1,183 @@
+const MEDIA_CACHE = 'player-media';
+const PAGE_CACHE = 'player-pages';
+const MEDIA_PATHS = ['/serve/stored/', '/serve/content/'];
+const MUTABLE_MEDIA_PATHS = ['/serve/content/external_storage/'];
+const PLAYER_PAGE_PATTERN = /^\/(use\/[^\/]+)?$/;
+const MEDIA_ACCEPT = 'image/webp,image/*,video/*,*/*;q=0.8';
+
+let precacheRunning = false;
+let precacheNext = null;
+
+const startsWithAny = function(pathname, paths) {
+    return paths.some(function(path) {
+        return pathname.indexOf(path) === 0;
+    });
+};
+
+const getCacheSize = function(response) {
+    return parseInt(response.headers.get('Content-Length') || '0', 10);
+};
+
+const rangeResponse = function(request, response) {
+    const range = request.headers.get('Range');
+
+    if (!range) {
+        return response;
+    }
+
+    // Cached files are complete, video elements still ask for byte ranges
+    return response.blob().then(function(blob) {
+        const bounds = /^bytes=(\d*)-(\d*)$/.exec(range.trim());
+
+        if (!bounds) {
+            return new Response(blob, {status: 200, headers: response.headers});
+        }
+
+        const start = bounds[1] === '' ? Math.max(0, blob.size - parseInt(bounds[2], 10)) : parseInt(bounds[1], 10);
+        const end = bounds[1] !== '' && bounds[2] !== '' ? Math.min(parseInt(bounds[2], 10), blob.size - 1) : blob.size - 1;
+
+        if (start >= blob.size || start > end) {
+            return new Response(null, {status: 416, headers: {'Content-Range': 'bytes */' + blob.size}});
+        }
+
+        const headers = new Headers(response.headers);
+        headers.set('Content-Range', 'bytes ' + start + '-' + end + '/' + blob.size);
+        headers.set('Content-Length', String(end - start + 1));
+
+        return new Response(blob.slice(start, end + 1), {status: 206, statusText: 'Partial Content', headers: headers});
+    });
+};
+
+const cacheFirst = function(request) {
+    return caches.open(MEDIA_CACHE).then(function(cache) {
+        return cache.match(request.url, {ignoreVary: true}).then(function(cached) {
+            return cached ? rangeResponse(request, cached) : fetch(request);
+        });
+    });
+};
+
+const networkFirst = function(request, cacheName, store) {
+    return fetch(request).then(function(response) {
+        if (store && response.ok && response.status === 200) {
+            const copy = response.clone();
+            caches.open(cacheName).then(function(cache) {
+                cache.put(request.url, copy);
+            });
+        }
+
+        return response;
+    }).catch(function(err) {
+        return caches.open(cacheName).then(function(cache) {
+            return cache.match(request.url, {ignoreVary: true});
+        }).then(function(cached) {
+            if (!cached) {
+                throw err;
+            }
+
+            return rangeResponse(request, cached);
+        });
+    });
+};
+
+const precache = function(urls, budget) {
+    return caches.open(MEDIA_CACHE).then(function(cache) {
+        return cache.keys().then(function(requests) {
+            const wanted = new Set(urls);
+            let used = 0;
+
+            // Media no longer in the playlist is dropped first, it frees room for the new one
+            return Promise.all(requests.map(function(request) {
+                if (!wanted.has(request.url)) {
+                    return cache.delete(request);
+                }
+
+                return cache.match(request).then(function(response) {
+                    used += response ? getCacheSize(response) : 0;
+                    wanted.delete(request.url);
+                });
+            })).then(function() {
+                // One file after the other, a screen never floods the studio
+                return Array.from(wanted).reduce(function(chain, url) {
+                    return chain.then(function() {
+                        const controller = new AbortController();
+
+                        return fetch(url, {headers: {'Accept': MEDIA_ACCEPT}, signal: controller.signal}).then(function(response) {
+                            const size = getCacheSize(response);
+
+                            // Over budget files stop downloading as soon as their size is known
+                            if (!response.ok || response.status !== 200 || !size || used + size > budget) {
+                                controller.abort();
+                                return;
+                            }
+
+                            used += size;
+                            return cache.put(url, response);
+                        }).catch(function(err) {
+                            console.warn('Precache failed for ' + url, err);
+                        });
+                    });
+                }, Promise.resolve());
+            });
+        });
+    });
+};
+
+const runPrecache = function(urls, budget) {
+    // Only the latest playlist matters, updates arriving meanwhile collapse into one run
+    if (precacheRunning) {
+        precacheNext = [urls, budget];
+        return Promise.resolve();
+    }
+
+    precacheRunning = true;
+
+    return precache(urls, budget).finally(function() {
+        precacheRunning = false;
+
+        if (precacheNext) {
+            const next = precacheNext;
+            precacheNext = null;
+            return runPrecache(next[0], next[1]);
+        }
+    });
+};
+
+self.addEventListener('install', function(event) {
+    self.skipWaiting();
+});
+
+self.addEventListener('activate', function(event) {
+    event.waitUntil(self.clients.claim());
+});
+
+self.addEventListener('message', function(event) {
+    const data = event.data || {};
+
+    if (data.type === 'precache') {
+        const urls = data.urls.map(function(url) {
+            return new URL(url, self.location.origin).href;
+        });
+        event.waitUntil(runPrecache(urls, data.budget));
+    } else if (data.type === 'clear') {
+        precacheNext = null;
+        event.waitUntil(Promise.all([caches.delete(MEDIA_CACHE), caches.delete(PAGE_CACHE)]));
+    }
+});
+
+self.addEventListener('fetch', function(event) {
+    const request = event.request;
+    const url = new URL(request.url);
+
+    if (request.method !== 'GET' || url.origin !== self.location.origin) {
+        return;
+    }
+
+    if (request.mode === 'navigate' && PLAYER_PAGE_PATTERN.test(url.pathname)) {
+        // The last player page seen is kept to restart a screen while the studio is down
+        event.respondWith(networkFirst(request, PAGE_CACHE, true));
+    } else if (startsWithAny(url.pathname, MUTABLE_MEDIA_PATHS)) {
+        event.respondWith(networkFirst(request, MEDIA_CACHE, false));
+    } else if (startsWithAny(url.pathname, MEDIA_PATHS)) {
+        event.respondWith(cacheFirst(request));
+    }
+});
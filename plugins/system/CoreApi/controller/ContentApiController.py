@@ -2,16 +2,18 @@ import os
 import time
 import logging
 
-from flask import request, abort, jsonify
+from flask import request, abort, jsonify, make_response
 from flask_restx import Resource, Namespace, fields, reqparse
 from werkzeug.datastructures import FileStorage
 from werkzeug.utils import secure_filename
 from src.model.entity.Content import Content
+from src.model.entity.ResumableUpload import ResumableUpload
 from src.manager.FolderManager import FolderManager
 from src.model.enum.ContentType import ContentType, ContentInputType
 from src.model.enum.FolderEntity import FolderEntity, FOLDER_ROOT_PATH
 from src.interface.ObController import ObController
 from src.util.utils import str_to_enum
+from src.exceptions.UploadNotFoundException import UploadNotFoundException
 from plugins.system.CoreApi.exception.ContentPathMissingException import ContentPathMissingException
 from plugins.system.CoreApi.exception.ContentNotFoundException import ContentNotFoundException
 from plugins.system.CoreApi.exception.FolderNotFoundException import FolderNotFoundException
@@ -28,7 +30,9 @@ content_output_model = content_ns.model('ContentOutput', {
     'name': fields.String(description='Name of the content'),
     'type': fields.String(description='Type of the content'),
     'location': fields.String(description='Location of the content'),
-    'folder_id': fields.Integer(description='Folder ID where the content is stored')
+    'folder_id': fields.Integer(description='Folder ID where the content is stored'),
+    'duration': fields.Float(description='Duration of the content in seconds (videos only)'),
+    'duration_status': fields.String(description='Duration probing state of a video (pending, ready or failed)')
 })
 
 # Model for folder operations
@@ -66,6 +70,29 @@ bulk_upload_parser.add_argument('path', type=str, required=False, help='Path con
 bulk_upload_parser.add_argument('folder_id', type=str, required=False, help='Path context (with folder id)')
 bulk_upload_parser.add_argument('object', type=FileStorage, location='files', action='append', required=True, help='Files to be uploaded')
 
+# Output model for resumable uploads
+upload_output_model = content_ns.model('UploadOutput', {
+    'id': fields.String(readOnly=True, description='Unique identifier of the upload'),
+    'filename': fields.String(description='Name of the uploaded file'),
+    'size': fields.Integer(description='Total size of the file in bytes'),
+    'offset': fields.Integer(description='Number of bytes received so far'),
+    'checksum': fields.String(description='Expected sha256 hex digest of the whole file'),
+    'folder_id': fields.Integer(description='Folder ID where the content will be stored')
+})
+
+# Parser for resumable upload creation
+upload_create_parser = content_ns.parser()
+upload_create_parser.add_argument('filename', type=str, required=True, help='Name of the file to upload')
+upload_create_parser.add_argument('size', type=int, required=True, help='Total size of the file in bytes')
+upload_create_parser.add_argument('checksum', type=str, required=False, help='sha256 hex digest of the whole file, verified on finalize')
+upload_create_parser.add_argument('path', type=str, required=False, help='Path context (with path starting with /)')
+upload_create_parser.add_argument('folder_id', type=str, required=False, help='Path context (with folder id)')
+
+# Parser for resumable upload chunks
+upload_chunk_parser = content_ns.parser()
+upload_chunk_parser.add_argument('Upload-Offset', type=int, location='headers', required=True, help='Offset of the chunk in the file')
+upload_chunk_parser.add_argument('Upload-Checksum', type=str, location='headers', required=False, help="Chunk checksum as 'sha256 <base64 digest>'")
+
 # Parser for content edit
 content_edit_parser = content_ns.parser()
 content_edit_parser.add_argument('name', type=str, required=True, help='Name of the content')
@@ -81,6 +108,15 @@ folder_parser.add_argument('name', type=str, required=True, help='Name of the fo
 folder_parser.add_argument('path', type=str, required=False, help='Path context (with path starting with /)')
 folder_parser.add_argument('folder_id', type=str, required=False, help='Path context (with folder id)')
 
+
+def get_upload_headers(upload: ResumableUpload) -> dict:
+    return {
+        'Upload-Offset': str(upload.offset),
+        'Upload-Length': str(upload.size),
+        'Cache-Control': 'no-store'
+    }
+
+
 class ContentApiController(ObController):
 
     def register(self):
@@ -89,6 +125,9 @@ class ContentApiController(ObController):
         content_ns.add_resource(self.create_resource(ContentResource), '/<int:content_id>')
         content_ns.add_resource(self.create_resource(ContentLocationResource), '/location/<int:content_id>')
         content_ns.add_resource(self.create_resource(ContentBulkUploadResource), '/upload-bulk')
+        content_ns.add_resource(self.create_resource(UploadListResource), '/uploads')
+        content_ns.add_resource(self.create_resource(UploadResource), '/uploads/<string:upload_id>')
+        content_ns.add_resource(self.create_resource(UploadFinalizeResource), '/uploads/<string:upload_id>/finalize')
         content_ns.add_resource(self.create_resource(FolderBulkMoveResource), '/folder/move-bulk')
         content_ns.add_resource(self.create_resource(FolderResource), '/folder')
 
@@ -148,11 +187,10 @@ class ContentListResource(Resource):
         except ContentPathMissingException:
             pass
 
-        contents = self._model_store.content().get_contents(
+        result = self._model_store.content().get_raw_contents(
             folder_id=folder_id,
             slide_id=data.get('slide_id', None),
         )
-        result = [content.to_dict() for content in contents]
 
         return result
 
@@ -270,22 +308,105 @@ class ContentBulkUploadResource(Resource):
         data = bulk_upload_parser.parse_args()
         working_folder_path, working_folder = self._controller._get_folder_context(data)
 
-        for file in data.get('object'):
-            content_type = ContentType.guess_content_type_file(file.filename)
-            name = file.filename.rsplit('.', 1)[0]
-
-            if content_type:
-                self._model_store.content().add_form_raw(
-                    name=name,
-                    type=content_type,
-                    request_files=file,
-                    upload_dir=self._controller._app.config['UPLOAD_FOLDER'],
-                    folder_id=working_folder.id if working_folder else None
-                )
+        self._model_store.content().add_files_raw(
+            request_files=data.get('object'),
+            upload_dir=self._controller._app.config['UPLOAD_FOLDER'],
+            folder_id=working_folder.id if working_folder else None
+        )
 
         return {'status': 'ok'}, 201
 
 
+class UploadListResource(Resource):
+
+    @content_ns.expect(upload_create_parser)
+    @content_ns.marshal_with(upload_output_model, code=201)
+    def post(self):
+        """Start a resumable upload"""
+        self.require_api_key()
+        data = upload_create_parser.parse_args()
+        working_folder_path, working_folder = self._controller._get_folder_context(data)
+
+        upload = self._model_store.upload().create(
+            upload_dir=self._controller._app.config['UPLOAD_FOLDER'],
+            filename=data.get('filename'),
+            size=data.get('size'),
+            checksum=data.get('checksum'),
+            folder_id=working_folder.id if working_folder else None
+        )
+
+        return upload.to_dict(), 201, get_upload_headers(upload)
+
+
+class UploadResource(Resource):
+
+    @content_ns.marshal_with(upload_output_model)
+    def get(self, upload_id: str):
+        """Get resumable upload progress"""
+        self.require_api_key()
+        upload = self._model_store.upload().get(self._controller._app.config['UPLOAD_FOLDER'], upload_id)
+
+        if not upload:
+            raise UploadNotFoundException()
+
+        return upload.to_dict(), 200, get_upload_headers(upload)
+
+    def head(self, upload_id: str):
+        """Get resumable upload offset"""
+        self.require_api_key()
+        upload = self._model_store.upload().get(self._controller._app.config['UPLOAD_FOLDER'], upload_id)
+
+        if not upload:
+            raise UploadNotFoundException()
+
+        return make_response('', 200, get_upload_headers(upload))
+
+    @content_ns.expect(upload_chunk_parser)
+    def patch(self, upload_id: str):
+        """Append a chunk to a resumable upload, the raw request body is the chunk"""
+        self.require_api_key()
+        data = upload_chunk_parser.parse_args()
+
+        # Read straight from the request stream, the chunk is never buffered whole
+        upload = self._model_store.upload().append(
+            upload_dir=self._controller._app.config['UPLOAD_FOLDER'],
+            upload_id=upload_id,
+            offset=data.get('Upload-Offset'),
+            stream=request.stream,
+            chunk_checksum=data.get('Upload-Checksum')
+        )
+
+        return make_response('', 204, get_upload_headers(upload))
+
+    def delete(self, upload_id: str):
+        """Cancel a resumable upload"""
+        self.require_api_key()
+        self._model_store.upload().delete(self._controller._app.config['UPLOAD_FOLDER'], upload_id)
+
+        return make_response('', 204)
+
+
+class UploadFinalizeResource(Resource):
+
+    @content_ns.marshal_with(content_output_model, code=201)
+    def post(self, upload_id: str):
+        """Verify a completed upload and add it as content"""
+        self.require_api_key()
+        upload, location = self._model_store.upload().finalize(
+            self._controller._app.config['UPLOAD_FOLDER'],
+            upload_id,
+            store=self._model_store.content().store_file
+        )
+        content = self._model_store.content().add_stored_file(upload.filename, location, folder_id=upload.folder_id)
+
+        if not content:
+            abort(400, description="Failed to add content")
+
+        self._controller._post_update()
+
+        return content.to_dict(), 201
+
+
 class FolderBulkMoveResource(Resource):
 
     @content_ns.expect(bulk_move_parser)
@@ -301,13 +422,12 @@ class FolderBulkMoveResource(Resource):
 
         entity_ids = data.get('entity_ids')
 
-        for entity_id in entity_ids:
-            self._model_store.folder().move_to_folder(
-                entity_id=entity_id,
-                folder_id=working_folder.id if working_folder else None,
-                entity_is_folder=False,
-                entity=FolderEntity.CONTENT
-            )
+        self._model_store.folder().move_many_to_folder(
+            entity_ids=entity_ids,
+            folder_id=working_folder.id if working_folder else None,
+            entity_is_folder=False,
+            entity=FolderEntity.CONTENT
+        )
 
         return {'status': 'ok'}
 
@@ -14,7 +14,9 @@ playlist_output_model = playlist_ns.model('PlaylistOutput', {
     'id': fields.Integer(readOnly=True, description='The unique identifier of a playlist'),
     'name': fields.String(required=True, description='The playlist name'),
     'enabled': fields.Boolean(description='Is the playlist enabled?'),
-    'time_sync': fields.Boolean(description='Is time synchronization enabled?')
+    'time_sync': fields.Boolean(description='Is time synchronization enabled?'),
+    'duration': fields.Float(readOnly=True, description='Total duration of the enabled unscheduled slides, in seconds'),
+    'slides_count': fields.Integer(readOnly=True, description='Number of slides in the playlist')
 })
 
 # Parser for playlist attributes (add)
@@ -52,8 +54,7 @@ class PlaylistListResource(Resource):
     def get(self):
         """List all playlists"""
         self.require_api_key()
-        playlists = self._model_store.playlist().get_all(sort="created_at", ascending=True)
-        result = [playlist.to_dict() for playlist in playlists]
+        result = self._model_store.playlist().get_raw_all(sort="created_at", ascending=True)
         return result
 
     @playlist_ns.expect(playlist_parser)
@@ -119,7 +120,7 @@ class PlaylistResource(Resource):
         if not playlist:
             abort(404, description="Playlist not found")
 
-        if self._model_store.slide().count_slides_for_playlist(playlist_id) > 0:
+        if playlist.slides_count > 0:
             abort(400, description="Playlist cannot be deleted because it has slides")
 
         if self._model_store.node_player_group().count_node_player_groups_for_playlist(playlist_id) > 0:
@@ -139,9 +140,7 @@ class PlaylistSlidesResource(Resource):
         if not playlist:
             abort(404, description="Playlist not found")
 
-        slides = self._model_store.slide().get_slides(is_notification=False, playlist_id=playlist_id)
-
-        result = [slide.to_dict() for slide in slides]
+        result = self._model_store.slide().get_raw_slides(is_notification=False, playlist_id=playlist_id)
         return jsonify(result)
 
 
@@ -155,7 +154,5 @@ class PlaylistNotificationsResource(Resource):
         if not playlist:
             abort(404, description="Playlist not found")
 
-        slides = self._model_store.slide().get_slides(is_notification=True, playlist_id=playlist_id)
-
-        result = [slide.to_dict() for slide in slides]
+        result = self._model_store.slide().get_raw_slides(is_notification=True, playlist_id=playlist_id)
         return jsonify(result)
@@ -33,6 +33,9 @@ class Application:
 
     def signal_handler(self, signal, frame) -> None:
         logging.info("[{}] Shutting down...".format(self.get_name()))
+        self._model_store.video_probe().shutdown()
+        self._model_store.thumbnail().shutdown()
+        self._model_store.transcode().shutdown()
         self._model_store.database().close()
         self._stop_event.set()
         sys.exit(0)
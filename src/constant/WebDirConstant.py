@@ -3,6 +3,7 @@ class WebDirConstant:
     FOLDER_TEMPLATES = "views"
     FOLDER_STATIC = "data"
     FOLDER_STATIC_WEB_UPLOADS = "uploads"
+    FOLDER_STATIC_WEB_THUMBNAILS = ".thumbnails"
     FOLDER_STATIC_WEB_ASSETS = "www"
     FOLDER_PLUGIN_HOOK = "hook"
     FOLDER_PLUGIN_STATIC_SRC = "static"
@@ -2,7 +2,8 @@ import json
 import os
 import time
 
-from flask import Flask, render_template, redirect, request, url_for, send_from_directory, jsonify, abort
+from pathlib import Path
+from flask import Flask, render_template, redirect, request, url_for, send_from_directory, send_file, jsonify, abort
 from werkzeug.utils import secure_filename
 from src.service.ModelStore import ModelStore
 from src.model.entity.Content import Content
@@ -15,6 +16,8 @@ from src.util.UtilFile import randomize_filename
 
 class ContentController(ObController):
 
+    THUMBNAIL_WAIT_TIMEOUT = 10
+
     def register(self):
         self._app.add_url_rule('/slideshow/content', 'slideshow_content_list', self._auth(self.slideshow_content_list), methods=['GET'])
         self._app.add_url_rule('/slideshow/content/add', 'slideshow_content_add', self._auth(self.slideshow_content_add), methods=['GET', 'POST'])
@@ -29,6 +32,7 @@ class ContentController(ObController):
         self._app.add_url_rule('/slideshow/content/delete-folder', 'slideshow_content_folder_delete', self._auth(self.slideshow_content_folder_delete), methods=['GET'])
         self._app.add_url_rule('/slideshow/content/show/<content_id>', 'slideshow_content_show', self._auth(self.slideshow_content_show), methods=['GET'])
         self._app.add_url_rule('/slideshow/content/upload-bulk', 'slideshow_content_upload_bulk', self._auth(self.slideshow_content_upload_bulk), methods=['POST'])
+        self._app.add_url_rule('/serve/thumbnail/<content_id>', 'serve_thumbnail', self._auth(self.serve_thumbnail), methods=['GET'])
         self._app.add_url_rule('/slideshow/content/delete-bulk-explr', 'slideshow_content_delete_bulk_explr', self._auth(self.slideshow_content_delete_bulk_explr), methods=['GET'])
 
     def get_folder_context(self):
@@ -87,20 +91,11 @@ class ContentController(ObController):
     def slideshow_content_upload_bulk(self):
         working_folder_path, working_folder = self.get_folder_context()
 
-        for key in request.files:
-            files = request.files.getlist(key)
-            for file in files:
-                type = ContentType.guess_content_type_file(file.filename)
-                name = file.filename.rsplit('.', 1)[0]
-
-                if type:
-                    self._model_store.content().add_form_raw(
-                        name=name,
-                        type=type,
-                        request_files=file,
-                        upload_dir=self._app.config['UPLOAD_FOLDER'],
-                        folder_id=working_folder.id if working_folder else None
-                    )
+        self._model_store.content().add_files_raw(
+            request_files=[file for key in request.files for file in request.files.getlist(key)],
+            upload_dir=self._app.config['UPLOAD_FOLDER'],
+            folder_id=working_folder.id if working_folder else None
+        )
 
         return redirect(url_for('slideshow_content_list', path=working_folder_path))
 
@@ -205,17 +200,15 @@ class ContentController(ObController):
         entity_ids = request.form['entity_ids'].split(',')
         folder_ids = request.form['folder_ids'].split(',')
 
-        for id in entity_ids:
-            self._model_store.folder().move_to_folder(
-                entity_id=id,
+        with self._model_store.database().transaction():
+            self._model_store.folder().move_many_to_folder(
+                entity_ids=entity_ids,
                 folder_id=request.form['new_folder_id'],
                 entity_is_folder=False,
                 entity=FolderEntity.CONTENT
             )
-
-        for id in folder_ids:
-            self._model_store.folder().move_to_folder(
-                entity_id=id,
+            self._model_store.folder().move_many_to_folder(
+                entity_ids=folder_ids,
                 folder_id=request.form['new_folder_id'],
                 entity_is_folder=True,
                 entity=FolderEntity.CONTENT
@@ -243,6 +236,27 @@ class ContentController(ObController):
 
         return redirect(self._model_store.content().resolve_content_location(content))
 
+    def serve_thumbnail(self, content_id: int = 0):
+        content = self._model_store.content().get(content_id)
+
+        if not content or not content.has_file():
+            return abort(404)
+
+        thumbnail_path = self._model_store.thumbnail().get(
+            str(Path(self.get_application_dir(), content.location)),
+            is_video=content.type == ContentType.VIDEO,
+            timeout=self.THUMBNAIL_WAIT_TIMEOUT
+        )
+
+        if not thumbnail_path:
+            return abort(404)
+
+        response = send_file(thumbnail_path, mimetype='image/webp', conditional=True, etag=os.path.basename(thumbnail_path))
+        # Uploaded files never change in place, the uuid in the url changes with the content
+        response.headers['Cache-Control'] = 'private, max-age=31536000, immutable'
+
+        return response
+
     def slideshow_content_delete_bulk_explr(self):
         working_folder_path, working_folder = self.get_folder_context()
         entity_ids = request.args.get('entity_ids', '').split(',')
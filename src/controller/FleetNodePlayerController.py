@@ -180,17 +180,15 @@ class FleetNodePlayerController(ObController):
         entity_ids = request.form['entity_ids'].split(',')
         folder_ids = request.form['folder_ids'].split(',')
 
-        for id in entity_ids:
-            self._model_store.folder().move_to_folder(
-                entity_id=id,
+        with self._model_store.database().transaction():
+            self._model_store.folder().move_many_to_folder(
+                entity_ids=entity_ids,
                 folder_id=request.form['new_folder_id'],
                 entity_is_folder=False,
                 entity=FolderEntity.NODE_PLAYER
             )
-
-        for id in folder_ids:
-            self._model_store.folder().move_to_folder(
-                entity_id=id,
+            self._model_store.folder().move_many_to_folder(
+                entity_ids=folder_ids,
                 folder_id=request.form['new_folder_id'],
                 entity_is_folder=True,
                 entity=FolderEntity.NODE_PLAYER
@@ -5,6 +5,7 @@ from src.service.ModelStore import ModelStore
 from src.model.entity.NodePlayerGroup import NodePlayerGroup
 from src.model.enum.FolderEntity import FolderEntity
 from src.model.enum.OperatingSystem import OperatingSystem
+from src.model.enum.TranscodingProfile import TranscodingProfile
 from src.interface.ObController import ObController
 
 
@@ -59,6 +60,8 @@ class FleetNodePlayerGroupController(ObController):
             folders_tree=self._model_store.folder().get_folder_tree(FolderEntity.NODE_PLAYER),
             enum_operating_system=OperatingSystem,
             enum_folder_entity=FolderEntity,
+            enum_transcoding_profile=TranscodingProfile,
+            transcoding_profiles=self._model_store.transcode().get_profiles(),
         )
 
     def fleet_node_player_group_add(self):
@@ -66,6 +69,7 @@ class FleetNodePlayerGroupController(ObController):
         node_player_group = NodePlayerGroup(
             name=request.form['name'],
             playlist_id=playlist_id,
+            transcoding_profile=request.form.get('transcoding_profile', None),
         )
 
         try:
@@ -80,7 +84,8 @@ class FleetNodePlayerGroupController(ObController):
         self._model_store.node_player_group().update_form(
             id=request.form['id'],
             name=request.form['name'],
-            playlist_id=playlist_id
+            playlist_id=playlist_id,
+            transcoding_profile=request.form.get('transcoding_profile', None)
         )
         return redirect(url_for('fleet_node_player_group_list', player_group_id=request.form['id']))
 
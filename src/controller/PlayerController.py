@@ -1,33 +1,65 @@
 import os
 import json
+import time
 import logging
 import hashlib
+import mimetypes
+import threading
+import urllib.parse
 
 from datetime import datetime, timedelta
 from typing import Optional, List, Dict
-from flask import Flask, render_template, redirect, request, url_for, send_from_directory, jsonify, abort, send_file, Response
+from flask import Flask, render_template, redirect, request, url_for, send_from_directory, jsonify, abort, send_file, Response, stream_with_context
 from pathlib import Path
 
 from src.model.entity.Slide import Slide
 from src.model.entity.Content import Content
+from src.model.entity.PlaylistSnapshot import PlaylistSnapshot
+from src.model.entity.MediaFile import MediaFile
 from src.model.enum.ContentType import ContentType
+from src.model.enum.TranscodingProfile import TranscodingProfile
 from src.exceptions.NoFallbackPlaylistException import NoFallbackPlaylistException
 from src.service.ModelStore import ModelStore
 from src.interface.ObController import ObController
-from src.util.utils import get_safe_cron_descriptor, is_cron_in_datetime_moment, is_cron_in_week_moment, is_now_after_cron_date_time_moment, is_now_after_cron_week_moment, decode_uri_component
+from src.constant.WebDirConstant import WebDirConstant
+from src.util.utils import compile_cron_schedule, decode_uri_component
+from src.util.UtilFile import is_stored_filename
 from src.util.UtilNetwork import get_safe_remote_addr, get_network_interfaces
 from src.model.enum.AnimationSpeed import animation_speed_duration
 
 
 class PlayerController(ObController):
 
+    STREAM_MAX_DURATION = 300
+    STREAM_CHECK_INTERVAL = 5
+    STREAM_KEEPALIVE_INTERVAL = 15
+    SENDFILE_X_ACCEL_REDIRECT = 'X-Accel-Redirect'
+    SENDFILE_X_SENDFILE = 'X-Sendfile'
+    SENDFILE_MODES = [SENDFILE_X_ACCEL_REDIRECT, SENDFILE_X_SENDFILE]
+
     def register(self):
+        self._stream_slots = threading.BoundedSemaphore(int(self._model_store.config().map().get('player_stream_limit')))
+        self._sendfile_mode = self._get_sendfile_mode(self._model_store.config().map().get('media_sendfile'))
         self._app.add_url_rule('/', 'player', self.player, methods=['GET'])
         self._app.add_url_rule('/use/<playlist_slug_or_id>', 'player_use', self.player, methods=['GET'])
         self._app.add_url_rule('/player/default', 'player_default', self.player_default, methods=['GET'])
+        self._app.add_url_rule('/player/service-worker.js', 'player_service_worker', self.player_service_worker, methods=['GET'])
         self._app.add_url_rule('/player/playlist', 'player_playlist', self.player_playlist, methods=['GET'])
         self._app.add_url_rule('/player/playlist/use/<playlist_slug_or_id>', 'player_playlist_use', self.player_playlist, methods=['GET'])
+        self._app.add_url_rule('/player/playlist/stream', 'player_playlist_stream', self.player_playlist_stream, methods=['GET'])
+        self._app.add_url_rule('/player/playlist/stream/use/<playlist_slug_or_id>', 'player_playlist_stream_use', self.player_playlist_stream, methods=['GET'])
         self._app.add_url_rule('/serve/content/<content_type>/<content_id>/<content_location>', 'serve_content_file', self.serve_content_file, methods=['GET'])
+        self._app.add_url_rule('/serve/stored/<path:filename>', 'serve_stored_file', self.serve_stored_file, methods=['GET'])
+
+    def _get_sendfile_mode(self, mode) -> Optional[str]:
+        if not mode:
+            return None
+
+        for sendfile_mode in self.SENDFILE_MODES:
+            if str(mode).lower() == sendfile_mode.lower():
+                return sendfile_mode
+
+        raise ValueError("Invalid media sendfile mode '{}'".format(mode))
 
     def player(self, playlist_slug_or_id: str = ''):
         preview_playlist = request.args.get('preview_playlist')
@@ -52,7 +84,7 @@ class PlayerController(ObController):
         playlist_id = current_playlist.id if current_playlist else None
 
         try:
-            items = self._get_playlist(playlist_id=playlist_id, preview_content_id=preview_content_id)
+            items = self._get_playlist(playlist_id=playlist_id, preview_content_id=preview_content_id, transcoding_profile=self._get_transcoding_profile())
         except NoFallbackPlaylistException:
             return redirect(url_for('player_default', noplaylist=1))
 
@@ -62,6 +94,7 @@ class PlayerController(ObController):
         slide_animation_speed = request.args.get('animation_speed', self._model_store.variable().get_one_by_name('slide_animation_speed').eval()).lower()
         slide_animation_entrance_effect = request.args.get('animation_effect', self._model_store.variable().get_one_by_name('slide_animation_entrance_effect').eval())
         slide_animation_exit_effect = request.args.get('slide_animation_exit_effect', self._model_store.variable().get_one_by_name('slide_animation_exit_effect').eval())
+        precache_budget = max(0, int(request.args.get('precache', self._model_store.variable().get_one_by_name('player_precache_budget').eval())))
 
         return render_template(
             'player/player.jinja.html',
@@ -73,6 +106,7 @@ class PlayerController(ObController):
             slide_animation_exit_effect=slide_animation_exit_effect,
             slide_animation_speed=slide_animation_speed,
             animation_speed_duration=animation_speed_duration,
+            precache_budget=precache_budget,
         )
 
     def player_default(self):
@@ -84,32 +118,115 @@ class PlayerController(ObController):
             noplaylist=request.args.get('noplaylist', '0') == '1'
         )
 
+    def player_service_worker(self):
+        response = send_from_directory(
+            os.path.join(self.get_application_dir(), WebDirConstant.FOLDER_STATIC, WebDirConstant.FOLDER_STATIC_WEB_ASSETS, 'js', 'player'),
+            'service-worker.js',
+            mimetype='application/javascript'
+        )
+        # Served under /player/ but it has to control the player pages and media urls at the root
+        response.headers['Service-Worker-Allowed'] = '/'
+        response.headers['Cache-Control'] = 'no-cache'
+
+        return response
+
     def player_playlist(self, playlist_slug_or_id: str = ''):
         playlist_slug_or_id = self._get_dynamic_playlist_id(playlist_slug_or_id)
+        transcoding_profile = self._get_transcoding_profile()
 
-        current_playlist = self._model_store.playlist().get_one_by("slug = ? OR id = ?", {
-            "slug": playlist_slug_or_id,
-            "id": playlist_slug_or_id
-        })
-        playlist_id = current_playlist.id if current_playlist else None
+        try:
+            snapshot = self._get_playlist_snapshot(playlist_slug_or_id, transcoding_profile)
+        except NoFallbackPlaylistException:
+            abort(404)
+
+        body, etag = snapshot.render()
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304)
+        else:
+            response = Response(body, mimetype='application/json')
+
+        response.set_etag(etag)
+        response.last_modified = self._model_store.variable().map().get('last_slide_update').as_int()
+        response.headers['Cache-Control'] = 'no-cache'
+
+        return response
 
+    def player_playlist_stream(self, playlist_slug_or_id: str = ''):
         try:
-            return jsonify(self._get_playlist(playlist_id=playlist_id))
+            self._get_playlist_snapshot(self._get_dynamic_playlist_id(playlist_slug_or_id), self._get_transcoding_profile())
         except NoFallbackPlaylistException:
             abort(404)
 
+        # Every open stream holds a server thread, players fall back to polling when none is left
+        if not self._stream_slots.acquire(blocking=False):
+            abort(503)
+
+        response = Response(
+            stream_with_context(self._stream_playlist(playlist_slug_or_id, request.headers.get('Last-Event-ID'))),
+            mimetype='text/event-stream'
+        )
+        response.headers['Cache-Control'] = 'no-cache'
+        response.headers['X-Accel-Buffering'] = 'no'
+        response.call_on_close(self._stream_slots.release)
+
+        return response
+
+    def _stream_playlist(self, playlist_slug_or_id: str, last_event_id: Optional[str] = None):
+        playlist_cache = self._model_store.playlist_cache()
+        stream_deadline = time.time() + self.STREAM_MAX_DURATION
+        last_write = time.time()
+
+        while time.time() < stream_deadline:
+            generation = playlist_cache.generation()
+
+            try:
+                # Resolved again on each wake up, a player moved to another group or playlist gets it right away
+                snapshot = self._get_playlist_snapshot(self._get_dynamic_playlist_id(playlist_slug_or_id), self._get_transcoding_profile())
+            except NoFallbackPlaylistException:
+                return
+
+            now = datetime.now()
+            body, etag = snapshot.render(now)
+            valid_until = snapshot.get_window(now)[1]
+
+            if etag != last_event_id:
+                last_event_id = etag
+                last_write = time.time()
+                yield 'id: {}\nevent: playlist\ndata: {}\n\n'.format(etag, body.decode('utf-8'))
+            elif time.time() - last_write >= self.STREAM_KEEPALIVE_INTERVAL:
+                last_write = time.time()
+                yield ': keep-alive\n\n'
+
+            timeout = self.STREAM_CHECK_INTERVAL
+
+            # Wake up right when a scheduled slide starts or ends
+            if valid_until:
+                timeout = max(0, min(timeout, (valid_until - now).total_seconds()))
+
+            playlist_cache.wait_for_change(generation, timeout=timeout)
+
     def _get_dynamic_playlist_id(self, playlist_slug_or_id: Optional[str]) -> str:
-        if not playlist_slug_or_id and self._model_store.variable().get_one_by_name('fleet_player_enabled'):
-            node_player = self._model_store.node_player().get_one_by("host = '{}'".format(
-                get_safe_remote_addr(self.get_remote_addr_for_node_player()),
-                True
-            ))
-
-            if node_player and node_player.group_id:
-                node_player_group = self._model_store.node_player_group().get(node_player.group_id)
-                playlist_slug_or_id = node_player_group.playlist_id
+        if not playlist_slug_or_id and self._model_store.variable().get_one_by_name('fleet_player_enabled').as_bool():
+            playlist_slug_or_id = self._model_store.node_player_group().get_playlist_id_by_host(
+                get_safe_remote_addr(self.get_remote_addr_for_node_player())
+            )
+
         return playlist_slug_or_id
 
+    def _get_transcoding_profile(self) -> Optional[TranscodingProfile]:
+        if not self._model_store.transcode().is_enabled() or not self._model_store.variable().get_one_by_name('fleet_player_enabled').as_bool():
+            return None
+
+        node_player = self._model_store.node_player_group().get_node_player_by_host(
+            get_safe_remote_addr(self.get_remote_addr_for_node_player())
+        )
+
+        if not node_player:
+            return None
+
+        return self._model_store.transcode().select_profile(node_player['transcoding_profile'], node_player['operating_system'])
+
     @staticmethod
     def get_remote_addr_for_node_player() -> str:
         if request.headers.get('X-Forwarded-For'):
@@ -117,8 +234,74 @@ class PlayerController(ObController):
         else:
             return request.remote_addr
 
-    def _get_playlist(self, playlist_id: Optional[int] = 0, preview_content_id: Optional[int] = None) -> dict:
+    def _get_playlist(self, playlist_id: Optional[int] = 0, preview_content_id: Optional[int] = None, transcoding_profile: Optional[TranscodingProfile] = None) -> dict:
         preview_content = self._model_store.content().get(preview_content_id) if preview_content_id else None
+
+        if preview_content:
+            return self._compile_playlist(playlist_id=playlist_id, preview_content=preview_content, transcoding_profile=transcoding_profile).to_dict()
+
+        return self._get_playlist_snapshot(str(playlist_id) if playlist_id else '', transcoding_profile).to_dict()
+
+    def _get_playlist_snapshot(self, playlist_slug_or_id: Optional[str], transcoding_profile: Optional[TranscodingProfile] = None) -> PlaylistSnapshot:
+        # Slug and id of a playlist share a snapshot, unknown ones all share the fallback's
+        playlist_id = self._resolve_playlist_id(playlist_slug_or_id)
+        cache_key = str(playlist_id) if playlist_id else ''
+
+        # Players on different profiles get their own snapshot of the same playlist
+        if transcoding_profile:
+            cache_key = "{}@{}".format(cache_key, transcoding_profile.value)
+
+        playlist_cache = self._model_store.playlist_cache()
+        snapshot = playlist_cache.get(cache_key)
+
+        if snapshot and not self._is_playlist_snapshot_stale(snapshot):
+            return snapshot
+
+        generation = playlist_cache.generation()
+        snapshot = self._compile_playlist(playlist_id=playlist_id, transcoding_profile=transcoding_profile)
+        return playlist_cache.set(cache_key, snapshot, generation)
+
+    def _resolve_playlist_id(self, playlist_slug_or_id: Optional[str]) -> Optional[int]:
+        if not playlist_slug_or_id:
+            return None
+
+        playlist_cache = self._model_store.playlist_cache()
+        playlist_id = playlist_cache.get_alias(str(playlist_slug_or_id))
+
+        if playlist_id:
+            return playlist_id
+
+        generation = playlist_cache.generation()
+        playlist = self._model_store.playlist().get_one_by("slug = ? OR id = ?", {
+            "slug": playlist_slug_or_id,
+            "id": playlist_slug_or_id
+        })
+
+        if not playlist:
+            return None
+
+        # Only the exact slug and id are remembered, the map stays bounded by the number of playlists
+        if str(playlist_slug_or_id) not in (playlist.slug, str(playlist.id)):
+            return playlist.id
+
+        return playlist_cache.set_alias(str(playlist_slug_or_id), playlist.id, generation)
+
+    def _is_playlist_snapshot_stale(self, snapshot: PlaylistSnapshot) -> bool:
+        var_map = self._model_store.variable().map()
+
+        if snapshot.hard_refresh_request != var_map.get('refresh_player_request').as_int():
+            return True
+
+        if snapshot.external_url != var_map.get('external_url').as_string():
+            return True
+
+        for directory, mtime in snapshot.watched_dirs.items():
+            if self._model_store.external_storage().is_stale(directory, mtime):
+                return True
+
+        return False
+
+    def _compile_playlist(self, playlist_id: Optional[int] = 0, preview_content: Optional[Content] = None, transcoding_profile: Optional[TranscodingProfile] = None) -> PlaylistSnapshot:
         preview_mode = preview_content is not None
 
         if playlist_id == 0 or not playlist_id:
@@ -129,14 +312,15 @@ class PlayerController(ObController):
             elif not preview_mode:
                 raise NoFallbackPlaylistException()
 
-        enabled_slides = [Slide(content_id=preview_content.id, duration=1000000)] if preview_mode else self._model_store.slide().get_slides(enabled=True, playlist_id=playlist_id)
-        slides = self._model_store.slide().to_dict(enabled_slides)
-        contents = self._model_store.content().get_all_indexed()
+        var_map = self._model_store.variable().map()
+        slides = [Slide(content_id=preview_content.id, duration=1000000).to_dict()] if preview_mode else self._model_store.slide().get_raw_slides(enabled=True, playlist_id=playlist_id)
+        contents = {preview_content.id: preview_content} if preview_mode else self._model_store.content().get_all_indexed()
         playlist = self._model_store.playlist().get(playlist_id)
         position = 9999
 
-        playlist_loop = []
+        playlist_slides = []
         playlist_notifications = []
+        watched_dirs = {}
 
         for slide in slides:
             if not slide['content_id']:
@@ -148,102 +332,259 @@ class PlayerController(ObController):
             content = contents[int(slide['content_id'])]
             slide['name'] = content.name
             slide['type'] = content.type.value
-            slide['location'] = self._model_store.content().resolve_content_location(content)
+            slide['location'] = self._model_store.content().resolve_content_location(content, transcoding_profile)
 
             if slide['type'] == ContentType.EXTERNAL_STORAGE.value:
                 mount_point_dir = Path(self._model_store.config().map().get('external_storage_mountpoint'), content.location)
                 if mount_point_dir.is_dir():
-                    for file in mount_point_dir.iterdir():
-                        if file.is_file() and not file.stem.startswith('.'):
-                            virtual_content = Content(
-                                id=content.id,
-                                name=file.stem,
-                                location=str(Path(mount_point_dir, file.name)),
-                                type=ContentType.guess_content_type_file(str(file.resolve())),
-                            )
-                            slide = dict(slide)
-                            slide['id'] = hashlib.md5(str(file).encode('utf-8')).hexdigest()
-                            slide['position'] = position
-                            slide['delegate_duration'] = 1 if virtual_content.type == ContentType.VIDEO else 0
-                            slide['name'] = file.name
-                            slide['type'] = virtual_content.type.value
-                            slide['location'] = self._model_store.content().resolve_content_location(virtual_content)
-                            self._check_slide_enablement(playlist_loop, playlist_notifications, slide)
-                            position = position + 1
+                    watched_dirs[str(mount_point_dir)] = os.stat(mount_point_dir).st_mtime
+                    virtual_slides = self._model_store.external_storage().get_virtual_slides(
+                        str(mount_point_dir),
+                        content.id,
+                        lambda directory: self._build_virtual_slides(content, directory)
+                    )
+
+                    for virtual_slide in virtual_slides:
+                        slide = dict(slide)
+                        slide.update(virtual_slide)
+                        slide['position'] = position
+                        self._check_slide_enablement(playlist_slides, playlist_notifications, slide)
+                        position = position + 1
             else:
-                self._check_slide_enablement(playlist_loop, playlist_notifications, slide)
-
-
-        playlists = {
-            'playlist_id': playlist.id if playlist else None,
-            'time_sync': playlist.time_sync if playlist else False,
-            'loop': playlist_loop,
-            'preview_mode': preview_mode,
-            'notifications': playlist_notifications,
-            'hard_refresh_request': self._model_store.variable().get_one_by_name("refresh_player_request").as_int()
-        }
-
-        return playlists
+                self._check_slide_enablement(playlist_slides, playlist_notifications, slide)
+
+        return PlaylistSnapshot(
+            playlist_id=playlist.id if playlist else None,
+            time_sync=playlist.time_sync if playlist else False,
+            slides=playlist_slides,
+            notifications=playlist_notifications,
+            preview_mode=preview_mode,
+            hard_refresh_request=var_map.get('refresh_player_request').as_int(),
+            external_url=var_map.get('external_url').as_string(),
+            watched_dirs=watched_dirs
+        )
 
-    def _check_slide_enablement(self, loop: List, notifications: List, slide: Dict) -> None:
-        is_in_datetime_moment_start = 'cron_schedule' in slide and slide['cron_schedule'] and get_safe_cron_descriptor(slide['cron_schedule']) and is_cron_in_datetime_moment(slide['cron_schedule'])
-        is_in_datetime_moment_end = 'cron_schedule_end' in slide and slide['cron_schedule_end'] and get_safe_cron_descriptor(slide['cron_schedule_end']) and is_cron_in_datetime_moment(slide['cron_schedule_end'])
-        is_in_week_moment_start = 'cron_schedule' in slide and slide['cron_schedule'] and get_safe_cron_descriptor(slide['cron_schedule']) and is_cron_in_week_moment(slide['cron_schedule'])
-        is_in_week_moment_end = 'cron_schedule_end' in slide and slide['cron_schedule_end'] and get_safe_cron_descriptor(slide['cron_schedule_end']) and is_cron_in_week_moment(slide['cron_schedule_end'])
+    def _build_virtual_slides(self, content: Content, mount_point_dir: Path) -> List[Dict]:
+        virtual_slides = []
+
+        for file in mount_point_dir.iterdir():
+            if file.is_file() and not file.stem.startswith('.'):
+                virtual_content = Content(
+                    id=content.id,
+                    name=file.stem,
+                    location=str(Path(mount_point_dir, file.name)),
+                    type=ContentType.guess_content_type_file(str(file.resolve())),
+                )
+                # Served as external storage, players and their service worker revalidate it as it can change in place
+                served_content = Content(
+                    id=content.id,
+                    name=file.stem,
+                    location=virtual_content.location,
+                    type=ContentType.EXTERNAL_STORAGE,
+                )
+                virtual_slides.append({
+                    'id': hashlib.md5(str(file).encode('utf-8')).hexdigest(),
+                    'delegate_duration': 1 if virtual_content.type == ContentType.VIDEO else 0,
+                    'name': file.name,
+                    'type': virtual_content.type.value,
+                    'location': self._model_store.content().resolve_content_location(served_content)
+                })
+
+        return virtual_slides
+
+    def _check_slide_enablement(self, slides: List, notifications: List, slide: Dict) -> None:
+        schedule_start = compile_cron_schedule(slide['cron_schedule'] if 'cron_schedule' in slide else None)
+        schedule_end = compile_cron_schedule(slide['cron_schedule_end'] if 'cron_schedule_end' in slide else None)
 
         if slide['is_notification']:
-            if is_in_datetime_moment_start:
+            if schedule_start and schedule_start.is_datetime_moment():
                 return notifications.append(slide)
             return logging.warn('Slide \'{}\' is a notification but start date is invalid'.format(slide['name']))
 
-        if is_in_datetime_moment_start:
-            if not is_now_after_cron_date_time_moment(slide['cron_schedule']):
-                return
-        elif is_in_week_moment_start:
-            if not is_now_after_cron_week_moment(slide['cron_schedule']):
-                return
+        slides.append((slide, schedule_start, schedule_end))
 
-        if is_in_datetime_moment_end:
-            if is_now_after_cron_date_time_moment(slide['cron_schedule_end']):
-                return
-        elif is_in_week_moment_end:
-            if is_now_after_cron_week_moment(slide['cron_schedule_end']):
-                return
+    def serve_content_file(self, content_location, content_type, content_id):
+        key = (content_type, content_id, content_location)
 
-        loop.append(slide)
+        return self._serve_media_file(key, self._get_media_file(content_location, content_type, content_id))
 
-    def serve_content_file(self, content_location, content_type, content_id):
+    def serve_stored_file(self, filename):
+        if not is_stored_filename(filename):
+            abort(404, 'Content not found')
+
+        return self._serve_media_file(('stored', filename), self._get_stored_file(filename))
+
+    def _serve_media_file(self, key: tuple, media_file: MediaFile) -> Response:
+        cache_enabled = self._model_store.variable().get_one_by_name('player_content_cache').as_bool()
+        width = request.args.get('w', type=int)
+        derivative = width and width > 0 and media_file.mimetype.startswith('image/')
+
+        if derivative:
+            webp = 'image/webp' in request.headers.get('Accept', '')
+            key = key + (self._model_store.image_derivative().get_target_width(width), webp)
+            media_file = self._get_derivative_file(media_file, key, key[-2], webp) or media_file
+
+        if self._sendfile_mode:
+            response = self._sendfile_response(media_file, conditional=cache_enabled)
+        else:
+            try:
+                response = send_file(
+                    media_file.path,
+                    mimetype=media_file.mimetype,
+                    conditional=True,
+                    etag=media_file.etag if cache_enabled else True,
+                    last_modified=media_file.mtime
+                )
+            except FileNotFoundError:
+                self._model_store.media_cache().forget(key)
+                abort(404, 'Content not found')
+
+        if derivative:
+            response.vary.add('Accept')
+
+        if not cache_enabled:
+            response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
+            response.headers['Pragma'] = 'no-cache'
+            response.headers['Expires'] = '0'
+            return response
+
+        response.headers['Cache-Control'] = 'public, max-age=3153600000'  # 100 years
+
+        return response
+
+    def _get_media_file(self, content_location: str, content_type: str, content_id: int) -> MediaFile:
+        key = (content_type, content_id, content_location)
+        media_cache = self._model_store.media_cache()
+        media_file = media_cache.get(key)
+
+        # Files under the external storage mountpoint can change in place, whatever the type in the url
+        if media_file and (not media_file.mutable or media_file.is_fresh()):
+            return media_file
+
+        generation = media_cache.generation()
         content = self._model_store.content().get(content_id)
 
         if not content:
             abort(404, 'Content not found')
 
         content_location = decode_uri_component(content_location)
-
-        content_path = str(Path(self.get_application_dir(), content_location))
+        storage_path = os.path.abspath(self._model_store.config().map().get('external_storage_mountpoint'))
+        root_path = self.get_application_dir()
 
         if content_type == ContentType.EXTERNAL_STORAGE.value:
-            content_path = str(Path(self._model_store.config().map().get('external_storage_mountpoint'), content_location))
+            root_path = storage_path
 
-        if not os.path.exists(content_path) or '..' in content_path:
+        content_path = str(Path(root_path, content_location))
+
+        if '..' in content_path:
             abort(404, 'Content not found')
 
-        if not self._model_store.variable().get_one_by_name('player_content_cache').as_bool():
-            response = send_file(content_path)
-            response.headers['Cache-Control'] = 'no-store, no-cache, must-revalidate, max-age=0'
-            response.headers['Pragma'] = 'no-cache'
-            response.headers['Expires'] = '0'
-            return response
+        try:
+            stat = os.stat(content_path)
+        except OSError:
+            abort(404, 'Content not found')
 
+        mutable = os.path.commonpath([storage_path, os.path.abspath(content_path)]) == storage_path
         content_path_hash = hashlib.sha256(str(content_path).encode()).hexdigest()
-        etag = f'"{content_path_hash}-{content_id}-{os.path.getmtime(content_path)}"'
 
-        if_none_match = request.headers.get('If-None-Match')
-        if if_none_match == etag:
-            return Response(status=304)
+        return media_cache.set(key, MediaFile(
+            path=content_path,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            etag=f'{content_path_hash}-{content_id}-{stat.st_mtime}',
+            mimetype=mimetypes.guess_type(content_path)[0] or 'application/octet-stream',
+            sendfile_uri=self._get_sendfile_uri(content_path, storage_path if mutable else self.get_application_dir(), 'storage' if mutable else 'app'),
+            mutable=mutable
+        ), generation)
+
+    def _get_stored_file(self, filename: str) -> MediaFile:
+        key = ('stored', filename)
+        media_cache = self._model_store.media_cache()
+        media_file = media_cache.get(key)
+
+        # Named after their own content, stored files never change in place
+        if media_file:
+            return media_file
+
+        generation = media_cache.generation()
+        root_path = self.get_application_dir()
+        path = os.path.join(root_path, self._app.config['UPLOAD_FOLDER'], filename)
 
-        response = send_file(content_path)
-        response.headers['Cache-Control'] = 'public, max-age=3153600000'  # 100 years
-        response.headers['ETag'] = etag
+        try:
+            stat = os.stat(path)
+        except OSError:
+            abort(404, 'Content not found')
+
+        return media_cache.set(key, MediaFile(
+            path=path,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            etag=os.path.basename(filename),
+            mimetype=mimetypes.guess_type(path)[0] or 'application/octet-stream',
+            sendfile_uri=self._get_sendfile_uri(path, root_path, 'app')
+        ), generation)
+
+    def _get_derivative_file(self, media_file: MediaFile, key: tuple, width: int, webp: bool) -> Optional[MediaFile]:
+        media_cache = self._model_store.media_cache()
+        derivative_file = media_cache.get(key)
+
+        if derivative_file and derivative_file.mtime >= media_file.mtime:
+            return derivative_file
+
+        generation = media_cache.generation()
+        root_path = self.get_application_dir()
+        derivative = self._model_store.image_derivative().get_derivative(
+            path=media_file.path,
+            size=media_file.size,
+            mtime=media_file.mtime,
+            width=width,
+            webp=webp
+        )
+
+        if not derivative:
+            return None
+
+        derivative_path, mimetype = derivative
+
+        try:
+            stat = os.stat(derivative_path)
+        except OSError:
+            return None
+
+        return media_cache.set(key, MediaFile(
+            path=derivative_path,
+            size=stat.st_size,
+            mtime=stat.st_mtime,
+            etag=os.path.basename(derivative_path),
+            mimetype=mimetype,
+            sendfile_uri=self._get_sendfile_uri(derivative_path, root_path, 'app')
+        ), generation)
+
+    def _get_sendfile_uri(self, path: str, root_path: str, sendfile_root: str) -> Optional[str]:
+        if self._sendfile_mode == self.SENDFILE_X_ACCEL_REDIRECT:
+            return "{}/{}/{}".format(
+                self._model_store.config().map().get('media_sendfile_prefix').rstrip('/'),
+                sendfile_root,
+                urllib.parse.quote(os.path.relpath(path, root_path).replace(os.sep, '/'))
+            )
+        elif self._sendfile_mode == self.SENDFILE_X_SENDFILE:
+            return os.path.abspath(path)
+
+        return None
+
+    def _sendfile_response(self, media_file: MediaFile, conditional: bool = True) -> Response:
+        response = Response(mimetype=media_file.mimetype)
+        response.last_modified = media_file.mtime
+
+        if conditional:
+            response.set_etag(media_file.etag)
+
+            if request.if_none_match.contains(media_file.etag) or (not request.if_none_match and request.if_modified_since and int(media_file.mtime) <= request.if_modified_since.timestamp()):
+                response.status_code = 304
+                return response
+
+        # The front web server reads the file itself and takes care of Range requests
+        response.headers[self._sendfile_mode] = media_file.sendfile_uri
+        response.headers['Accept-Ranges'] = 'bytes'
 
         return response
@@ -25,7 +25,7 @@ class PlaylistController(ObController):
         self._model_store.variable().update_by_name('last_pillmenu_slideshow', 'playlist')
         current_playlist = self._model_store.playlist().get(playlist_id)
         playlists = self._model_store.playlist().get_all(sort="created_at", ascending=True)
-        durations = self._model_store.playlist().get_durations_by_playlists()
+        durations = {playlist.id: playlist.duration for playlist in playlists}
         working_folder_path = self._model_store.variable().get_one_by_name('last_folder_content').as_string()
         working_folder = self._model_store.folder().get_one_by_path(path=working_folder_path, entity=FolderEntity.CONTENT)
         slides_with_content = self._model_store.slide().get_all_indexed(attribute='content_id', multiple=True)
@@ -80,7 +80,7 @@ class PlaylistController(ObController):
         if not playlist:
             abort(404)
 
-        if self._model_store.slide().count_slides_for_playlist(playlist_id) > 0:
+        if playlist.slides_count > 0:
             return redirect(url_for('playlist_list', playlist_id=playlist_id, error='playlist_delete_has_slides'))
 
         if self._model_store.node_player_group().count_node_player_groups_for_playlist(playlist_id) > 0:
@@ -24,6 +24,7 @@ class SysinfoController(ObController):
         self._app.add_url_rule('/sysinfo/restart', 'sysinfo_restart', self.sysinfo_restart, methods=['GET', 'POST'])
         self._app.add_url_rule('/sysinfo/restart/needed', 'sysinfo_restart_needed', self._auth(self.sysinfo_restart_needed), methods=['GET'])
         self._app.add_url_rule('/sysinfo/get/ipaddr', 'sysinfo_get_ipaddr', self.sysinfo_get_ipaddr, methods=['GET'])
+        self._app.add_url_rule('/sysinfo/get/database', 'sysinfo_get_database', self._auth(self.sysinfo_get_database), methods=['GET'])
 
     def logs(self):
         self._model_store.variable().update_by_name('last_pillmenu_configuration', 'logs')
@@ -71,3 +72,8 @@ class SysinfoController(ObController):
             'external_url': self._model_store.variable().get_one_by_name('external_url').as_string().strip(),
             'interfaces': [iface['ip_address'] for iface in get_network_interfaces()]
         })
+
+    def sysinfo_get_database(self):
+        return jsonify({
+            'statement_cache': self._model_store.database().get_statement_cache_stats()
+        })
@@ -0,0 +1,6 @@
+from src.exceptions.HttpClientException import HttpClientException
+
+
+class UploadChecksumMismatchException(HttpClientException):
+    code = 400
+    description = "Upload checksum doesn't match"
@@ -0,0 +1,6 @@
+from src.exceptions.HttpClientException import HttpClientException
+
+
+class UploadConflictException(HttpClientException):
+    code = 409
+    description = "Upload offset doesn't match"
@@ -0,0 +1,6 @@
+from src.exceptions.HttpClientException import HttpClientException
+
+
+class UploadInvalidException(HttpClientException):
+    code = 400
+    description = "Invalid upload"
@@ -0,0 +1,6 @@
+from src.exceptions.HttpClientException import HttpClientException
+
+
+class UploadNotFoundException(HttpClientException):
+    code = 404
+    description = "Upload not found"
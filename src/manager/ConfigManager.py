@@ -22,6 +22,24 @@ class ConfigManager:
             'external_storage_mountpoint': '%application_dir%/var/run/storage',
             'port': self.DEFAULT_PORT,
             'bind': '0.0.0.0',
+            'threads': 100,
+            'player_stream_limit': 50,
+            'media_sendfile': False,
+            'media_sendfile_prefix': '/_media',
+            'ffprobe_path': 'ffprobe',
+            'ffmpeg_path': 'ffmpeg',
+            'thumbnail_workers': 2,
+            'thumbnail_cache_size': 256,
+            'picture_derivative_cache_size': 1024,
+            'video_probe_workers': 2,
+            'transcoding_profiles': '',
+            'transcode_workers': 1,
+            'reprobe_videos': False,
+            'database_read_pool_size': 8,
+            'database_busy_timeout': 5000,
+            'database_synchronous': 'NORMAL',
+            'database_cache_size': -8000,
+            'database_statement_cache_size': 256,
             'debug': False,
             'log_file': None,
             'log_level': 'INFO',
@@ -54,6 +72,7 @@ class ConfigManager:
         parser.add_argument('--log-stdout', '-ls', default=self._CONFIG['log_stdout'], action='store_true', help='Log to standard output')
         parser.add_argument('--demo', '-o', default=self._CONFIG['demo'], help='Demo mode to showcase Hightronix Screen in a sandbox')
         parser.add_argument('--external-storage-mountpoint', '-e', default=self._CONFIG['external_storage_mountpoint'], help='Mountpoint directory of external storage')
+        parser.add_argument('--reprobe-videos', '-r', default=self._CONFIG['reprobe_videos'], action='store_true', help='Probe the duration of every video content again')
         parser.add_argument('--version', '-v', default=None, action='store_true', help='Get version number')
 
         return parser.parse_args()
@@ -79,6 +98,8 @@ class ConfigManager:
             self._CONFIG['log_level'] = args.log_level
         if args.log_stdout:
             self._CONFIG['log_stdout'] = args.log_stdout
+        if args.reprobe_videos:
+            self._CONFIG['reprobe_videos'] = args.reprobe_videos
         if args.version:
             print("{} version v{} ()".format(self.APPLICATION_NAME, self._CONFIG['version']))
             sys.exit(0)
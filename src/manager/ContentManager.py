@@ -1,22 +1,29 @@
 import os
+import threading
 
-from typing import Dict, Optional, List, Tuple, Union
+from typing import Dict, Optional, List, Tuple, Union, Callable
 from werkzeug.datastructures import FileStorage
 from flask import url_for
 
 from src.model.entity.Content import Content
 from src.model.entity.Playlist import Playlist
 from src.model.enum.ContentType import ContentType
+from src.model.enum.DurationStatus import DurationStatus
+from src.model.enum.TranscodeStatus import TranscodeStatus
+from src.model.enum.TranscodingProfile import TranscodingProfile
 from src.util.utils import get_yt_video_id
 from src.manager.DatabaseManager import DatabaseManager
 from src.manager.ConfigManager import ConfigManager
 from src.manager.LangManager import LangManager
 from src.manager.UserManager import UserManager
 from src.manager.VariableManager import VariableManager
+from src.manager.VideoProbeManager import VideoProbeManager
+from src.manager.ThumbnailManager import ThumbnailManager
+from src.manager.TranscodeManager import TranscodeManager
 from src.service.ModelManager import ModelManager
-from src.util.UtilFile import randomize_filename
+from src.constant.WebDirConstant import WebDirConstant
+from src.util.UtilFile import store_stream, store_file, is_stored_filename
 from src.util.UtilNetwork import get_preferred_ip_address
-from src.util.UtilVideo import get_video_duration_with_moviepy
 from src.util.utils import encode_uri_component
 
 
@@ -29,41 +36,63 @@ class ContentManager(ModelManager):
         "type CHAR(30)",
         "location TEXT",
         "duration FLOAT",
+        "duration_status CHAR(30)",
+        "transcodes TEXT",
         "folder_id INTEGER",
         "created_by CHAR(255)",
         "updated_by CHAR(255)",
         "created_at INTEGER",
         "updated_at INTEGER"
     ]
-
-    def __init__(self, lang_manager: LangManager, database_manager: DatabaseManager, user_manager: UserManager, variable_manager: VariableManager, config_manager: ConfigManager):
+    TABLE_INDEXES = [
+        "folder_id",
+        "location",
+        "duration_status",
+        "UNIQUE uuid"
+    ]
+    RAW_COLUMNS = ["id", "uuid", "name", "type", "location", "created_by", "updated_by", "created_at", "updated_at", "folder_id", "duration", "duration_status"]
+    UPLOAD_DIR = os.path.join(WebDirConstant.FOLDER_STATIC, WebDirConstant.FOLDER_STATIC_WEB_UPLOADS)
+    RAW_CASTS = {
+        "created_at": int,
+        "updated_at": int
+    }
+
+    def __init__(self, lang_manager: LangManager, database_manager: DatabaseManager, user_manager: UserManager, variable_manager: VariableManager, config_manager: ConfigManager, on_change: Optional[Callable] = None, video_probe_manager: Optional[VideoProbeManager] = None, thumbnail_manager: Optional[ThumbnailManager] = None, transcode_manager: Optional[TranscodeManager] = None):
         super().__init__(lang_manager, database_manager, user_manager, variable_manager)
+        self._on_change = on_change
+        self._video_probe_manager = video_probe_manager
+        self._thumbnail_manager = thumbnail_manager
+        self._transcode_manager = transcode_manager
         self._config_manager = config_manager
-        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL)
+        self._files_lock = threading.Lock()
+        self._storing = {}
+        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL, self.TABLE_INDEXES)
+        self.user_manager.backfill_user_trackers(self.TABLE_NAME)
 
     def hydrate_object(self, raw_content: dict, id: int = None) -> Content:
         if id:
             raw_content['id'] = id
 
-        [raw_content, user_tracker_edits] = self.user_manager.initialize_user_trackers(raw_content)
-
-        if len(user_tracker_edits) > 0:
-            self._db.update_by_id(self.TABLE_NAME, raw_content['id'], user_tracker_edits)
-
         return Content(**raw_content)
 
     def hydrate_list(self, raw_contents: list) -> List[Content]:
         return [self.hydrate_object(raw_content) for raw_content in raw_contents]
 
+    def hydrate_rows(self, columns: List[str], rows: List[tuple]) -> List[Content]:
+        return self._db.hydrate_rows(Content, columns, rows)
+
+    def serialize_rows(self, columns: List[str], rows: List[tuple]) -> List[Dict]:
+        return self._db.serialize_rows(columns, rows, casts=self.RAW_CASTS)
+
     def get(self, id: int) -> Optional[Content]:
         object = self._db.get_by_id(self.TABLE_NAME, id)
         return self.hydrate_object(object, id) if object else None
 
-    def get_by(self, query, sort: Optional[str] = None) -> List[Content]:
-        return self.hydrate_list(self._db.get_by_query(self.TABLE_NAME, query=query, sort=sort))
+    def get_by(self, query, sort: Optional[str] = None, values: dict = {}) -> List[Content]:
+        return self.hydrate_rows(*self._db.get_rows_by_query(self.TABLE_NAME, query=query, sort=sort, values=values))
 
-    def get_one_by(self, query) -> Optional[Content]:
-        object = self._db.get_one_by_query(self.TABLE_NAME, query=query)
+    def get_one_by(self, query, values: dict = {}) -> Optional[Content]:
+        object = self._db.get_one_by_query(self.TABLE_NAME, query=query, values=values)
 
         if not object:
             return None
@@ -71,7 +100,7 @@ class ContentManager(ModelManager):
         return self.hydrate_object(object)
 
     def get_all(self, sort: Optional[str] = 'created_at', ascending=False) -> List[Content]:
-        return self.hydrate_list(self._db.get_all(table_name=self.TABLE_NAME, sort=sort, ascending=ascending))
+        return self.hydrate_rows(*self._db.get_rows_by_query(self.TABLE_NAME, sort=sort, ascending=ascending))
 
     def get_all_indexed(self, attribute: str = 'id', multiple=False) -> Dict[str, Content]:
         index = {}
@@ -95,18 +124,25 @@ class ContentManager(ModelManager):
             self._db.update_by_id(self.TABLE_NAME, content_id, edits)
 
     def get_contents(self, slide_id: Optional[int] = None, folder_id: Optional[int] = None) -> List[Content]:
-        query = " 1=1 "
+        query, values = self.get_contents_query(slide_id=slide_id, folder_id=folder_id)
+
+        return self.get_by(query=query, values=values)
+
+    def get_raw_contents(self, slide_id: Optional[int] = None, folder_id: Optional[int] = None) -> List[Dict]:
+        query, values = self.get_contents_query(slide_id=slide_id, folder_id=folder_id)
+
+        return self.serialize_rows(*self._db.get_rows_by_query(self.TABLE_NAME, query=query, values=values, columns=self.RAW_COLUMNS))
+
+    def get_contents_query(self, slide_id: Optional[int] = None, folder_id: Optional[int] = None) -> Tuple[str, Dict]:
+        conditions = {}
 
         if slide_id:
-            query = "{} {}".format(query, "AND slide_id = {}".format(slide_id))
+            conditions["slide_id"] = slide_id
 
         if folder_id is not None:
-            if folder_id == 0:
-                query = "{} {}".format(query, "AND folder_id is null")
-            else:
-                query = "{} {}".format(query, "AND folder_id = {}".format(folder_id))
+            conditions["folder_id"] = None if folder_id == 0 else folder_id
 
-        return self.get_by(query=query)
+        return self._db.build_conditions(conditions)
 
     def pre_add(self, content: Dict) -> Dict:
         self.user_manager.track_user_on_create(content)
@@ -121,15 +157,22 @@ class ContentManager(ModelManager):
         return content_id
 
     def post_add(self, content_id: str) -> str:
+        self.notify_change()
         return content_id
 
     def post_update(self, content_id: str) -> str:
+        self.notify_change()
         return content_id
 
     def post_updates(self):
-        pass
+        self.notify_change()
+
+    def notify_change(self) -> None:
+        if self._on_change:
+            self._on_change()
 
     def post_delete(self, content_id: str) -> str:
+        self.notify_change()
         return content_id
 
     def update_form(self, id: int, name: str, location: Optional[str] = None) -> Optional[Content]:
@@ -155,20 +198,185 @@ class ContentManager(ModelManager):
         self.post_update(id)
         return self.get(id)
 
-    def add_form(self, content: Union[Content, Dict]) -> None:
+    def prepare_form(self, content: Union[Content, Dict]) -> Dict:
         form = content
 
         if not isinstance(content, dict):
             form = content.to_dict()
             del form['id']
+        elif isinstance(form.get('duration_status'), DurationStatus):
+            form['duration_status'] = form['duration_status'].value
 
         if form['type'] == ContentType.YOUTUBE.value:
             form['location'] = get_yt_video_id(form['location'])
 
-        self._db.add(self.TABLE_NAME, self.pre_add(form))
-        self.post_add(content.id)
+        return self.pre_add(form)
+
+    def add_form(self, content: Union[Content, Dict]) -> Optional[Content]:
+        form = self.prepare_form(content)
+        id = self._db.add(self.TABLE_NAME, form)
+
+        if not id:
+            return None
+
+        self.post_add(id)
+        content = self.hydrate_object(form, id)
+        self.process_file(content)
+
+        return content
+
+    def add_forms(self, contents: List[Content]) -> bool:
+        if not contents:
+            return True
+
+        added = self._db.bulk_insert(self.TABLE_NAME, [self.prepare_form(content) for content in contents])
+        self.post_updates()
+
+        if added:
+            for content in contents:
+                self.process_file(content)
+
+        return added
+
+    def process_file(self, content: Content) -> None:
+        self.probe_duration(content)
+
+        if self._thumbnail_manager and content.has_file():
+            self._thumbnail_manager.submit(content.location, is_video=content.type == ContentType.VIDEO)
+
+        self.transcode(content)
+
+    def probe_duration(self, content: Content) -> None:
+        if self._video_probe_manager and content.is_duration_pending():
+            self._video_probe_manager.submit(content.uuid, content.location)
+
+    def set_probed_duration(self, content_uuid: str, duration: Optional[float]) -> None:
+        # A failed re-probe keeps the duration found before
+        values = {"duration": duration, "duration_status": DurationStatus.READY.value} if duration else {"duration_status": DurationStatus.FAILED.value}
+
+        self._db.update_by_query(self.TABLE_NAME, "uuid = ? AND duration_status = ?", values, {"uuid": content_uuid, "duration_status": DurationStatus.PENDING.value})
+        self.notify_change()
+
+    def reprobe_durations(self, pending_only: bool = True) -> int:
+        conditions = {"type": ContentType.VIDEO.value}
+
+        if pending_only:
+            conditions["duration_status"] = DurationStatus.PENDING.value
+
+        query, values = self._db.build_conditions(conditions)
+        contents = self.get_by(query=query, values=values)
+
+        if not pending_only and contents:
+            self._db.update_by_query(self.TABLE_NAME, "type = ?", {"duration_status": DurationStatus.PENDING.value}, {"type": ContentType.VIDEO.value})
+
+        for content in contents:
+            content.duration_status = DurationStatus.PENDING
+            self.probe_duration(content)
+
+        return len(contents)
+
+    def transcode(self, content: Content) -> None:
+        if not self._transcode_manager or content.type != ContentType.VIDEO:
+            return
+
+        for profile in self._transcode_manager.get_profiles():
+            if content.get_transcode_status(profile) in (TranscodeStatus.READY, TranscodeStatus.FAILED):
+                continue
+
+            self.set_transcode({"uuid": content.uuid}, profile, TranscodeStatus.PENDING, notify=False)
+            self._transcode_manager.submit(content.location, profile)
+
+    def set_transcode(self, conditions: Dict, profile: TranscodingProfile, status: TranscodeStatus, location: Optional[str] = None, notify: bool = True) -> None:
+        query, values = self._db.build_conditions(conditions)
+
+        # Workers finishing at once each patch their own profile key, never the whole column
+        self._db.execute_write_query(
+            query="UPDATE {} SET transcodes = json_set(COALESCE(NULLIF(transcodes, ''), '{{}}'), ?, json(?)) WHERE {}".format(self.TABLE_NAME, query),
+            params=('$."{}"'.format(profile.value), {"status": status.value, "location": location}) + tuple(values.values())
+        )
+
+        if notify:
+            self.notify_change()
+
+    def set_transcoded(self, source_location: str, profile: TranscodingProfile, location: Optional[str]) -> None:
+        with self._files_lock:
+            if location and not self.is_file_used(source_location):
+                # Every content using this video was deleted while it was being transcoded
+                self.remove_files([location])
+                return
+
+            self.set_transcode({"location": source_location, "type": ContentType.VIDEO.value}, profile, TranscodeStatus.READY if location else TranscodeStatus.FAILED, location)
+
+    def retranscode(self) -> int:
+        query, values = self._db.build_conditions({"type": ContentType.VIDEO.value})
+        contents = self.get_by(query=query, values=values)
+
+        for content in contents:
+            self.transcode(content)
+
+        return len(contents)
 
     def add_form_raw(self, name: str, type: ContentType, request_files: Optional[Dict], upload_dir: str, location: Optional[str] = None, folder_id: Optional[int] = None) -> Content:
+        content = self.prepare_form_raw(name, type, request_files, upload_dir, location=location, folder_id=folder_id)
+
+        if not content:
+            return None
+
+        if not content.has_file():
+            return self.add_form(content)
+
+        added = None
+
+        try:
+            added = self.add_form(content)
+        finally:
+            self.settle_file(content.location, added is not None)
+
+        return added
+
+    def add_stored_file(self, filename: str, location: str, folder_id: Optional[int] = None) -> Optional[Content]:
+        type = ContentType.guess_content_type_file(filename)
+        added = None
+
+        try:
+            if type:
+                content = Content(name=filename.rsplit('.', 1)[0], type=type, location=location, folder_id=folder_id)
+
+                if type == ContentType.VIDEO:
+                    content.duration_status = DurationStatus.PENDING
+
+                added = self.add_form(content)
+        finally:
+            # The file went through store_file, it is either referenced by its row now or not kept
+            self.settle_file(location, added is not None)
+
+        return added
+
+    def add_files_raw(self, request_files: List[FileStorage], upload_dir: str, folder_id: Optional[int] = None) -> List[Content]:
+        contents = []
+        added = False
+
+        try:
+            for object in request_files:
+                type = ContentType.guess_content_type_file(object.filename)
+
+                if not type:
+                    continue
+
+                content = self.prepare_form_raw(object.filename.rsplit('.', 1)[0], type, object, upload_dir, folder_id=folder_id)
+
+                if content:
+                    contents.append(content)
+
+            added = self.add_forms(contents)
+        finally:
+            # The whole batch was rolled back, don't leave its files behind
+            for content in contents:
+                self.settle_file(content.location, added)
+
+        return contents if added else []
+
+    def prepare_form_raw(self, name: str, type: ContentType, request_files: Optional[Dict], upload_dir: str, location: Optional[str] = None, folder_id: Optional[int] = None) -> Optional[Content]:
         content = Content(
             name=name,
             type=type,
@@ -194,34 +402,83 @@ class ContentManager(ModelManager):
 
             if object:
                 object.seek(0)
-                object_name = randomize_filename(object.filename)
-                object_path = os.path.join(upload_dir, object_name)
-                object.save(object_path)
-                content.location = object_path
+                content.location = store_stream(object.stream, upload_dir, object.filename, store=self.store_file)
 
                 if type == ContentType.VIDEO:
-                    content.duration = get_video_duration_with_moviepy(content.location)
+                    # Probed in background, the slide duration aggregates skip it until then
+                    content.duration_status = DurationStatus.PENDING
 
         else:
             content.location = location if location else ''
 
-        self.add_form(content)
-        return self.get_one_by(query="uuid = '{}'".format(content.uuid))
+        return content
 
     def delete(self, id: int) -> None:
         content = self.get(id)
 
         if content:
-            if content.has_file():
-                try:
-                    os.unlink(content.location)
-                except FileNotFoundError:
-                    pass
-
             self.pre_delete(id)
             self._db.delete_by_id(self.TABLE_NAME, id)
+
+            if content.has_file():
+                self.release_file(content.location)
+
             self.post_delete(id)
 
+    def count_references(self, location: str) -> int:
+        rows = self._db.execute_read_query("SELECT COUNT(*) AS total FROM {} WHERE location = ?".format(self.TABLE_NAME), (location,))
+
+        return rows[0]['total'] if rows else 0
+
+    def is_file_used(self, location: str) -> bool:
+        return location in self._storing or self.count_references(location) > 0
+
+    def store_file(self, path: str, upload_dir: str, filename: str, digest: Optional[str] = None) -> str:
+        with self._files_lock:
+            location = store_file(path, upload_dir, filename, digest)
+            # Deduped onto a file no row references yet, it stays pinned until its own row is inserted
+            self._storing[location] = self._storing.get(location, 0) + 1
+
+        return location
+
+    def unpin_file(self, location: str) -> None:
+        with self._files_lock:
+            if self._storing.get(location, 0) > 1:
+                self._storing[location] = self._storing[location] - 1
+            else:
+                self._storing.pop(location, None)
+
+    def settle_file(self, location: str, added: bool) -> None:
+        self.unpin_file(location)
+
+        if not added:
+            self.release_file(location)
+
+    def release_file(self, location: str) -> bool:
+        with self._files_lock:
+            # Stored files are shared by every content uploaded with the same bytes, the last one out removes it
+            if not location or self.is_file_used(location):
+                return False
+
+            self.remove_files([location] + self.get_derived_locations(location))
+
+        return True
+
+    def get_derived_locations(self, location: str) -> List[str]:
+        if not self._transcode_manager:
+            return []
+
+        # Every profile ever enabled may have left its transcode next to the file
+        return [self._transcode_manager.get_transcode_location(location, profile) for profile in TranscodingProfile if profile != TranscodingProfile.ORIGINAL]
+
+    @staticmethod
+    def remove_files(paths: List[str]) -> None:
+        for path in paths:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
     def to_dict(self, contents: List[Content]) -> List[Dict]:
         return [content.to_dict() for content in contents]
 
@@ -231,18 +488,32 @@ class ContentManager(ModelManager):
     def count_contents_for_folder(self, folder_id: int) -> int:
         return len(self.get_contents(folder_id=folder_id))
 
-    def resolve_content_location(self, content: Content) -> str:
+    def get_stored_filename(self, location: str) -> Optional[str]:
+        filename = os.path.relpath(location, self.UPLOAD_DIR).replace(os.sep, '/')
+
+        return filename if is_stored_filename(filename) else None
+
+    def resolve_content_location(self, content: Content, transcoding_profile: Optional[TranscodingProfile] = None) -> str:
         var_external_url = self._variable_manager.get_one_by_name('external_url').as_string().strip().strip('/')
         location = content.location
 
+        if transcoding_profile and content.type == ContentType.VIDEO:
+            location = content.get_transcode_location(transcoding_profile) or location
+
         if content.type == ContentType.YOUTUBE:
             location = "https://www.youtube.com/watch?v={}".format(content.location)
+        elif content.has_file() and self.get_stored_filename(location):
+            # Addressed by digest only, the same file gets the same url whichever content it belongs to
+            location = "{}/{}".format(
+                var_external_url if len(var_external_url) > 0 else "",
+                url_for('serve_stored_file', filename=self.get_stored_filename(location)).strip('/')
+            )
         elif content.has_file() or content.type == ContentType.EXTERNAL_STORAGE:
             location = "{}/{}".format(
                 var_external_url if len(var_external_url) > 0 else "",
                 url_for(
                     'serve_content_file',
-                    content_location=encode_uri_component(content.location),
+                    content_location=encode_uri_component(location),
                     content_type=content.type.value,
                     content_id=content.id
                 ).strip('/')
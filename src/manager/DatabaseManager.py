@@ -4,17 +4,49 @@ import json
 import sqlite3
 import logging
 import uuid
+import queue
+import inspect
+import operator
+import threading
 
+from collections import OrderedDict
+from contextlib import contextmanager
 from sqlite3 import Cursor
-from typing import Optional, Dict
+from typing import Optional, Dict, List, Tuple, Callable
+
+from src.manager.ConfigManager import ConfigManager
+
 
 class DatabaseManager:
 
     DB_FILE: str = "data/db/Hightronix.db"
-
-    def __init__(self):
+    SYNCHRONOUS_MODES = ['OFF', 'NORMAL', 'FULL', 'EXTRA']
+    NOT_NULL = object()
+
+    def __init__(self, config_manager: Optional[ConfigManager] = None):
+        config = config_manager.map() if config_manager else {}
+        self._read_pool_size = max(1, int(config.get('database_read_pool_size', 8)))
+        self._busy_timeout = int(config.get('database_busy_timeout', 5000))
+        self._synchronous = str(config.get('database_synchronous', 'NORMAL')).upper()
+        self._cache_size = int(config.get('database_cache_size', -8000))
+        self._statement_cache_size = int(config.get('database_statement_cache_size', 256))
+        self._statements = OrderedDict()
+        self._statements_lock = threading.Lock()
+        self._statement_hits = 0
+        self._statement_misses = 0
+        self._row_plans = {}
         self._conn = None
+        self._write_lock = threading.RLock()
+        self._transaction_owner = None
+        self._transaction_depth = 0
+        self._read_pool = queue.LifoQueue()
+        self._read_connections = []
+        self._read_pool_lock = threading.Lock()
         self._enabled = True
+
+        if self._synchronous not in self.SYNCHRONOUS_MODES:
+            raise ValueError("Invalid database synchronous mode '{}'".format(self._synchronous))
+
         self.init()
 
     def init(self):
@@ -22,33 +54,128 @@ class DatabaseManager:
         self._open()
 
     def _open(self, flush: bool = False) -> None:
-        if flush and os.path.isfile(self.DB_FILE):
-            os.unlink(self.DB_FILE)
+        self.close()
+
+        if flush:
+            for path in [self.DB_FILE, self.DB_FILE + '-wal', self.DB_FILE + '-shm']:
+                if os.path.isfile(path):
+                    os.unlink(path)
 
-        self._conn = sqlite3.connect(self.DB_FILE, check_same_thread=False)
-        self._conn.row_factory = sqlite3.Row
+        self._conn = self._connect()
+        self._conn.execute("PRAGMA journal_mode = WAL")
         self.pre_migrate()
 
-    def open(self, table_name: str, table_model: list):
+    def _connect(self, read_only: bool = False) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.DB_FILE, check_same_thread=False, timeout=self._busy_timeout / 1000, cached_statements=self._statement_cache_size)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA busy_timeout = {}".format(self._busy_timeout))
+        conn.execute("PRAGMA synchronous = {}".format(self._synchronous))
+        conn.execute("PRAGMA cache_size = {}".format(self._cache_size))
+
+        if read_only:
+            conn.execute("PRAGMA query_only = 1")
+
+        return conn
+
+    @contextmanager
+    def _reader(self):
+        # Reads issued from inside a transaction must see its uncommitted writes
+        if self.in_transaction():
+            yield self._conn
+            return
+
+        try:
+            conn = self._read_pool.get_nowait()
+        except queue.Empty:
+            conn = None
+
+            with self._read_pool_lock:
+                if len(self._read_connections) < self._read_pool_size:
+                    conn = self._connect(read_only=True)
+                    self._read_connections.append(conn)
+
+            if conn is None:
+                conn = self._read_pool.get()
+
+        try:
+            yield conn
+        finally:
+            self._read_pool.put(conn)
+
+    def open(self, table_name: str, table_model: list, table_indexes: list = []):
         new_table_definition = '''CREATE TABLE IF NOT EXISTS {} (
             id INTEGER PRIMARY KEY AUTOINCREMENT, 
             {}
         )'''.format(table_name, ", ".join(table_model))
         self.execute_write_query(new_table_definition)
 
-        old_table_definition = self.execute_read_query("select sql from sqlite_master where tbl_name = ?", (table_name,))
+        old_table_definition = self.execute_read_query("select sql from sqlite_master where type = 'table' and tbl_name = ?", (table_name,))
         old_table_definition = old_table_definition[0]['sql']
 
         delta_queries = self.generate_delta_queries(old_table_definition, new_table_definition)
+        new_indexes = self.parse_index_definitions(table_name, table_indexes)
+        old_indexes = self.get_index_definitions(table_name)
+
+        # Obsolete indexes go before column deltas, sqlite refuses to drop an indexed column
+        for index_name, index_definition in old_indexes.items():
+            if new_indexes.get(index_name) != index_definition:
+                self.execute_write_query("DROP INDEX IF EXISTS {}".format(index_name))
 
         for delta_query in delta_queries:
             self.execute_write_query(delta_query)
 
+        for index_name, index_definition in new_indexes.items():
+            if old_indexes.get(index_name) != index_definition:
+                self.execute_write_query(index_definition)
+
         return self
 
+    def get_index_definitions(self, table_name: str) -> Dict[str, str]:
+        indexes = self.execute_read_query("select name, sql from sqlite_master where type = 'index' and tbl_name = ? and name like ?", (table_name, "idx_{}_%".format(table_name)))
+
+        return {index['name']: index['sql'] for index in indexes}
+
+    def set_triggers(self, owner: str, triggers: Dict[str, str]) -> None:
+        old_triggers = self.execute_read_query("select name, sql from sqlite_master where type = 'trigger' and name like ?", ("trg_{}_%".format(owner),))
+        old_triggers = {trigger['name']: trigger['sql'] for trigger in old_triggers}
+        new_triggers = {}
+
+        for name, definition in triggers.items():
+            trigger_name = "trg_{}_{}".format(owner, name)
+            new_triggers[trigger_name] = "CREATE TRIGGER {} {}".format(trigger_name, definition)
+
+        for trigger_name, trigger_definition in old_triggers.items():
+            if new_triggers.get(trigger_name) != trigger_definition:
+                self.execute_write_query("DROP TRIGGER IF EXISTS {}".format(trigger_name))
+
+        for trigger_name, trigger_definition in new_triggers.items():
+            if old_triggers.get(trigger_name) != trigger_definition:
+                self.execute_write_query(trigger_definition)
+
+    @staticmethod
+    def parse_index_definitions(table_name: str, table_indexes: list) -> Dict[str, str]:
+        indexes = {}
+
+        for table_index in table_indexes:
+            unique = table_index.upper().startswith('UNIQUE ')
+            columns = [column.strip() for column in (table_index[len('UNIQUE '):] if unique else table_index).split(',')]
+            index_name = "idx_{}_{}".format(table_name, "_".join(columns))
+            indexes[index_name] = "CREATE {}INDEX {} ON {} ({})".format("UNIQUE " if unique else "", index_name, table_name, ", ".join(columns))
+
+        return indexes
+
     def close(self) -> None:
-        if self._conn:
-            self._conn.close()
+        with self._read_pool_lock:
+            for conn in self._read_connections:
+                conn.close()
+
+            self._read_connections = []
+            self._read_pool = queue.LifoQueue()
+
+        with self._write_lock:
+            if self._conn:
+                self._conn.close()
+                self._conn = None
 
     def __enter__(self):
         return self
@@ -59,28 +186,146 @@ class DatabaseManager:
     def get_connection(self):
         return self._conn
 
-    def execute_write_query(self, query, params=(), silent_errors=False) -> None:
-        logging.debug(query)
-        sanitized_params = self._sanitize_params(params)
+    def get_data_version(self) -> int:
+        with self._write_lock:
+            return self._conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def get_statement_cache_stats(self) -> Dict:
+        lookups = self._statement_hits + self._statement_misses
+
+        return {
+            'size': len(self._statements),
+            'capacity': self._statement_cache_size,
+            'hits': self._statement_hits,
+            'misses': self._statement_misses,
+            'hit_rate': self._statement_hits / lookups if lookups else 0
+        }
+
+    def _track_statement(self, query: str) -> None:
+        # Mirrors the LRU kept by sqlite3 for each connection, keyed on the SQL text
+        with self._statements_lock:
+            if query in self._statements:
+                self._statements.move_to_end(query)
+                self._statement_hits = self._statement_hits + 1
+                return
+
+            self._statement_misses = self._statement_misses + 1
+            self._statements[query] = True
+
+            if len(self._statements) > self._statement_cache_size:
+                self._statements.popitem(last=False)
+
+    @staticmethod
+    def build_conditions(conditions: Dict) -> Tuple[str, Dict]:
+        clauses = []
+        values = {}
+
+        for column, value in conditions.items():
+            if value is None:
+                clauses.append("{} IS NULL".format(column))
+            elif value is DatabaseManager.NOT_NULL:
+                clauses.append("{} IS NOT NULL".format(column))
+            elif isinstance(value, (list, tuple)):
+                keys = ["{}_{}".format(column, index) for index in range(len(value))]
+                clauses.append("{} IN ({})".format(column, ", ".join(["?" for _ in keys])) if keys else "0=1")
+                values.update(zip(keys, value))
+            else:
+                clauses.append("{} = ?".format(column))
+                values[column] = value
+
+        return " AND ".join(clauses) if clauses else "1=1", values
+
+    def in_transaction(self) -> bool:
+        return self._transaction_owner == threading.get_ident()
+
+    @contextmanager
+    def transaction(self):
+        with self._write_lock:
+            if self._transaction_depth:
+                self._transaction_depth = self._transaction_depth + 1
+
+                try:
+                    yield self
+                finally:
+                    self._transaction_depth = self._transaction_depth - 1
+
+                return
+
+            self._transaction_owner = threading.get_ident()
+            self._transaction_depth = 1
+
+            try:
+                with self._conn:
+                    yield self
+            finally:
+                self._transaction_depth = 0
+                self._transaction_owner = None
+
+    def _write(self, statements: List[Tuple[str, List]], description: str, silent_errors=False) -> Tuple[bool, Optional[int]]:
+        nested = self.in_transaction()
 
         try:
-            with self._conn:
+            with self.transaction():
                 cur = self._conn.cursor()
-                cur.execute(query, tuple(sanitized_params))
+
+                for query, params in statements:
+                    logging.debug(query)
+                    self._track_statement(query)
+
+                    if len(params) == 1:
+                        cur.execute(query, tuple(self._sanitize_params(params[0])))
+                    else:
+                        cur.executemany(query, [tuple(self._sanitize_params(row)) for row in params])
+
+                lastrowid = cur.lastrowid
                 cur.close()
         except sqlite3.Error as e:
+            # Let the enclosing transaction roll back as a whole
+            if nested:
+                raise
+
             if not silent_errors:
-                logging.error("SQL query execution error while writing '{}': {}".format(query, e))
-            self._conn.rollback()
-        except sqlite3.OperationalError:
-            pass
+                logging.error("SQL query execution error while writing {}: {}".format(description, e))
+
+            return False, None
+
+        return True, lastrowid
+
+    def execute_write_query(self, query, params=(), silent_errors=False) -> Optional[int]:
+        return self._write([(query, [params])], "'{}'".format(query), silent_errors=silent_errors)[1]
+
+    def execute_write_many(self, queries: List[Tuple[str, List]], silent_errors=False) -> bool:
+        return self._write(queries, "batch", silent_errors=silent_errors)[0]
+
+    def bulk_insert(self, table_name: str, rows: List[Dict], silent_errors=False) -> bool:
+        groups = OrderedDict()
+
+        for row in rows:
+            groups.setdefault(tuple(row.keys()), []).append(tuple(row.values()))
+
+        return self.execute_write_many(
+            [(self.get_add_query(table_name, list(columns)), params) for columns, params in groups.items()],
+            silent_errors=silent_errors
+        )
+
+    def bulk_update(self, table_name: str, rows: Dict[int, Dict], silent_errors=False) -> bool:
+        groups = OrderedDict()
+
+        for id, values in rows.items():
+            groups.setdefault(tuple(values.keys()), []).append(tuple(values.values()) + (id,))
+
+        return self.execute_write_many(
+            [(self.get_update_by_id_query(table_name, list(columns)), params) for columns, params in groups.items()],
+            silent_errors=silent_errors
+        )
 
     def execute_read_query(self, query, params=()) -> list:
         logging.debug(query)
+        self._track_statement(query)
         result = []
         try:
-            with self._conn:
-                cur = self._conn.cursor()
+            with self._reader() as conn:
+                cur = conn.cursor()
                 cur.execute(query, params)
                 rows = cur.fetchall()
                 result = [dict(row) for row in rows]
@@ -89,6 +334,82 @@ class DatabaseManager:
             logging.error("SQL query execution error while reading '{}': {}".format(query, e))
         return result
 
+    def execute_read_rows(self, query, params=()) -> Tuple[List[str], List[tuple]]:
+        logging.debug(query)
+        self._track_statement(query)
+        columns = []
+        rows = []
+        try:
+            with self._reader() as conn:
+                cur = conn.cursor()
+                cur.row_factory = None
+                cur.execute(query, params)
+                rows = cur.fetchall()
+                columns = [column[0] for column in cur.description] if cur.description else []
+                cur.close()
+        except sqlite3.Error as e:
+            logging.error("SQL query execution error while reading '{}': {}".format(query, e))
+        return columns, rows
+
+    def get_rows_by_query(self, table_name: str, query: str = "1=1", values: dict = {}, sort: Optional[str] = None, ascending=True, limit: Optional[int] = None, columns: Optional[List[str]] = None) -> Tuple[List[str], List[tuple]]:
+        return self.execute_read_rows(
+            query="select {} from {} where {} {} {}".format(
+                ", ".join(columns) if columns else "*",
+                table_name,
+                query,
+                "ORDER BY {} {}".format(sort, "ASC" if ascending else "DESC") if sort else "",
+                "LIMIT {}".format(limit) if limit else ""
+            ),
+            params=tuple(v for v in values.values())
+        )
+
+    def hydrate_rows(self, entity_class, columns: List[str], rows: List[tuple]) -> list:
+        getter, tail = self._get_row_plan(entity_class, columns)
+
+        return [entity_class(*getter(row + tail if tail else row)) for row in rows]
+
+    def serialize_rows(self, columns: List[str], rows: List[tuple], casts: Dict[str, Callable] = {}) -> List[Dict]:
+        cast_indexes = [(index, casts[column]) for index, column in enumerate(columns) if column in casts]
+        serialized = []
+
+        for row in rows:
+            if cast_indexes:
+                row = list(row)
+
+                for index, cast in cast_indexes:
+                    row[index] = cast(row[index])
+
+            serialized.append(dict(zip(columns, row)))
+
+        return serialized
+
+    def _get_row_plan(self, entity_class, columns: List[str]) -> Tuple[Callable, tuple]:
+        key = (entity_class, tuple(columns))
+        plan = self._row_plans.get(key)
+
+        if plan:
+            return plan
+
+        # Maps the constructor's positional arguments onto column indexes, missing ones point to a tail of defaults
+        indexes = []
+        tail = []
+
+        for parameter in list(inspect.signature(entity_class.__init__).parameters.values())[1:]:
+            if parameter.kind in (parameter.VAR_POSITIONAL, parameter.VAR_KEYWORD):
+                continue
+
+            if parameter.name in columns:
+                indexes.append(columns.index(parameter.name))
+            else:
+                indexes.append(len(columns) + len(tail))
+                tail.append(None if parameter.default is parameter.empty else parameter.default)
+
+        getter = operator.itemgetter(*indexes) if len(indexes) > 1 else lambda row: tuple(row[index] for index in indexes)
+        plan = (getter, tuple(tail))
+        self._row_plans[key] = plan
+
+        return plan
+
     def get_all(self, table_name: str, sort: Optional[str] = None, ascending=True, limit: Optional[int] = None) -> list:
         return self.execute_read_query(
             query="select * from {} {} {}".format(
@@ -124,29 +445,38 @@ class DatabaseManager:
 
         return lines[0] if count == 1 else None
 
-    def update_by_query(self, table_name: str, query: str = "1=1", values: dict = {}) -> list:
+    def update_by_query(self, table_name: str, query: str = "1=1", values: dict = {}, query_values: dict = {}) -> list:
         return self.execute_write_query(
             query="UPDATE {} SET {} where {}".format(
                 table_name,
                 " , ".join(["{} = ?".format(k, v) for k, v in values.items()]),
                 query
             ),
-            params=tuple(v for v in values.values())
+            params=tuple(v for v in values.values()) + tuple(v for v in query_values.values())
+        )
+
+    def get_update_by_id_query(self, table_name: str, columns: List[str]) -> str:
+        return "UPDATE {} SET {} where id = ?".format(
+            table_name,
+            " , ".join(["{} = ?".format(column) for column in columns])
         )
 
     def update_by_id(self, table_name: str, id: int, values: dict = {}) -> list:
-        return self.update_by_query(table_name, "id = {}".format(id), values)
+        return self.update_by_query(table_name, "id = ?", values, {"id": id})
 
     def get_by_id(self, table_name: str, id: int) -> Optional[Dict]:
-        return self.get_one_by_query(table_name, "id = {}".format(id))
+        return self.get_one_by_query(table_name, "id = ?", {"id": id})
 
-    def add(self, table_name: str, values: dict) -> None:
-        self.execute_write_query(
-            query="INSERT INTO {} ({}) VALUES ({})".format(
-                table_name,
-                ", ".join(["{}".format(key) for key in values.keys()]),
-                ", ".join(["?" for _ in values.keys()]),
-            ),
+    def get_add_query(self, table_name: str, columns: List[str]) -> str:
+        return "INSERT INTO {} ({}) VALUES ({})".format(
+            table_name,
+            ", ".join(["{}".format(column) for column in columns]),
+            ", ".join(["?" for _ in columns]),
+        )
+
+    def add(self, table_name: str, values: dict) -> Optional[int]:
+        return self.execute_write_query(
+            query=self.get_add_query(table_name, list(values.keys())),
             params=tuple(v for v in values.values())
         )
 
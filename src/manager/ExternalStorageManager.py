@@ -0,0 +1,136 @@
+import os
+import time
+import logging
+import threading
+
+from pathlib import Path
+from typing import Dict, Optional, List, Callable
+
+try:
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+
+class ExternalStorageManager:
+
+    # Watched directories are still stat'ed from time to time, a pulled usb stick doesn't always raise an event
+    WATCH_VERIFY_INTERVAL = 30
+
+    def __init__(self, on_change: Optional[Callable] = None, on_file_change: Optional[Callable[[str], None]] = None):
+        self._on_change = on_change
+        self._on_file_change = on_file_change
+        self._lock = threading.Lock()
+        self._indexes = {}
+        self._generation = 0
+        self._versions = {}
+        self._building = {}
+        self._watches = {}
+        self._verified_at = {}
+        self._observer = None
+
+    def get_virtual_slides(self, directory: str, content_id: int, build: Callable[[Path], List[Dict]]) -> List[Dict]:
+        key = (directory, content_id)
+        index = self._indexes.get(key)
+
+        if index and not self.is_stale(directory, index[0]):
+            return index[1]
+
+        self.watch(directory)
+
+        with self._lock:
+            version = (self._generation, self._versions.get(directory, 0))
+            self._building[directory] = self._building.get(directory, 0) + 1
+
+        try:
+            mtime = os.stat(directory).st_mtime
+            slides = build(Path(directory))
+        finally:
+            with self._lock:
+                self._building[directory] = self._building[directory] - 1
+
+        with self._lock:
+            # The directory changed while it was listed, serve the listing but don't keep it
+            if version == (self._generation, self._versions.get(directory, 0)):
+                self._indexes[key] = (mtime, slides)
+
+        return slides
+
+    def is_stale(self, directory: str, mtime: float) -> bool:
+        now = time.time()
+
+        if directory in self._watches and now - self._verified_at.get(directory, 0) < self.WATCH_VERIFY_INTERVAL:
+            return False
+
+        self._verified_at[directory] = now
+
+        try:
+            stale = os.stat(directory).st_mtime != mtime
+        except OSError:
+            stale = True
+
+        # A change without event, like a pulled usb stick, also outdates the listing kept for it
+        if stale:
+            self._drop(directory)
+
+        return stale
+
+    def watch(self, directory: str) -> None:
+        if Observer is None or directory in self._watches:
+            return
+
+        with self._lock:
+            if directory in self._watches:
+                return
+
+            try:
+                if self._observer is None:
+                    self._observer = Observer()
+                    self._observer.daemon = True
+                    self._observer.start()
+
+                self._watches[directory] = self._observer.schedule(DirectoryEventHandler(self, directory), directory, recursive=False)
+                self._verified_at[directory] = time.time()
+            except OSError as e:
+                logging.warning("Can't watch directory '{}', falling back to mtime checks: {}".format(directory, e))
+
+    def forget(self, directory: str) -> None:
+        changed = self._drop(directory)
+
+        # Files replaced in place keep the listing intact but not what was resolved for them
+        if self._on_file_change:
+            self._on_file_change(directory)
+
+        if changed and self._on_change:
+            self._on_change()
+
+    def _drop(self, directory: str) -> bool:
+        with self._lock:
+            self._versions[directory] = self._versions.get(directory, 0) + 1
+            indexes = {key: index for key, index in self._indexes.items() if key[0] != directory}
+            # Copying a batch of files raises a burst of events, only the first one has something to drop
+            changed = len(indexes) != len(self._indexes) or self._building.get(directory, 0) > 0
+            self._indexes = indexes
+
+        return changed
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation = self._generation + 1
+            self._indexes = {}
+
+
+class DirectoryEventHandler(FileSystemEventHandler):
+
+    def __init__(self, external_storage_manager: ExternalStorageManager, directory: str):
+        super().__init__()
+        self._external_storage_manager = external_storage_manager
+        self._directory = directory
+
+    def on_any_event(self, event) -> None:
+        if event.event_type in ('opened', 'closed_no_write'):
+            return
+
+        self._external_storage_manager.forget(self._directory)
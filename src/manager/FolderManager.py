@@ -22,11 +22,14 @@ class FolderManager(ModelManager):
         "created_at INTEGER",
         "updated_at INTEGER"
     ]
+    TABLE_INDEXES = [
+        "parent_id, entity"
+    ]
 
     def __init__(self, lang_manager: LangManager, database_manager: DatabaseManager, user_manager: UserManager,
                  variable_manager: VariableManager):
         super().__init__(lang_manager, database_manager, user_manager, variable_manager)
-        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL)
+        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL, self.TABLE_INDEXES)
 
     def hydrate_object(self, raw_folder: dict, id: Optional[int] = None) -> Folder:
         if id:
@@ -41,22 +44,21 @@ class FolderManager(ModelManager):
         object = self._db.get_by_id(self.TABLE_NAME, id)
         return self.hydrate_object(object, id) if object else None
 
-    def get_by(self, query, sort: Optional[str] = None, ascending=True) -> List[Folder]:
-        return self.hydrate_list(self._db.get_by_query(self.TABLE_NAME, query=query, sort=sort, ascending=ascending))
+    def get_by(self, query, sort: Optional[str] = None, ascending=True, values: dict = {}) -> List[Folder]:
+        return self.hydrate_list(self._db.get_by_query(self.TABLE_NAME, query=query, sort=sort, ascending=ascending, values=values))
 
     def get_by_entity(self, entity: FolderEntity) -> List[Folder]:
-        return self.get_by("entity = '{}'".format(entity.value))
+        return self.get_by("entity = ?", values={"entity": entity.value})
 
     def get_children(self, folder: Optional[Folder], entity: Optional[FolderEntity] = None, sort: Optional[str] = None, ascending=True) -> List[Folder]:
-        query = " 1=1 "
+        conditions = {"parent_id": folder.id if folder else None}
 
         if entity:
-            query = "{} {}".format(query, "AND entity = '{}'".format(entity.value))
+            conditions["entity"] = entity.value
 
-        if folder:
-            return self.get_by("parent_id = {} AND {}".format(folder.id, query), sort, ascending)
+        query, values = self._db.build_conditions(conditions)
 
-        return self.get_by("parent_id is null AND {}".format(query), sort, ascending)
+        return self.get_by(query, sort, ascending, values=values)
 
     def get_one_by_path(self, path: str, entity: FolderEntity) -> Folder:
         parts = path[1:].split('/')
@@ -67,8 +69,8 @@ class FolderManager(ModelManager):
             SELECT f.id, f.name, f.entity, cte.depth + 1 AS depth FROM folder f
             INNER JOIN FolderCTE cte ON f.parent_id = cte.id
         )
-        SELECT id FROM FolderCTE WHERE name = '{}' AND depth = {} AND entity = '{}'
-        """.format(parts[-1], len(parts) - 1, entity.value))
+        SELECT id FROM FolderCTE WHERE name = ? AND depth = ? AND entity = ?
+        """, (parts[-1], len(parts) - 1, entity.value))
 
         if len(result) > 0:
             return self.get(result[0]['id'])
@@ -92,8 +94,8 @@ class FolderManager(ModelManager):
 
         return self.get(folder.parent_id)
 
-    def get_one_by(self, query) -> Optional[Folder]:
-        object = self._db.get_one_by_query(self.TABLE_NAME, query=query)
+    def get_one_by(self, query, values: dict = {}) -> Optional[Folder]:
+        object = self._db.get_one_by_query(self.TABLE_NAME, query=query, values=values)
 
         if not object:
             return None
@@ -111,12 +113,9 @@ class FolderManager(ModelManager):
             self._db.update_by_id(self.TABLE_NAME, folder_id, edits)
 
     def get_folders(self, parent_id: Optional[int] = None) -> List[Folder]:
-        query = " 1=1 "
-
-        if parent_id:
-            query = "{} {}".format(query, "AND parent_id = {}".format(parent_id))
+        query, values = self._db.build_conditions({"parent_id": parent_id} if parent_id else {})
 
-        return self.get_by(query=query)
+        return self.get_by(query=query, values=values)
 
     def pre_add(self, folder: Dict) -> Dict:
         self.user_manager.track_user_on_create(folder)
@@ -144,16 +143,16 @@ class FolderManager(ModelManager):
         self.post_update(id)
 
     def move_to_folder(self, entity_id: int, entity: FolderEntity, folder_id: Optional[int] = None, entity_is_folder=False) -> None:
+        self.move_many_to_folder([entity_id], entity=entity, folder_id=folder_id, entity_is_folder=entity_is_folder)
+
+    def move_many_to_folder(self, entity_ids: List[int], entity: FolderEntity, folder_id: Optional[int] = None, entity_is_folder=False) -> None:
         folder = self.get(folder_id) if folder_id else None
 
         if folder and folder.entity != entity:
             return
 
         if entity_is_folder:
-            return self._db.execute_write_query(
-                query="UPDATE {} set parent_id = ? WHERE id = ?".format(self.TABLE_NAME),
-                params=(folder_id if folder else None, entity_id)
-            )
+            return self._db.bulk_update(self.TABLE_NAME, {entity_id: {"parent_id": folder_id if folder else None} for entity_id in entity_ids})
 
         table = None
 
@@ -163,10 +162,7 @@ class FolderManager(ModelManager):
             table = NodePlayerManager.TABLE_NAME
 
         if table:
-            return self._db.execute_write_query(
-                query="UPDATE {} set folder_id = ? WHERE id = ?".format(table),
-                params=(folder_id if folder else None, entity_id)
-            )
+            return self._db.bulk_update(table, {entity_id: {"folder_id": folder_id if folder else None} for entity_id in entity_ids})
 
     def get_working_folder(self, entity: FolderEntity) -> str:
         var_name = None
@@ -202,18 +198,23 @@ class FolderManager(ModelManager):
             parent_id=working_folder.id if working_folder else None
         )
 
-        self.add_form(folder)
-        return folder
+        return self.add_form(folder)
 
-    def add_form(self, folder: Union[Folder, Dict]) -> None:
+    def add_form(self, folder: Union[Folder, Dict]) -> Optional[Folder]:
         form = folder
 
         if not isinstance(folder, dict):
             form = folder.to_dict()
             del form['id']
 
-        self._db.add(self.TABLE_NAME, self.pre_add(form))
-        self.post_add(folder.id)
+        form = self.pre_add(form)
+        id = self._db.add(self.TABLE_NAME, form)
+
+        if not id:
+            return None
+
+        self.post_add(id)
+        return self.hydrate_object(form, id)
 
     def delete(self, id: int) -> None:
         self.pre_delete(id)
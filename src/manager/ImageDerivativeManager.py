@@ -0,0 +1,203 @@
+import os
+import math
+import uuid
+import logging
+import threading
+
+from typing import Optional, Tuple, Callable
+
+from PIL import Image, ImageOps
+
+from src.manager.ConfigManager import ConfigManager
+from src.util.UtilFile import get_file_digest, is_stored_filename
+
+
+class ImageDerivativeManager:
+
+    WIDTHS = [640, 1280, 1920, 2560, 3840]
+    DERIVATIVE_DIR = '.derivatives'
+    JPEG_QUALITY = 85
+    WEBP_QUALITY = 80
+    MAX_SOURCES = 4096
+    ROTATED_ORIENTATIONS = (5, 6, 7, 8)
+    EVICT_RATIO = 0.8
+
+    def __init__(self, config_manager: ConfigManager, derivative_dir: str, on_evict: Optional[Callable] = None):
+        self._config_manager = config_manager
+        self._derivative_dir = derivative_dir
+        self._on_evict = on_evict
+        self._max_size = int(self._config_manager.map().get('picture_derivative_cache_size')) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._sources = {}
+        self._building = {}
+        self._total_size = None
+
+    def get_target_width(self, width: int) -> int:
+        for target_width in self.WIDTHS:
+            if target_width >= width:
+                return target_width
+
+        return self.WIDTHS[-1]
+
+    def get_derivative(self, path: str, size: int, mtime: float, width: int, webp: bool = False) -> Optional[Tuple[str, str]]:
+        source = self._get_source(path, size, mtime)
+
+        if not source:
+            return None
+
+        digest, source_width, source_height, has_alpha = source
+        target_width = self.get_target_width(width)
+
+        # Never upscale, a picture already smaller than the screen is served as is
+        if source_width <= target_width:
+            return None
+
+        if webp:
+            extension, mimetype = 'webp', 'image/webp'
+        elif has_alpha:
+            extension, mimetype = 'png', 'image/png'
+        else:
+            extension, mimetype = 'jpg', 'image/jpeg'
+
+        derivative_path = os.path.join(self._derivative_dir, digest[:2], "{}-{}.{}".format(digest, target_width, extension))
+
+        if not os.path.exists(derivative_path):
+            # Players asking for the same picture at once wait for a single build
+            with self._get_build_lock(derivative_path):
+                built = os.path.exists(derivative_path) or self._build(path, derivative_path, target_width, math.ceil(target_width * source_height / source_width), extension, has_alpha)
+
+            with self._lock:
+                self._building.pop(derivative_path, None)
+
+            if not built:
+                return None
+
+            self._track(os.path.getsize(derivative_path))
+
+        return derivative_path, mimetype
+
+    def _track(self, size: int) -> None:
+        with self._lock:
+            if self._total_size is None:
+                self._total_size = self._get_cache_size()
+            else:
+                self._total_size = self._total_size + size
+
+            evict = self._total_size > self._max_size
+
+            if evict:
+                self._total_size = self._evict(int(self._max_size * self.EVICT_RATIO))
+
+        # Evicted files may still be resolved for players, they have to be looked up again
+        if evict and self._on_evict:
+            self._on_evict()
+
+    def _get_cache_size(self) -> int:
+        return sum(entry.stat().st_size for entry in self._scan())
+
+    def _evict(self, target_size: int) -> int:
+        entries = [(max(entry.stat().st_atime, entry.stat().st_mtime), entry.stat().st_size, entry.path) for entry in self._scan()]
+        total_size = sum(size for _, size, _ in entries)
+
+        # Derivatives of deleted or replaced pictures are never read again and go first
+        for _, size, path in sorted(entries):
+            if total_size <= target_size:
+                break
+
+            try:
+                os.unlink(path)
+                total_size = total_size - size
+            except FileNotFoundError:
+                pass
+
+        logging.info("Picture derivative cache evicted down to {} bytes".format(total_size))
+
+        return total_size
+
+    def _scan(self):
+        if not os.path.isdir(self._derivative_dir):
+            return
+
+        for shard in os.scandir(self._derivative_dir):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.is_file() and not entry.name.endswith('.tmp'):
+                        yield entry
+
+    def _get_source(self, path: str, size: int, mtime: float) -> Optional[Tuple[str, int, int, bool]]:
+        key = (path, size, mtime)
+
+        if key in self._sources:
+            return self._sources[key]
+
+        try:
+            with Image.open(path) as image:
+                if getattr(image, 'is_animated', False):
+                    source = None
+                else:
+                    width, height = image.size
+
+                    if image.getexif().get(0x0112) in self.ROTATED_ORIENTATIONS:
+                        width, height = height, width
+
+                    has_alpha = image.mode in ('RGBA', 'LA', 'PA') or (image.mode == 'P' and 'transparency' in image.info)
+                    source = (self._get_file_digest(path), width, height, has_alpha)
+        except Exception as e:
+            logging.warning("Can't read picture '{}' for derivatives: {}".format(path, e))
+            source = None
+
+        with self._lock:
+            if len(self._sources) >= self.MAX_SOURCES:
+                self._sources = {}
+
+            self._sources[key] = source
+
+        return source
+
+    def _get_file_digest(self, path: str) -> str:
+        filename, _ = os.path.splitext(os.path.basename(path))
+
+        # Content addressed uploads are already named after their digest
+        if is_stored_filename(filename):
+            return filename
+
+        return get_file_digest(path)
+
+    def _get_build_lock(self, derivative_path: str) -> threading.Lock:
+        with self._lock:
+            return self._building.setdefault(derivative_path, threading.Lock())
+
+    def _build(self, path: str, derivative_path: str, width: int, height: int, extension: str, has_alpha: bool) -> bool:
+        tmp_path = "{}.{}.tmp".format(derivative_path, uuid.uuid4().hex)
+
+        try:
+            os.makedirs(os.path.dirname(derivative_path), exist_ok=True)
+
+            with Image.open(path) as image:
+                rotated = image.getexif().get(0x0112) in self.ROTATED_ORIENTATIONS
+
+                # Let the jpeg decoder downscale by itself, a 40MB photo is never decoded at full size
+                image.draft('RGB', (height, width) if rotated else (width, height))
+                image = ImageOps.exif_transpose(image)
+                image = image.convert('RGBA' if has_alpha and extension != 'jpg' else 'RGB')
+                image = image.resize((width, height), Image.LANCZOS)
+
+                if extension == 'webp':
+                    image.save(tmp_path, format='WEBP', quality=self.WEBP_QUALITY, method=4)
+                elif extension == 'png':
+                    image.save(tmp_path, format='PNG', optimize=True)
+                else:
+                    image.save(tmp_path, format='JPEG', quality=self.JPEG_QUALITY, optimize=True, progressive=True)
+
+            os.replace(tmp_path, derivative_path)
+        except Exception as e:
+            logging.warning("Can't build derivative of picture '{}': {}".format(path, e))
+
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+
+            return False
+
+        return True
@@ -0,0 +1,49 @@
+import os
+import threading
+
+from typing import Optional, Tuple
+
+from src.model.entity.MediaFile import MediaFile
+
+
+class MediaCacheManager:
+
+    MAX_ENTRIES = 4096
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._files = {}
+        self._generation = 0
+
+    def generation(self) -> int:
+        return self._generation
+
+    def get(self, key: Tuple) -> Optional[MediaFile]:
+        return self._files.get(key)
+
+    def set(self, key: Tuple, media_file: MediaFile, generation: int) -> MediaFile:
+        with self._lock:
+            # Contents changed while the file was resolved, serve it but don't cache it
+            if generation == self._generation:
+                if len(self._files) >= self.MAX_ENTRIES:
+                    self._files = {}
+
+                self._files[key] = media_file
+
+        return media_file
+
+    def forget(self, key: Tuple) -> None:
+        with self._lock:
+            self._files.pop(key, None)
+
+    def forget_directory(self, directory: str) -> None:
+        directory = os.path.join(os.path.abspath(directory), '')
+
+        with self._lock:
+            self._generation = self._generation + 1
+            self._files = {key: media_file for key, media_file in self._files.items() if not os.path.abspath(media_file.path).startswith(directory)}
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation = self._generation + 1
+            self._files = {}
@@ -1,4 +1,6 @@
-from typing import Dict, Optional, List, Tuple, Union
+import threading
+
+from typing import Dict, Optional, List, Tuple, Union, Callable
 
 from src.model.entity.NodePlayerGroup import NodePlayerGroup
 from src.util.utils import slugify, slugify_next
@@ -17,25 +19,30 @@ class NodePlayerGroupManager(ModelManager):
         "name CHAR(255)",
         "slug CHAR(255)",
         "playlist_id INTEGER",
+        "transcoding_profile CHAR(30)",
         "created_by CHAR(255)",
         "updated_by CHAR(255)",
         "created_at INTEGER",
         "updated_at INTEGER"
     ]
+    TABLE_INDEXES = [
+        "slug",
+        "playlist_id"
+    ]
 
-    def __init__(self, lang_manager: LangManager, database_manager: DatabaseManager, user_manager: UserManager, variable_manager: VariableManager):
+    def __init__(self, lang_manager: LangManager, database_manager: DatabaseManager, user_manager: UserManager, variable_manager: VariableManager, on_change: Optional[Callable] = None):
         super().__init__(lang_manager, database_manager, user_manager, variable_manager)
-        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL)
+        self._on_change = on_change
+        self._lock = threading.Lock()
+        self._host_map = None
+        self._host_map_generation = 0
+        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL, self.TABLE_INDEXES)
+        self.user_manager.backfill_user_trackers(self.TABLE_NAME)
 
     def hydrate_object(self, raw_node_player_group: dict, id: Optional[int] = None) -> NodePlayerGroup:
         if id:
             raw_node_player_group['id'] = id
 
-        [raw_node_player_group, user_tracker_edits] = self.user_manager.initialize_user_trackers(raw_node_player_group)
-
-        if len(user_tracker_edits) > 0:
-            self._db.update_by_id(self.TABLE_NAME, raw_node_player_group['id'], user_tracker_edits)
-
         return NodePlayerGroup(**raw_node_player_group)
 
     def hydrate_list(self, raw_node_player_groups: list) -> List[NodePlayerGroup]:
@@ -101,6 +108,37 @@ class NodePlayerGroupManager(ModelManager):
         for node_player_group_id, edits in edits_node_player_groups.items():
             self._db.update_by_id(self.TABLE_NAME, node_player_group_id, edits)
 
+    def get_playlist_id_by_host(self, host: str) -> Optional[int]:
+        node_player = self.get_node_player_by_host(host)
+
+        return node_player['playlist_id'] if node_player else None
+
+    def get_node_player_by_host(self, host: str) -> Optional[Dict]:
+        host_map = self._host_map
+
+        if host_map is None:
+            generation = self._host_map_generation
+            host_map = self.prepare_host_map()
+
+            with self._lock:
+                if generation == self._host_map_generation:
+                    self._host_map = host_map
+
+        return host_map.get(host)
+
+    def prepare_host_map(self) -> Dict[str, Dict]:
+        rows = self._db.execute_read_query("SELECT node_player.host, node_player.operating_system, node_player_group.playlist_id, node_player_group.transcoding_profile FROM {} node_player LEFT JOIN {} node_player_group ON node_player_group.id = node_player.group_id".format(
+            NodePlayerManager.TABLE_NAME,
+            self.TABLE_NAME
+        ))
+
+        return {row['host']: row for row in rows}
+
+    def invalidate_host_map(self) -> None:
+        with self._lock:
+            self._host_map_generation = self._host_map_generation + 1
+            self._host_map = None
+
     def get_available_slug(self, slug) -> str:
         known_group = {"slug": slug}
         next_slug = slug
@@ -137,15 +175,22 @@ class NodePlayerGroupManager(ModelManager):
         return node_player_group_id
 
     def post_add(self, node_player_group_id: str) -> str:
+        self.notify_change()
         return node_player_group_id
 
     def post_update(self, node_player_group_id: str) -> str:
+        self.notify_change()
         return node_player_group_id
 
     def post_delete(self, node_player_group_id: str) -> str:
+        self.notify_change()
         return node_player_group_id
 
-    def update_form(self, id: int, name: str, playlist_id: Optional[int]) -> None:
+    def notify_change(self) -> None:
+        if self._on_change:
+            self._on_change()
+
+    def update_form(self, id: int, name: str, playlist_id: Optional[int], transcoding_profile: Optional[str] = None) -> None:
         node_player_group = self.get(id)
 
         if not node_player_group:
@@ -156,22 +201,27 @@ class NodePlayerGroupManager(ModelManager):
             "playlist_id": playlist_id if playlist_id else node_player_group.playlist_id
         }
 
+        if transcoding_profile is not None:
+            form["transcoding_profile"] = transcoding_profile if transcoding_profile else None
+
         self._db.update_by_id(self.TABLE_NAME, id, self.pre_update(form))
         self.post_update(id)
 
-    def add_form(self, node_player_group: Union[NodePlayerGroup, Dict]) -> NodePlayerGroup:
+    def add_form(self, node_player_group: Union[NodePlayerGroup, Dict]) -> Optional[NodePlayerGroup]:
         form = node_player_group
 
         if not isinstance(node_player_group, dict):
             form = node_player_group.to_dict()
             del form['id']
 
-        self._db.add(self.TABLE_NAME, self.pre_add(form))
-        node_player_group = self.get_one_by(query="slug = ?", values={
-            "slug": form["slug"]
-        })
-        self.post_add(node_player_group.id)
-        return node_player_group
+        form = self.pre_add(form)
+        id = self._db.add(self.TABLE_NAME, form)
+
+        if not id:
+            return None
+
+        self.post_add(id)
+        return self.hydrate_object(form, id)
 
     def delete(self, id: int) -> None:
         node_player_group = self.get(id)
@@ -1,4 +1,4 @@
-from typing import Dict, Optional, List, Tuple, Union
+from typing import Dict, Optional, List, Tuple, Union, Callable
 
 from src.model.entity.NodePlayer import NodePlayer
 from src.model.enum.OperatingSystem import OperatingSystem
@@ -23,20 +23,22 @@ class NodePlayerManager(ModelManager):
         "created_at INTEGER",
         "updated_at INTEGER"
     ]
+    TABLE_INDEXES = [
+        "host",
+        "group_id",
+        "folder_id"
+    ]
 
-    def __init__(self, lang_manager: LangManager, database_manager: DatabaseManager, user_manager: UserManager, variable_manager: VariableManager):
+    def __init__(self, lang_manager: LangManager, database_manager: DatabaseManager, user_manager: UserManager, variable_manager: VariableManager, on_change: Optional[Callable] = None):
         super().__init__(lang_manager, database_manager, user_manager, variable_manager)
-        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL)
+        self._on_change = on_change
+        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL, self.TABLE_INDEXES)
+        self.user_manager.backfill_user_trackers(self.TABLE_NAME)
 
     def hydrate_object(self, raw_node_player: dict, id: Optional[int] = None) -> NodePlayer:
         if id:
             raw_node_player['id'] = id
 
-        [raw_node_player, user_tracker_edits] = self.user_manager.initialize_user_trackers(raw_node_player)
-
-        if len(user_tracker_edits) > 0:
-            self._db.update_by_id(self.TABLE_NAME, raw_node_player['id'], user_tracker_edits)
-
         return NodePlayer(**raw_node_player)
 
     def hydrate_list(self, raw_node_players: list) -> List[NodePlayer]:
@@ -46,11 +48,11 @@ class NodePlayerManager(ModelManager):
         object = self._db.get_by_id(self.TABLE_NAME, id)
         return self.hydrate_object(object, id) if object else None
 
-    def get_by(self, query, sort: Optional[str] = None, ascending=False) -> List[NodePlayer]:
-        return self.hydrate_list(self._db.get_by_query(self.TABLE_NAME, query=query, sort=sort, ascending=ascending))
+    def get_by(self, query, sort: Optional[str] = None, ascending=False, values: dict = {}) -> List[NodePlayer]:
+        return self.hydrate_list(self._db.get_by_query(self.TABLE_NAME, query=query, sort=sort, ascending=ascending, values=values))
 
-    def get_one_by(self, query) -> Optional[NodePlayer]:
-        object = self._db.get_one_by_query(self.TABLE_NAME, query=query)
+    def get_one_by(self, query, values: dict = {}) -> Optional[NodePlayer]:
+        object = self._db.get_one_by_query(self.TABLE_NAME, query=query, values=values)
 
         if not object:
             return None
@@ -82,15 +84,17 @@ class NodePlayerManager(ModelManager):
             self._db.update_by_id(self.TABLE_NAME, node_player_id, edits)
 
     def get_node_players(self, group_id: Optional[int] = None, folder_id: Optional[int] = None, sort: Optional[str] = None, ascending=False) -> List[NodePlayer]:
-        query = " 1=1 "
+        conditions = {}
 
         if group_id:
-            query = "{} {}".format(query, "AND group_id = {}".format(group_id))
+            conditions["group_id"] = group_id
 
         if folder_id:
-            query = "{} {}".format(query, "AND folder_id = {}".format(folder_id))
+            conditions["folder_id"] = folder_id
+
+        query, values = self._db.build_conditions(conditions)
 
-        return self.get_by(query=query, sort=sort, ascending=ascending)
+        return self.get_by(query=query, sort=sort, ascending=ascending, values=values)
 
     def pre_add(self, node_player: Dict) -> Dict:
         self.user_manager.track_user_on_create(node_player)
@@ -105,14 +109,21 @@ class NodePlayerManager(ModelManager):
         return node_player_id
 
     def post_add(self, node_player_id: str) -> str:
+        self.notify_change()
         return node_player_id
 
     def post_update(self, node_player_id: str) -> str:
+        self.notify_change()
         return node_player_id
 
     def post_delete(self, node_player_id: str) -> str:
+        self.notify_change()
         return node_player_id
 
+    def notify_change(self) -> None:
+        if self._on_change:
+            self._on_change()
+
     def update_form(self, id: int, name: Optional[str] = None, host: Optional[str] = None, operating_system: Optional[OperatingSystem] = None, group_id: Optional[int] = None) -> NodePlayer:
         node_player = self.get(id)
 
@@ -130,15 +141,21 @@ class NodePlayerManager(ModelManager):
         self.post_update(id)
         return self.get(id)
 
-    def add_form(self, node_player: Union[NodePlayer, Dict]) -> None:
+    def add_form(self, node_player: Union[NodePlayer, Dict]) -> Optional[NodePlayer]:
         form = node_player
 
         if not isinstance(node_player, dict):
             form = node_player.to_dict()
             del form['id']
 
-        self._db.add(self.TABLE_NAME, self.pre_add(form))
-        self.post_add(node_player.id)
+        form = self.pre_add(form)
+        id = self._db.add(self.TABLE_NAME, form)
+
+        if not id:
+            return None
+
+        self.post_add(id)
+        return self.hydrate_object(form, id)
 
     def delete(self, id: int) -> None:
         self.pre_delete(id)
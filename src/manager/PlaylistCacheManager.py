@@ -0,0 +1,53 @@
+import threading
+
+from typing import Dict, Optional
+
+from src.model.entity.PlaylistSnapshot import PlaylistSnapshot
+
+
+class PlaylistCacheManager:
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._changed = threading.Condition(self._lock)
+        self._snapshots = {}
+        self._aliases = {}
+        self._generation = 0
+
+    def generation(self) -> int:
+        return self._generation
+
+    def map(self) -> Dict[str, PlaylistSnapshot]:
+        return self._snapshots
+
+    def get(self, key: str) -> Optional[PlaylistSnapshot]:
+        return self._snapshots.get(key)
+
+    def set(self, key: str, snapshot: PlaylistSnapshot, generation: int) -> PlaylistSnapshot:
+        with self._lock:
+            # A write happened while the snapshot was compiled, keep serving it but don't cache it
+            if generation == self._generation:
+                self._snapshots[key] = snapshot
+
+        return snapshot
+
+    def get_alias(self, slug_or_id: str) -> Optional[int]:
+        return self._aliases.get(slug_or_id)
+
+    def set_alias(self, slug_or_id: str, playlist_id: int, generation: int) -> int:
+        with self._lock:
+            if generation == self._generation:
+                self._aliases[slug_or_id] = playlist_id
+
+        return playlist_id
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._generation = self._generation + 1
+            self._snapshots = {}
+            self._aliases = {}
+            self._changed.notify_all()
+
+    def wait_for_change(self, generation: int, timeout: Optional[float] = None) -> bool:
+        with self._lock:
+            return self._changed.wait_for(lambda: self._generation != generation, timeout=timeout)
@@ -1,9 +1,8 @@
 import os
 
-from typing import Dict, Optional, List, Tuple, Union
+from typing import Dict, Optional, List, Tuple, Union, Callable
 
 from src.model.entity.Playlist import Playlist
-from src.model.enum.ContentType import ContentType
 from src.util.utils import get_optional_string, get_yt_video_id, slugify, slugify_next
 from src.manager.DatabaseManager import DatabaseManager
 from src.manager.SlideManager import SlideManager
@@ -23,31 +22,50 @@ class PlaylistManager(ModelManager):
         "enabled INTEGER DEFAULT 0",
         "fallback INTEGER DEFAULT 0",
         "time_sync INTEGER DEFAULT 1",
+        "duration FLOAT DEFAULT 0",
+        "slides_count INTEGER DEFAULT 0",
         "created_by CHAR(255)",
         "updated_by CHAR(255)",
         "created_at INTEGER",
         "updated_at INTEGER"
     ]
-
-    def __init__(self, lang_manager: LangManager, database_manager: DatabaseManager, user_manager: UserManager, variable_manager: VariableManager):
+    TABLE_INDEXES = [
+        "slug",
+        "fallback"
+    ]
+    RAW_COLUMNS = ["id", "name", "slug", "enabled", "fallback", "time_sync", "duration", "slides_count", "created_by", "updated_by", "created_at", "updated_at"]
+    RAW_CASTS = {
+        "enabled": bool,
+        "fallback": bool,
+        "time_sync": bool,
+        "created_at": int,
+        "updated_at": int
+    }
+
+    def __init__(self, lang_manager: LangManager, database_manager: DatabaseManager, user_manager: UserManager, variable_manager: VariableManager, on_change: Optional[Callable] = None):
         super().__init__(lang_manager, database_manager, user_manager, variable_manager)
-        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL)
+        self._on_change = on_change
+        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL, self.TABLE_INDEXES)
+        self.user_manager.backfill_user_trackers(self.TABLE_NAME)
+        self._db.set_triggers(self.TABLE_NAME, self.get_aggregate_triggers())
+        self._db.execute_write_query(self.get_aggregates_query("1=1"))
         self.check_and_set_fallback()
 
     def hydrate_object(self, raw_playlist: dict, id: int = None) -> Playlist:
         if id:
             raw_playlist['id'] = id
 
-        [raw_playlist, user_tracker_edits] = self.user_manager.initialize_user_trackers(raw_playlist)
-
-        if len(user_tracker_edits) > 0:
-            self._db.update_by_id(self.TABLE_NAME, raw_playlist['id'], user_tracker_edits)
-
         return Playlist(**raw_playlist)
 
     def hydrate_list(self, raw_playlists: list) -> List[Playlist]:
         return [self.hydrate_object(raw_playlist) for raw_playlist in raw_playlists]
 
+    def hydrate_rows(self, columns: List[str], rows: List[tuple]) -> List[Playlist]:
+        return self._db.hydrate_rows(Playlist, columns, rows)
+
+    def serialize_rows(self, columns: List[str], rows: List[tuple]) -> List[Dict]:
+        return self._db.serialize_rows(columns, rows, casts=self.RAW_CASTS)
+
     def get(self, id: Optional[int]) -> Optional[Playlist]:
         if not id:
             return None
@@ -56,7 +74,7 @@ class PlaylistManager(ModelManager):
         return self.hydrate_object(object, id) if object else None
 
     def get_by(self, query, sort: Optional[str] = None, values: dict = {}) -> List[Playlist]:
-        return self.hydrate_list(self._db.get_by_query(self.TABLE_NAME, query=query, sort=sort, values=values))
+        return self.hydrate_rows(*self._db.get_rows_by_query(self.TABLE_NAME, query=query, sort=sort, values=values))
 
     def get_one_by(self, query, values: dict = {}, sort: Optional[str] = None, ascending=True, limit: Optional[int] = None) -> Optional[Playlist]:
         object = self._db.get_one_by_query(self.TABLE_NAME, query=query, values=values, sort=sort, ascending=ascending, limit=limit)
@@ -66,38 +84,54 @@ class PlaylistManager(ModelManager):
 
         return self.hydrate_object(object)
 
+    def get_aggregates_query(self, condition: str) -> str:
+        return """UPDATE {playlist} SET
+    duration = COALESCE((
+        SELECT ROUND(SUM(CASE WHEN s.delegate_duration = 1 THEN c.duration ELSE s.duration END))
+        FROM {slides} s
+        LEFT JOIN {content} c ON c.id = s.content_id
+        WHERE s.playlist_id = {playlist}.id AND s.cron_schedule IS NULL AND s.enabled IS TRUE
+    ), 0),
+    slides_count = (SELECT COUNT(*) FROM {slides} s WHERE s.playlist_id = {playlist}.id)
+WHERE {condition};""".format(
+            playlist=self.TABLE_NAME,
+            slides=SlideManager.TABLE_NAME,
+            content=ContentManager.TABLE_NAME,
+            condition=condition
+        )
+
+    def get_aggregate_triggers(self) -> Dict[str, str]:
+        slides = SlideManager.TABLE_NAME
+        content = ContentManager.TABLE_NAME
+        events = {
+            "slides_insert": ("AFTER INSERT ON {}".format(slides), "id = NEW.playlist_id"),
+            "slides_update": ("AFTER UPDATE OF playlist_id, content_id, duration, delegate_duration, enabled, cron_schedule ON {}".format(slides), "id IN (OLD.playlist_id, NEW.playlist_id)"),
+            "slides_delete": ("AFTER DELETE ON {}".format(slides), "id = OLD.playlist_id"),
+            "content_update": ("AFTER UPDATE OF duration ON {}".format(content), "id IN (SELECT playlist_id FROM {} WHERE content_id = NEW.id)".format(slides)),
+            "content_delete": ("AFTER DELETE ON {}".format(content), "id IN (SELECT playlist_id FROM {} WHERE content_id = OLD.id)".format(slides)),
+        }
+
+        return {name: "{} BEGIN\n{}\nEND".format(event, self.get_aggregates_query(condition)) for name, (event, condition) in events.items()}
+
     def get_durations_by_playlists(self, playlist_id: Optional[int] = None):
-        durations = self._db.execute_read_query("""
-SELECT
-    playlist_id,
-    ROUND(SUM(CASE
-        WHEN s.delegate_duration = 1 THEN c.duration
-        WHEN c.type = '{}' THEN s.duration
-        ELSE s.duration
-    END)) AS total_duration
-FROM {} s
-LEFT JOIN {} c ON c.id = s.content_id
-WHERE cron_schedule IS NULL {} AND s.enabled is TRUE
-GROUP BY playlist_id;
-""".format(
-            ContentType.EXTERNAL_STORAGE.value,
-            SlideManager.TABLE_NAME,
-            ContentManager.TABLE_NAME,
-            "{}".format(
-                " AND playlist_id = {}".format(playlist_id) if playlist_id else ""
-            )
-        ))
-        map = {}
-        for duration in durations:
-            map[duration['playlist_id']] = duration['total_duration']
+        columns, rows = self._db.get_rows_by_query(
+            self.TABLE_NAME,
+            query="id = ?" if playlist_id else "1=1",
+            values={"id": playlist_id} if playlist_id else {},
+            columns=["id", "duration"]
+        )
+        durations = dict(rows)
 
         if playlist_id:
-            return map[playlist_id] if playlist_id in map else 0
+            return durations[playlist_id] if playlist_id in durations else 0
 
-        return map
+        return durations
 
     def get_all(self, sort: Optional[str] = 'created_at', ascending=False) -> List[Playlist]:
-        return self.hydrate_list(self._db.get_all(self.TABLE_NAME, sort=sort, ascending=ascending))
+        return self.hydrate_rows(*self._db.get_rows_by_query(self.TABLE_NAME, sort=sort, ascending=ascending))
+
+    def get_raw_all(self, sort: Optional[str] = 'created_at', ascending=False) -> List[Dict]:
+        return self.serialize_rows(*self._db.get_rows_by_query(self.TABLE_NAME, sort=sort, ascending=ascending, columns=self.RAW_COLUMNS))
 
     def get_all_labels_indexed(self) -> Dict:
         index = {}
@@ -152,15 +186,22 @@ GROUP BY playlist_id;
         return playlist_id
 
     def post_add(self, playlist_id: str) -> str:
+        self.notify_change()
         return playlist_id
 
     def post_update(self, playlist_id: str) -> str:
+        self.notify_change()
         return playlist_id
 
     def post_updates(self):
-        pass
+        self.notify_change()
+
+    def notify_change(self) -> None:
+        if self._on_change:
+            self._on_change()
 
     def post_delete(self, playlist_id: str) -> str:
+        self.notify_change()
         return playlist_id
 
     def update_form(self, id: int, name: Optional[str] = None, time_sync: Optional[bool] = None, enabled: Optional[bool] = None) -> None:
@@ -197,19 +238,23 @@ GROUP BY playlist_id;
         else:
             self._db.execute_write_query(query="UPDATE {} set fallback = 1 WHERE id = ?".format(self.TABLE_NAME), params=(playlist_id,))
 
-    def add_form(self, playlist: Union[Playlist, Dict]) -> Playlist:
+        self.post_updates()
+
+    def add_form(self, playlist: Union[Playlist, Dict]) -> Optional[Playlist]:
         form = playlist
 
         if not isinstance(playlist, dict):
             form = playlist.to_dict()
             del form['id']
 
-        self._db.add(self.TABLE_NAME, self.pre_add(form))
-        playlist = self.get_one_by(query="slug = ?", values={
-            "slug": form["slug"]
-        })
-        self.post_add(playlist.id)
-        return playlist
+        form = self.pre_add(form)
+        id = self._db.add(self.TABLE_NAME, form)
+
+        if not id:
+            return None
+
+        self.post_add(id)
+        return self.hydrate_object(form, id)
 
     def delete(self, id: int) -> None:
         playlist = self.get(id)
@@ -1,6 +1,6 @@
 import os
 
-from typing import Dict, Optional, List, Tuple, Union
+from typing import Dict, Optional, List, Tuple, Union, Callable
 
 from src.model.entity.Slide import Slide
 from src.model.entity.Playlist import Playlist
@@ -31,34 +31,50 @@ class SlideManager(ModelManager):
         "created_at INTEGER",
         "updated_at INTEGER"
     ]
-
-    def __init__(self, lang_manager: LangManager, database_manager: DatabaseManager, user_manager: UserManager, variable_manager: VariableManager):
+    TABLE_INDEXES = [
+        "playlist_id, position",
+        "content_id",
+        "UNIQUE uuid"
+    ]
+    RAW_COLUMNS = ["id", "uuid", "enabled", "is_notification", "position", "duration", "delegate_duration", "created_by", "updated_by", "created_at", "updated_at", "playlist_id", "content_id", "cron_schedule", "cron_schedule_end"]
+    RAW_CASTS = {
+        "enabled": bool,
+        "is_notification": bool,
+        "duration": lambda duration: duration if duration and int(duration) >= 0 else 0,
+        "created_at": int,
+        "updated_at": int
+    }
+
+    def __init__(self, lang_manager: LangManager, database_manager: DatabaseManager, user_manager: UserManager, variable_manager: VariableManager, on_change: Optional[Callable] = None):
         super().__init__(lang_manager, database_manager, user_manager, variable_manager)
-        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL)
+        self._on_change = on_change
+        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL, self.TABLE_INDEXES)
+        self.user_manager.backfill_user_trackers(self.TABLE_NAME)
 
     def hydrate_object(self, raw_slide: dict, id: int = None) -> Slide:
         if id:
             raw_slide['id'] = id
 
-        [raw_slide, user_tracker_edits] = self.user_manager.initialize_user_trackers(raw_slide)
-
-        if len(user_tracker_edits) > 0:
-            self._db.update_by_id(self.TABLE_NAME, raw_slide['id'], user_tracker_edits)
-
         return Slide(**raw_slide)
 
     def hydrate_list(self, raw_slides: list) -> List[Slide]:
         return [self.hydrate_object(raw_slide) for raw_slide in raw_slides]
 
+    def hydrate_rows(self, columns: List[str], rows: List[tuple]) -> List[Slide]:
+        return self._db.hydrate_rows(Slide, columns, rows)
+
+    def serialize_rows(self, columns: List[str], rows: List[tuple]) -> List[Dict]:
+        return self._db.serialize_rows(columns, rows, casts=self.RAW_CASTS)
+
     def get(self, id: int) -> Optional[Slide]:
         object = self._db.get_by_id(self.TABLE_NAME, id)
         return self.hydrate_object(object, id) if object else None
 
-    def get_by(self, query, sort: Optional[str] = None) -> List[Slide]:
-        return self.hydrate_list(self._db.get_by_query(self.TABLE_NAME, query=query, sort=sort))
+    def get_by(self, query, sort: Optional[str] = None, values: dict = {}) -> List[Slide]:
+        return self.hydrate_rows(*self._db.get_rows_by_query(self.TABLE_NAME, query=query, sort=sort, values=values))
 
-    def get_one_by(self, query) -> Optional[Slide]:
-        object = self._db.get_one_by_query(self.TABLE_NAME, query=query)
+    def get_one_by(self, query, values: dict = {}) -> Optional[Slide]:
+        object = self._db.get_one_by_query(self.TABLE_NAME, query=query, values=values)
 
         if not object:
             return None
@@ -66,7 +82,7 @@ class SlideManager(ModelManager):
         return self.hydrate_object(object)
 
     def get_all(self, sort: bool = False) -> List[Slide]:
-        return self.hydrate_list(self._db.get_all(self.TABLE_NAME, sort="position" if sort else None))
+        return self.hydrate_rows(*self._db.get_rows_by_query(self.TABLE_NAME, sort="position" if sort else None))
 
     def get_all_indexed(self, attribute: str = 'id', multiple=False) -> Dict[str, Slide]:
         index = {}
@@ -89,25 +105,34 @@ class SlideManager(ModelManager):
         for slide_id, edits in edits_slides.items():
             self._db.update_by_id(self.TABLE_NAME, slide_id, edits)
 
+        self.post_updates()
+
     def get_slides(self, playlist_id: Optional[int] = None, content_id: Optional[int] = None, enabled: Optional[bool] = None, is_notification: Optional[bool] = None) -> List[Slide]:
-        query = " 1=1 "
+        query, values = self.get_slides_query(playlist_id=playlist_id, content_id=content_id, enabled=enabled, is_notification=is_notification)
+
+        return self.get_by(query=query, sort="position", values=values)
+
+    def get_raw_slides(self, playlist_id: Optional[int] = None, content_id: Optional[int] = None, enabled: Optional[bool] = None, is_notification: Optional[bool] = None) -> List[Dict]:
+        query, values = self.get_slides_query(playlist_id=playlist_id, content_id=content_id, enabled=enabled, is_notification=is_notification)
+
+        return self.serialize_rows(*self._db.get_rows_by_query(self.TABLE_NAME, query=query, sort="position", values=values, columns=self.RAW_COLUMNS))
+
+    def get_slides_query(self, playlist_id: Optional[int] = None, content_id: Optional[int] = None, enabled: Optional[bool] = None, is_notification: Optional[bool] = None) -> Tuple[str, Dict]:
+        conditions = {}
 
         if enabled is not None:
-            query = "{} AND enabled = {} ".format(query, "1" if enabled else "0")
+            conditions["enabled"] = 1 if enabled else 0
 
         if is_notification is not None:
-            query = "{} AND is_notification = {} ".format(query, "1" if is_notification else "0")
+            conditions["is_notification"] = 1 if is_notification else 0
 
         if playlist_id:
-            query = "{} {}".format(query, "AND playlist_id = {}".format(playlist_id))
+            conditions["playlist_id"] = playlist_id
 
         if content_id:
-            if isinstance(content_id, bool):
-                query = "{} {}".format(query, "AND content_id IS NOT NULL")
-            else:
-                query = "{} {}".format(query, "AND content_id = {}".format(content_id))
+            conditions["content_id"] = self._db.NOT_NULL if isinstance(content_id, bool) else content_id
 
-        return self.get_by(query=query, sort="position")
+        return self._db.build_conditions(conditions)
 
     def pre_add(self, slide: Dict) -> Dict:
         self.user_manager.track_user_on_create(slide)
@@ -122,20 +147,27 @@ class SlideManager(ModelManager):
         return slide_id
 
     def post_add(self, slide_id: str) -> str:
+        self.notify_change()
         return slide_id
 
     def post_update(self, slide_id: str) -> str:
+        self.notify_change()
         return slide_id
 
     def post_updates(self):
-        pass
+        self.notify_change()
+
+    def notify_change(self) -> None:
+        if self._on_change:
+            self._on_change()
 
     def post_delete(self, slide_id: str) -> str:
+        self.notify_change()
         return slide_id
         
-    def update_positions(self, positions: list) -> None:
-        for slide_id, slide_position in positions.items():
-            self._db.update_by_id(self.TABLE_NAME, slide_id, {"position": slide_position})
+    def update_positions(self, positions: dict) -> None:
+        self._db.bulk_update(self.TABLE_NAME, {slide_id: {"position": slide_position} for slide_id, slide_position in positions.items()})
+        self.post_updates()
 
     def update_form(self, id: int, duration: Optional[int] = None, content_id: Optional[int] = None, delegate_duration: Optional[bool] = None, is_notification: Optional[bool] = None, cron_schedule: Optional[str] = '', cron_schedule_end: Optional[str] = '', enabled: Optional[bool] = None, position: Optional[int] = None) -> Optional[Slide]:
         slide = self.get(id)
@@ -158,16 +190,21 @@ class SlideManager(ModelManager):
         self.post_update(id)
         return self.get(id)
 
-    def add_form(self, slide: Union[Slide, Dict]) -> Slide:
+    def add_form(self, slide: Union[Slide, Dict]) -> Optional[Slide]:
         form = slide
 
         if not isinstance(slide, dict):
             form = slide.to_dict()
             del form['id']
 
-        self._db.add(self.TABLE_NAME, self.pre_add(form))
-        self.post_add(slide.id)
-        return self.get_one_by(query="uuid = '{}'".format(slide.uuid))
+        form = self.pre_add(form)
+        id = self._db.add(self.TABLE_NAME, form)
+
+        if not id:
+            return None
+
+        self.post_add(id)
+        return self.hydrate_object(form, id)
 
     def delete(self, id: int) -> None:
         slide = self.get(id)
@@ -0,0 +1,174 @@
+import io
+import os
+import uuid
+import hashlib
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor, Future, TimeoutError
+from typing import Optional, Dict
+
+from PIL import Image, ImageOps
+
+from src.manager.ConfigManager import ConfigManager
+from src.util.UtilVideo import get_video_frame_with_ffmpeg
+
+
+class ThumbnailManager:
+
+    THUMBNAIL_SIZE = (320, 320)
+    THUMBNAIL_QUALITY = 75
+    VIDEO_FRAME_POSITION = 1.0
+    EVICT_RATIO = 0.8
+    FRAME_TIMEOUT = 30
+
+    def __init__(self, config_manager: ConfigManager, thumbnail_dir: str):
+        self._config_manager = config_manager
+        self._thumbnail_dir = thumbnail_dir
+        self._max_size = int(self._config_manager.map().get('thumbnail_cache_size')) * 1024 * 1024
+        self._lock = threading.Lock()
+        self._futures: Dict[str, Future] = {}
+        self._total_size = None
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, int(self._config_manager.map().get('thumbnail_workers'))),
+            thread_name_prefix='thumbnail'
+        )
+
+    def get_thumbnail_path(self, path: str) -> Optional[str]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        digest = hashlib.sha256("{}|{}|{}".format(os.path.abspath(path), stat.st_size, stat.st_mtime).encode()).hexdigest()
+
+        return os.path.join(self._thumbnail_dir, digest[:2], "{}.webp".format(digest))
+
+    def get(self, path: str, is_video: bool = False, timeout: Optional[float] = None) -> Optional[str]:
+        thumbnail_path = self.get_thumbnail_path(path)
+
+        if not thumbnail_path:
+            return None
+
+        if os.path.exists(thumbnail_path):
+            return thumbnail_path
+
+        try:
+            return self.submit(path, is_video).result(timeout=timeout)
+        except TimeoutError:
+            return None
+
+    def submit(self, path: str, is_video: bool = False) -> Future:
+        thumbnail_path = self.get_thumbnail_path(path)
+
+        with self._lock:
+            future = self._futures.get(thumbnail_path)
+            created = future is None
+
+            if created:
+                future = self._executor.submit(self._build, path, thumbnail_path, is_video)
+                self._futures[thumbnail_path] = future
+
+        if created:
+            future.add_done_callback(lambda done: self._forget(thumbnail_path))
+
+        return future
+
+    def _forget(self, thumbnail_path: str) -> None:
+        with self._lock:
+            self._futures.pop(thumbnail_path, None)
+
+    def _build(self, path: str, thumbnail_path: Optional[str], is_video: bool) -> Optional[str]:
+        if not thumbnail_path:
+            return None
+
+        if os.path.exists(thumbnail_path):
+            return thumbnail_path
+
+        tmp_path = "{}.{}.tmp".format(thumbnail_path, uuid.uuid4().hex)
+
+        try:
+            source = path
+
+            if is_video:
+                frame = get_video_frame_with_ffmpeg(
+                    path,
+                    position=self.VIDEO_FRAME_POSITION,
+                    width=self.THUMBNAIL_SIZE[0] * 2,
+                    ffmpeg=self._config_manager.map().get('ffmpeg_path'),
+                    timeout=self.FRAME_TIMEOUT
+                )
+
+                if not frame:
+                    return None
+
+                source = io.BytesIO(frame)
+
+            os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+
+            with Image.open(source) as image:
+                image.draft('RGB', self.THUMBNAIL_SIZE)
+                image = ImageOps.exif_transpose(image)
+                image = image.convert('RGBA' if image.mode in ('RGBA', 'LA', 'PA', 'P') else 'RGB')
+                image.thumbnail(self.THUMBNAIL_SIZE, Image.LANCZOS)
+                image.save(tmp_path, format='WEBP', quality=self.THUMBNAIL_QUALITY)
+
+            os.replace(tmp_path, thumbnail_path)
+        except Exception as e:
+            logging.warning("Can't build thumbnail of '{}': {}".format(path, e))
+
+            try:
+                os.unlink(tmp_path)
+            except FileNotFoundError:
+                pass
+
+            return None
+
+        self._track(os.path.getsize(thumbnail_path))
+
+        return thumbnail_path
+
+    def _track(self, size: int) -> None:
+        with self._lock:
+            if self._total_size is None:
+                self._total_size = self._get_cache_size()
+            else:
+                self._total_size = self._total_size + size
+
+            if self._total_size > self._max_size:
+                self._total_size = self._evict(int(self._max_size * self.EVICT_RATIO))
+
+    def _get_cache_size(self) -> int:
+        return sum(entry.stat().st_size for entry in self._scan())
+
+    def _evict(self, target_size: int) -> int:
+        entries = [(max(entry.stat().st_atime, entry.stat().st_mtime), entry.stat().st_size, entry.path) for entry in self._scan()]
+        total_size = sum(size for _, size, _ in entries)
+
+        # Least recently read first, as far as the filesystem keeps access times
+        for _, size, path in sorted(entries):
+            if total_size <= target_size:
+                break
+
+            try:
+                os.unlink(path)
+                total_size = total_size - size
+            except FileNotFoundError:
+                pass
+
+        logging.info("Thumbnail cache evicted down to {} bytes".format(total_size))
+
+        return total_size
+
+    def _scan(self):
+        if not os.path.isdir(self._thumbnail_dir):
+            return
+
+        for shard in os.scandir(self._thumbnail_dir):
+            if shard.is_dir():
+                for entry in os.scandir(shard.path):
+                    if entry.is_file() and entry.name.endswith('.webp'):
+                        yield entry
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,129 @@
+import os
+import uuid
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable, List
+
+from src.manager.ConfigManager import ConfigManager
+from src.model.enum.OperatingSystem import OperatingSystem
+from src.model.enum.TranscodingProfile import TranscodingProfile
+from src.util.UtilVideo import transcode_video_with_ffmpeg
+from src.util.utils import str_to_enum
+
+
+class TranscodeManager:
+
+    TRANSCODE_DIR = '.transcodes'
+    TRANSCODE_TIMEOUT = 3600
+
+    def __init__(self, config_manager: ConfigManager, on_transcode: Callable[[str, TranscodingProfile, Optional[str]], None]):
+        self._config_manager = config_manager
+        self._on_transcode = on_transcode
+        self._lock = threading.Lock()
+        self._queued = set()
+        self._profiles = self.parse_profiles(self._config_manager.map().get('transcoding_profiles'))
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, int(self._config_manager.map().get('transcode_workers'))),
+            thread_name_prefix='transcode'
+        )
+
+    @staticmethod
+    def parse_profiles(value) -> List[TranscodingProfile]:
+        profiles = []
+
+        for name in (value.split(',') if isinstance(value, str) else []):
+            name = name.strip()
+
+            if not name:
+                continue
+
+            try:
+                profile = str_to_enum(name, TranscodingProfile)
+            except ValueError:
+                logging.warning("Unknown transcoding profile '{}'".format(name))
+                continue
+
+            if profile != TranscodingProfile.ORIGINAL and profile not in profiles:
+                profiles.append(profile)
+
+        return profiles
+
+    def get_profiles(self) -> List[TranscodingProfile]:
+        return self._profiles
+
+    def is_enabled(self) -> bool:
+        return len(self._profiles) > 0
+
+    def select_profile(self, profile: Optional[str] = None, operating_system: Optional[str] = None) -> Optional[TranscodingProfile]:
+        if not self._profiles:
+            return None
+
+        try:
+            if profile:
+                selected = str_to_enum(profile, TranscodingProfile)
+            else:
+                selected = TranscodingProfile.get_default_for_operating_system(str_to_enum(operating_system, OperatingSystem) if operating_system else None)
+        except ValueError:
+            return None
+
+        return selected if selected in self._profiles else None
+
+    def get_transcode_location(self, location: str, profile: TranscodingProfile) -> str:
+        filename, _ = os.path.splitext(os.path.basename(location))
+
+        return os.path.join(os.path.dirname(location), self.TRANSCODE_DIR, "{}-{}.mp4".format(filename, profile.value))
+
+    def submit(self, location: str, profile: TranscodingProfile) -> None:
+        key = (location, profile)
+
+        with self._lock:
+            # Contents sharing the same stored file share its transcodes too
+            if key in self._queued:
+                return
+
+            self._queued.add(key)
+
+        self._executor.submit(self._transcode, location, profile)
+
+    def pending(self) -> int:
+        return len(self._queued)
+
+    def _transcode(self, location: str, profile: TranscodingProfile) -> None:
+        transcode_location = self.get_transcode_location(location, profile)
+        tmp_location = "{}.{}.tmp".format(transcode_location, uuid.uuid4().hex)
+
+        try:
+            os.makedirs(os.path.dirname(transcode_location), exist_ok=True)
+
+            if os.path.exists(transcode_location):
+                pass
+            elif transcode_video_with_ffmpeg(
+                location,
+                tmp_location,
+                TranscodingProfile.get_ffmpeg_args(profile),
+                ffmpeg=self._config_manager.map().get('ffmpeg_path'),
+                timeout=self.TRANSCODE_TIMEOUT
+            ):
+                os.replace(tmp_location, transcode_location)
+            else:
+                transcode_location = None
+        except Exception as e:
+            logging.error("Transcode {} failed for video '{}': {}".format(profile.value, location, e))
+            transcode_location = None
+
+        if not transcode_location:
+            try:
+                os.unlink(tmp_location)
+            except FileNotFoundError:
+                pass
+
+        try:
+            self._on_transcode(location, profile, transcode_location)
+        finally:
+            with self._lock:
+                self._queued.discard((location, profile))
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,215 @@
+import os
+import re
+import json
+import time
+import uuid
+import base64
+import shutil
+import hashlib
+import logging
+import threading
+
+from contextlib import contextmanager
+from typing import Optional, BinaryIO, Tuple, Callable
+
+from src.model.entity.ResumableUpload import ResumableUpload
+from src.model.enum.ContentType import ContentType
+from src.exceptions.UploadNotFoundException import UploadNotFoundException
+from src.exceptions.UploadConflictException import UploadConflictException
+from src.exceptions.UploadChecksumMismatchException import UploadChecksumMismatchException
+from src.exceptions.UploadInvalidException import UploadInvalidException
+from src.util.UtilFile import store_file, get_file_digest
+
+
+class UploadManager:
+
+    PARTIAL_DIR = '.partial'
+    CHUNK_SIZE = 1024 * 1024
+    EXPIRE_AFTER = 86400
+    ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+    CHECKSUM_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._writing = set()
+
+    def get_partial_dir(self, upload_dir: str) -> str:
+        return os.path.join(upload_dir, self.PARTIAL_DIR)
+
+    def get_data_path(self, upload_dir: str, upload_id: str) -> str:
+        return os.path.join(self.get_partial_dir(upload_dir), "{}.part".format(upload_id))
+
+    def get_info_path(self, upload_dir: str, upload_id: str) -> str:
+        return os.path.join(self.get_partial_dir(upload_dir), "{}.json".format(upload_id))
+
+    def create(self, upload_dir: str, filename: str, size: int, checksum: Optional[str] = None, folder_id: Optional[int] = None) -> ResumableUpload:
+        checksum = checksum.strip().lower() if checksum else None
+
+        if not filename or not ContentType.guess_content_type_file(filename):
+            raise UploadInvalidException("Unsupported file type")
+
+        if size is None or int(size) < 0:
+            raise UploadInvalidException("Invalid upload size")
+
+        if checksum and not self.CHECKSUM_PATTERN.match(checksum):
+            raise UploadInvalidException("Checksum must be a sha256 hex digest")
+
+        partial_dir = self.get_partial_dir(upload_dir)
+        os.makedirs(partial_dir, exist_ok=True)
+        self.purge_expired(upload_dir)
+
+        if shutil.disk_usage(partial_dir).free < int(size):
+            raise UploadInvalidException("Not enough disk space for this upload")
+
+        upload = ResumableUpload(id=uuid.uuid4().hex, filename=os.path.basename(filename), size=size, checksum=checksum, folder_id=folder_id)
+
+        open(self.get_data_path(upload_dir, upload.id), 'wb').close()
+
+        with open(self.get_info_path(upload_dir, upload.id), 'w') as file:
+            file.write(upload.to_json())
+
+        return upload
+
+    def get(self, upload_dir: str, upload_id: str) -> Optional[ResumableUpload]:
+        if not self.ID_PATTERN.match(upload_id):
+            return None
+
+        try:
+            with open(self.get_info_path(upload_dir, upload_id), 'r') as file:
+                upload = ResumableUpload(**json.load(file))
+
+            # What reached the disk is the source of truth, an interrupted chunk still counts
+            upload.offset = os.path.getsize(self.get_data_path(upload_dir, upload_id))
+        except (OSError, ValueError, TypeError):
+            return None
+
+        return upload
+
+    def append(self, upload_dir: str, upload_id: str, offset: int, stream: BinaryIO, chunk_checksum: Optional[str] = None) -> ResumableUpload:
+        expected_digest = self.parse_chunk_checksum(chunk_checksum) if chunk_checksum else None
+
+        with self._claim(upload_id):
+            upload = self.get(upload_dir, upload_id)
+
+            if not upload:
+                raise UploadNotFoundException()
+
+            if offset != upload.offset:
+                raise UploadConflictException("Upload offset is {}".format(upload.offset))
+
+            digest = hashlib.sha256()
+
+            with open(self.get_data_path(upload_dir, upload_id), 'r+b') as file:
+                file.seek(offset)
+
+                try:
+                    while True:
+                        data = stream.read(self.CHUNK_SIZE)
+
+                        if not data:
+                            break
+
+                        if file.tell() + len(data) > upload.size:
+                            raise UploadConflictException("Chunk goes past the upload size")
+
+                        file.write(data)
+                        digest.update(data)
+
+                    if expected_digest and digest.digest() != expected_digest:
+                        raise UploadChecksumMismatchException()
+                except Exception as e:
+                    # A checksummed or rejected chunk is all or nothing, a plain one keeps whatever arrived
+                    if expected_digest or isinstance(e, UploadConflictException):
+                        file.truncate(offset)
+                        file.seek(offset)
+                    raise
+                finally:
+                    upload.offset = file.tell()
+
+        return upload
+
+    def finalize(self, upload_dir: str, upload_id: str, store: Callable[[str, str, str, Optional[str]], str] = store_file) -> Tuple[ResumableUpload, str]:
+        with self._claim(upload_id):
+            upload = self.get(upload_dir, upload_id)
+
+            if not upload:
+                raise UploadNotFoundException()
+
+            if not upload.is_complete():
+                raise UploadConflictException("Upload is incomplete, offset is {} of {}".format(upload.offset, upload.size))
+
+            data_path = self.get_data_path(upload_dir, upload_id)
+            digest = get_file_digest(data_path)
+
+            if upload.checksum and digest != upload.checksum:
+                self._discard(upload_dir, upload_id)
+                raise UploadChecksumMismatchException()
+
+            # Same filesystem, the finished file is moved in place and never copied
+            object_path = store(data_path, upload_dir, upload.filename, digest)
+            self._remove(self.get_info_path(upload_dir, upload_id))
+
+        return upload, object_path
+
+    def delete(self, upload_dir: str, upload_id: str) -> None:
+        if not self.ID_PATTERN.match(upload_id):
+            return
+
+        # A chunk being written or a finalize in progress keeps its files
+        with self._claim(upload_id):
+            self._discard(upload_dir, upload_id)
+
+    def _discard(self, upload_dir: str, upload_id: str) -> None:
+        self._remove(self.get_data_path(upload_dir, upload_id))
+        self._remove(self.get_info_path(upload_dir, upload_id))
+
+    def purge_expired(self, upload_dir: str) -> None:
+        partial_dir = self.get_partial_dir(upload_dir)
+        expired_at = time.time() - self.EXPIRE_AFTER
+
+        for entry in os.scandir(partial_dir):
+            upload_id, extension = os.path.splitext(entry.name)
+
+            if upload_id in self._writing:
+                continue
+
+            if (extension == '.part' and entry.stat().st_mtime < expired_at) or (extension == '.json' and not os.path.exists(self.get_data_path(upload_dir, upload_id))):
+                logging.info("Removing expired upload {}".format(upload_id))
+
+                try:
+                    self.delete(upload_dir, upload_id)
+                except UploadConflictException:
+                    pass
+
+    @contextmanager
+    def _claim(self, upload_id: str):
+        with self._lock:
+            if upload_id in self._writing:
+                raise UploadConflictException("Upload is busy with another request")
+
+            self._writing.add(upload_id)
+
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._writing.discard(upload_id)
+
+    @staticmethod
+    def parse_chunk_checksum(chunk_checksum: str) -> bytes:
+        parts = chunk_checksum.split()
+
+        if len(parts) != 2 or parts[0].lower() != 'sha256':
+            raise UploadInvalidException("Chunk checksum must be 'sha256 <base64 digest>'")
+
+        try:
+            return base64.b64decode(parts[1], validate=True)
+        except ValueError:
+            raise UploadInvalidException("Chunk checksum must be 'sha256 <base64 digest>'")
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
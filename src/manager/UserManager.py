@@ -11,6 +11,7 @@ from src.manager.LangManager import LangManager
 
 class UserManager:
 
+    DATA_VERSION_CHECK_INTERVAL = 1
     TABLE_NAME = "user"
     TABLE_MODEL = [
         "username CHAR(255)",
@@ -22,18 +23,38 @@ class UserManager:
         "created_at INTEGER",
         "updated_at INTEGER"
     ]
+    TABLE_INDEXES = [
+        "username",
+        "apikey"
+    ]
 
     def __init__(self, lang_manager: LangManager, database_manager: DatabaseManager, on_user_delete):
         self._on_user_delete = on_user_delete
         self._lang_manager = lang_manager
-        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL)
+        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL, self.TABLE_INDEXES)
+        self.backfill_user_trackers(self.TABLE_NAME)
         self._user_map = {}
+        self._data_version = None
+        self._data_version_checked_at = 0
         self.reload()
 
     def reload(self) -> None:
+        self._data_version = self._db.get_data_version()
         self._user_map = self.prepare_map()
 
+    def sync(self) -> None:
+        now = time.monotonic()
+
+        if now - self._data_version_checked_at < self.DATA_VERSION_CHECK_INTERVAL:
+            return
+
+        self._data_version_checked_at = now
+
+        if self._db.get_data_version() != self._data_version:
+            self.reload()
+
     def map(self) -> dict:
+        self.sync()
         return self._user_map
 
     def prepare_map(self) -> Dict[str, User]:
@@ -52,11 +73,6 @@ class UserManager:
         if id:
             raw_user['id'] = id
 
-        [raw_user, user_tracker_edits] = self.initialize_user_trackers(raw_user)
-
-        if len(user_tracker_edits) > 0:
-            self._db.update_by_id(self.TABLE_NAME, raw_user['id'], user_tracker_edits)
-
         return User(**raw_user)
 
     def hydrate_list(self, raw_users: list) -> List[User]:
@@ -116,7 +132,7 @@ class UserManager:
         except TypeError:
             return User(username=id_or_entity, enabled=False)
 
-        user_map = self.prepare_map()
+        user_map = self.map()
 
         if id_or_entity in user_map:
             return user_map[id_or_entity]
@@ -187,7 +203,7 @@ class UserManager:
         self._db.update_by_id(self.TABLE_NAME, id, self.pre_update(form))
         self.post_update(id)
 
-    def add_form(self, user: Union[User, Dict]) -> None:
+    def add_form(self, user: Union[User, Dict]) -> Optional[User]:
         form = user
 
         if not isinstance(user, dict):
@@ -196,8 +212,14 @@ class UserManager:
 
         form['password'] = self.encode_password(form['password'])
 
-        self._db.add(self.TABLE_NAME, self.pre_add(form))
-        self.post_add(user.id)
+        form = self.pre_add(form)
+        id = self._db.add(self.TABLE_NAME, form)
+
+        if not id:
+            return None
+
+        self.post_add(id)
+        return self.hydrate_object(form, id)
 
     def delete(self, id: int) -> None:
         user = self.get(id)
@@ -213,28 +235,17 @@ class UserManager:
     def encode_password(self, password: str) -> str:
         return hashlib.sha256(password.encode()).hexdigest()
 
-    def initialize_user_trackers(self, object: dict) -> dict:
-        edits = {}
-        user_id = self.get_logged_user("id")
+    def backfill_user_trackers(self, table_name: str) -> None:
         now = time.time()
 
-        if 'created_by' not in object or not object['created_by']:
-            object["created_by"] = user_id
-            edits['created_by'] = object['created_by']
-
-        if 'updated_by' not in object or not object['updated_by']:
-            object["updated_by"] = user_id
-            edits['updated_by'] = object['updated_by']
-
-        if 'created_at' not in object or not object['created_at']:
-            object["created_at"] = now
-            edits['created_at'] = object['created_at']
-
-        if 'updated_at' not in object or not object['updated_at']:
-            object["updated_at"] = now
-            edits['updated_at'] = object['updated_at']
-
-        return [object, edits]
+        self._db.execute_write_query(
+            query="""UPDATE {} SET
+                created_at = COALESCE(NULLIF(NULLIF(created_at, ''), 0), ?),
+                updated_at = COALESCE(NULLIF(NULLIF(updated_at, ''), 0), ?)
+            WHERE created_at IS NULL OR created_at = '' OR created_at = 0
+            OR updated_at IS NULL OR updated_at = '' OR updated_at = 0""".format(table_name),
+            params=(now, now)
+        )
 
     def track_user_on_create(self, object: dict) -> dict:
         object["created_at"] = time.time()
@@ -255,7 +266,7 @@ class UserManager:
         return None
 
     def forget_user_for_entity(self, objects: List, user_id: int) -> Dict:
-        user_map = self.prepare_map()
+        user_map = self.map()
         user_id = int(user_id)
         edits = {}
 
@@ -1,7 +1,9 @@
 import json
 import time
 import math
-from typing import Dict, Optional, List, Tuple, Union
+import threading
+
+from typing import Dict, Optional, List, Tuple, Union, Callable
 
 from src.manager.DatabaseManager import DatabaseManager
 from src.manager.LangManager import LangManager
@@ -25,6 +27,7 @@ SELECTABLE_BOOLEAN = {"1": "✅", "0": "❌"}
 
 class VariableManager:
 
+    DATA_VERSION_CHECK_INTERVAL = 1
     TABLE_NAME = "settings"
     TABLE_MODEL = [
         "description TEXT",
@@ -39,19 +42,77 @@ class VariableManager:
         "refresh_player INTEGER",
         "value TEXT"
     ]
+    TABLE_INDEXES = [
+        "UNIQUE name"
+    ]
 
-    def __init__(self, lang_manager: LangManager, database_manager: DatabaseManager, user_manager: UserManager, config_manager: ConfigManager):
+    def __init__(self, lang_manager: LangManager, database_manager: DatabaseManager, user_manager: UserManager, config_manager: ConfigManager, on_change: Optional[Callable] = None):
+        self._on_change = on_change
         self._lang_manager = lang_manager
         self._user_manager = user_manager
         self._config_manager = config_manager
-        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL)
+        self._db = database_manager.open(self.TABLE_NAME, self.TABLE_MODEL, self.TABLE_INDEXES)
+        self._lock = threading.RLock()
         self._var_map = {}
+        self._missing = frozenset()
+        self._data_version = None
+        self._data_version_checked_at = 0
         self.reload()
 
     def t(self, token) -> Union[Dict, str]:
         return self._lang_manager.translate(token)
 
     def set_variable(self, name: str, value, type: VariableType, editable: bool, description: str, description_edition: str = '', plugin: Optional[None] = None, selectables: Optional[Dict[str, str]] = None, unit: Optional[VariableUnit] = None, section: str = '', refresh_player: bool = False) -> Variable:
+        default_var = self.prepare_variable(name, value, type, editable, description, description_edition, plugin, selectables, unit, section, refresh_player)
+
+        variable = self.get_one_by_name(default_var['name'])
+
+        if not variable:
+            self.add_form(default_var)
+            return self.refresh(default_var['name'])
+
+        changes = self.diff_variable(variable, default_var)
+
+        if not changes:
+            return variable
+
+        self._db.update_by_id(self.TABLE_NAME, variable.id, changes)
+
+        return self.refresh(variable.name)
+
+    def set_variables(self, variables: List[Dict]) -> List[Variable]:
+        default_vars = [self.prepare_variable(**variable) for variable in variables]
+
+        var_map = self.prepare_map()
+        inserts = []
+        updates = {}
+
+        for default_var in default_vars:
+            variable = var_map.get(default_var['name'])
+
+            if not variable:
+                inserts.append(default_var)
+                continue
+
+            changes = self.diff_variable(variable, default_var)
+
+            if changes:
+                updates.setdefault(tuple(changes.keys()), []).append(list(changes.values()) + [variable.id])
+
+        if inserts or updates:
+            queries = [(self._db.get_update_by_id_query(self.TABLE_NAME, list(columns)), rows) for columns, rows in updates.items()]
+
+            if inserts:
+                queries.append((self._db.get_add_query(self.TABLE_NAME, list(inserts[0].keys())), [list(form.values()) for form in inserts]))
+
+            self._db.execute_write_many(queries)
+
+        self.reload_map()
+
+        return [self._var_map[default_var['name']] for default_var in default_vars if default_var['name'] in self._var_map]
+
+    @staticmethod
+    def prepare_variable(name: str, value, type: VariableType, editable: bool, description: str, description_edition: str = '', plugin: Optional[None] = None, selectables: Optional[Dict[str, str]] = None, unit: Optional[VariableUnit] = None, section: str = '', refresh_player: bool = False) -> Dict:
         if isinstance(value, bool) and value:
             value = '1'
         elif isinstance(value, bool) and not value:
@@ -60,7 +121,7 @@ class VariableManager:
         if type == VariableType.BOOL:
             selectables = SELECTABLE_BOOLEAN
 
-        default_var = {
+        return {
             "name": name,
             "section": section,
             "value": value,
@@ -73,40 +134,24 @@ class VariableManager:
             "unit": unit.value if unit else None,
             "selectables": ([{"key": key, "label": label} for key, label in selectables.items()]) if isinstance(selectables, dict) else None
         }
-        variable = self.get_one_by_name(default_var['name'])
-
-        if not variable:
-            self.add_form(default_var)
-            variable = self.get_one_by_name(default_var['name'])
-        else:
-            same_selectables_keys = get_keys(default_var, 'selectables', 'key') == get_keys(variable, 'selectables', 'key')
-            same_selectables_label = get_keys(default_var, 'selectables', 'label') == get_keys(variable, 'selectables', 'label')
-
-            if variable.description != default_var['description']:
-                self._db.update_by_id(self.TABLE_NAME, variable.id, {"description": default_var['description']})
 
-            if variable.description_edition != default_var['description_edition']:
-                self._db.update_by_id(self.TABLE_NAME, variable.id, {"description_edition": default_var['description_edition']})
-
-            if variable.unit != default_var['unit']:
-                self._db.update_by_id(self.TABLE_NAME, variable.id, {"unit": default_var['unit']})
-
-            if variable.section != default_var['section']:
-                self._db.update_by_id(self.TABLE_NAME, variable.id, {"section": default_var['section']})
-
-            if variable.refresh_player != default_var['refresh_player']:
-                self._db.update_by_id(self.TABLE_NAME, variable.id, {"refresh_player": default_var['refresh_player']})
+    @staticmethod
+    def diff_variable(variable: Variable, default_var: Dict) -> Dict:
+        same_selectables_keys = get_keys(default_var, 'selectables', 'key') == get_keys(variable, 'selectables', 'key')
+        same_selectables_label = get_keys(default_var, 'selectables', 'label') == get_keys(variable, 'selectables', 'label')
+        changes = {}
 
-            if variable.editable != default_var['editable']:
-                self._db.update_by_id(self.TABLE_NAME, variable.id, {"editable": default_var['editable']})
+        for attribute in ['description', 'description_edition', 'unit', 'section', 'refresh_player', 'editable']:
+            if getattr(variable, attribute) != default_var[attribute]:
+                changes[attribute] = default_var[attribute]
 
-            if not same_selectables_keys or not same_selectables_label:
-                self._db.update_by_id(self.TABLE_NAME, variable.id, {"selectables": default_var['selectables']})
+        if not same_selectables_keys or not same_selectables_label:
+            changes['selectables'] = default_var['selectables']
 
         if variable.name == 'last_restart':
-            self._db.update_by_id(self.TABLE_NAME, variable.id, {"value": time.time()})
+            changes['value'] = time.time()
 
-        return variable
+        return changes
 
     def reload(self) -> None:
         demo = self._config_manager.map().get('demo')
@@ -125,6 +170,7 @@ class VariableManager:
             {"name": "default_slide_time_with_seconds", "section": self.t(VariableSection.PLAYER_OPTIONS), "value": False, "type": VariableType.BOOL, "editable": True, "description": self.t('settings_variable_desc_default_slide_time_with_seconds'), "refresh_player": False},
             {"name": "polling_interval", "section": self.t(VariableSection.PLAYER_OPTIONS), "value": 5, "unit": VariableUnit.SECOND, "type": VariableType.INT, "editable": True, "description": self.t('settings_variable_desc_polling_interval'), "refresh_player": True},
             {"name": "player_content_cache", "section": self.t(VariableSection.PLAYER_OPTIONS), "value": True, "type": VariableType.BOOL, "editable": True, "description": self.t('settings_variable_desc_player_content_cache'), "refresh_player": False},
+            {"name": "player_precache_budget", "section": self.t(VariableSection.PLAYER_OPTIONS), "value": 512, "unit": VariableUnit.MEGABYTE, "type": VariableType.INT, "editable": True, "description": self.t('settings_variable_desc_player_precache_budget'), "refresh_player": True},
 
             ### Player Animation
             {"name": "slide_animation_enabled", "section": self.t(VariableSection.PLAYER_ANIMATION), "value": False, "type": VariableType.BOOL, "editable": True, "description": self.t('settings_variable_desc_slide_animation_enabled'), "refresh_player": True},
@@ -151,17 +197,54 @@ class VariableManager:
             {"name": "refresh_player_request", "value": time.time(), "type": VariableType.TIMESTAMP, "editable": False, "description": self.t('settings_variable_desc_ro_refresh_player_request')},
         ]
 
-        for default_var in default_vars:
-            self.set_variable(**default_var)
+        self.set_variables(default_vars)
+
+    def reload_map(self) -> None:
+        # Taken before the map lock, writers always hold the database lock first
+        data_version = self._db.get_data_version()
+
+        with self._lock:
+            self._data_version = data_version
+            self._var_map = self.prepare_map()
+            self._missing = frozenset()
 
-        self._var_map = self.prepare_map()
+    def sync(self) -> None:
+        now = time.monotonic()
+
+        if now - self._data_version_checked_at < self.DATA_VERSION_CHECK_INTERVAL:
+            return
+
+        self._data_version_checked_at = now
+
+        # Only moves when another process commits to the database file
+        if self._db.get_data_version() != self._data_version:
+            self.reload_map()
 
     def map(self) -> dict:
+        self.sync()
         return self._var_map
 
     def prepare_map(self) -> Dict[str, Variable]:
         return self.list_to_map(self.get_all())
 
+    def refresh(self, name: str) -> Optional[Variable]:
+        with self._lock:
+            variable = self.get_one_by("name = ?", values={"name": name})
+            var_map = dict(self._var_map)
+
+            if variable:
+                var_map[name] = variable
+                self._missing = self._missing - {name}
+            else:
+                var_map.pop(name, None)
+                # Unknown names are remembered too, optional variables are looked up on every request
+                self._missing = self._missing | {name}
+
+            # Readers iterate the map without the lock, it is swapped and never changed in place
+            self._var_map = var_map
+
+            return variable
+
     @staticmethod
     def list_to_map(list: List[Variable]) -> Dict[str, Variable]:
         var_map = {}
@@ -187,20 +270,25 @@ class VariableManager:
         object = self._db.get_by_id(self.TABLE_NAME, id)
         return self.hydrate_object(object, id) if object else None
 
-    def get_by(self, query, sort: Optional[str] = None) -> List[Variable]:
-        return self.hydrate_list(self._db.get_by_query(self.TABLE_NAME, query=query, sort=sort))
+    def get_by(self, query, sort: Optional[str] = None, values: dict = {}) -> List[Variable]:
+        return self.hydrate_list(self._db.get_by_query(self.TABLE_NAME, query=query, sort=sort, values=values))
 
     def get_by_prefix(self, prefix: str) -> List[Variable]:
-        return self.get_by(query="name like '{}%'".format(prefix))
+        return self.get_by(query="name like ?", values={"name": "{}%".format(prefix)})
 
     def get_by_plugin(self, plugin: str) -> List[Variable]:
-        return self.get_by(query="plugin = '{}'".format(plugin))
+        return self.get_by(query="plugin = ?", values={"plugin": plugin})
 
     def get_one_by_name(self, name: str) -> Optional[Variable]:
-        return self.get_one_by("name = '{}'".format(name))
+        variable = self.map().get(name)
 
-    def get_one_by(self, query) -> Optional[Variable]:
-        object = self._db.get_one_by_query(self.TABLE_NAME, query=query)
+        if variable or name in self._missing:
+            return variable
+
+        return self.refresh(name)
+
+    def get_one_by(self, query, values: dict = {}) -> Optional[Variable]:
+        object = self._db.get_one_by_query(self.TABLE_NAME, query=query, values=values)
 
         if not object:
             return None
@@ -220,22 +308,27 @@ class VariableManager:
     def update_form(self, id: int, value: Union[int, bool, str]) -> None:
         variable = self.get(id)
 
-        if not variable:
-            if var.name in self._var_map:
-                del self._var_map[var.name]
-            return None
-
-        if not variable.editable:
+        if not variable or not variable.editable:
             return None
 
         self._db.update_by_id(self.TABLE_NAME, id, {"value": value})
-        var = self.get_one_by("id = {}".format(id))
-        self._var_map[var.name] = var
+        self.refresh(variable.name)
+
+        self.post_update(variable.name)
 
     def update_by_name(self, name: str, value) -> Optional[Variable]:
-        self._db.update_by_query(self.TABLE_NAME, query="name = '{}'".format(name), values={"value": value})
-        var = self.get_one_by_name(name)
-        self._var_map[name] = var
+        self._db.update_by_query(self.TABLE_NAME, query="name = ?", values={"value": value}, query_values={"name": name})
+        variable = self.refresh(name)
+
+        self.post_update(name)
+
+        return variable
+
+    def post_update(self, name: str) -> str:
+        if self._on_change:
+            self._on_change(name)
+
+        return name
 
     def add_form(self, variable: Union[Variable, Dict]) -> None:
         form = variable
@@ -247,7 +340,12 @@ class VariableManager:
         self._db.add(self.TABLE_NAME, form)
 
     def delete(self, id: int) -> None:
+        variable = self.get(id)
+
         self._db.delete_by_id(self.TABLE_NAME, id)
 
+        if variable:
+            self.refresh(variable.name)
+
     def to_dict(self, variables: List[Variable]) -> List[Dict]:
         return [variable.to_dict() for variable in variables]
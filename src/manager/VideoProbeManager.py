@@ -0,0 +1,50 @@
+import logging
+import threading
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Callable
+
+from src.manager.ConfigManager import ConfigManager
+from src.util.UtilVideo import get_video_duration
+
+
+class VideoProbeManager:
+
+    PROBE_TIMEOUT = 30
+
+    def __init__(self, config_manager: ConfigManager, on_probe: Callable[[str, Optional[float]], None]):
+        self._config_manager = config_manager
+        self._on_probe = on_probe
+        self._lock = threading.Lock()
+        self._queued = set()
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(1, int(self._config_manager.map().get('video_probe_workers'))),
+            thread_name_prefix='video-probe'
+        )
+
+    def submit(self, content_uuid: str, path: str) -> None:
+        with self._lock:
+            # A re-probe request for a video still waiting in line is the same job
+            if content_uuid in self._queued:
+                return
+
+            self._queued.add(content_uuid)
+
+        self._executor.submit(self._probe, content_uuid, path)
+
+    def pending(self) -> int:
+        return len(self._queued)
+
+    def _probe(self, content_uuid: str, path: str) -> None:
+        with self._lock:
+            self._queued.discard(content_uuid)
+
+        try:
+            duration = get_video_duration(path, ffprobe=self._config_manager.map().get('ffprobe_path'), timeout=self.PROBE_TIMEOUT)
+            self._on_probe(content_uuid, duration)
+        except Exception as e:
+            logging.error("Video probe failed for content {}: {}".format(content_uuid, e))
+            self._on_probe(content_uuid, None)
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False, cancel_futures=True)
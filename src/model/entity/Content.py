@@ -2,14 +2,17 @@ import json
 import time
 import uuid
 
-from typing import Optional, Union
+from typing import Optional, Union, Dict
 from src.model.enum.ContentType import ContentType, ContentInputType
+from src.model.enum.DurationStatus import DurationStatus
+from src.model.enum.TranscodeStatus import TranscodeStatus
+from src.model.enum.TranscodingProfile import TranscodingProfile
 from src.util.utils import str_to_enum
 
 
 class Content:
 
-    def __init__(self, uuid: str = '', location: str = '', type: Union[ContentType, str] = ContentType.URL, name: str = 'Untitled', id: Optional[int] = None, duration: Optional[float] = None, created_by: Optional[str] = None, updated_by: Optional[str] = None, created_at: Optional[int] = None, updated_at: Optional[int] = None, folder_id: Optional[int] = None):
+    def __init__(self, uuid: str = '', location: str = '', type: Union[ContentType, str] = ContentType.URL, name: str = 'Untitled', id: Optional[int] = None, duration: Optional[float] = None, duration_status: Optional[Union[DurationStatus, str]] = None, created_by: Optional[str] = None, updated_by: Optional[str] = None, created_at: Optional[int] = None, updated_at: Optional[int] = None, folder_id: Optional[int] = None, transcodes: Optional[Union[Dict, str]] = None):
         self._uuid = uuid if uuid else self.generate_and_set_uuid()
         self._id = id if id else None
         self._location = location
@@ -17,6 +20,8 @@ class Content:
         self._name = name
         self._folder_id = folder_id
         self._duration = duration
+        self._duration_status = str_to_enum(duration_status, DurationStatus) if isinstance(duration_status, str) else duration_status
+        self._transcodes = json.loads(transcodes) if isinstance(transcodes, str) else (transcodes if transcodes else {})
         self._created_by = created_by if created_by else None
         self._updated_by = updated_by if updated_by else None
         self._created_at = int(created_at if created_at else time.time())
@@ -95,6 +100,22 @@ class Content:
     def duration(self, value: Optional[float]):
         self._duration = value
 
+    @property
+    def duration_status(self) -> Optional[DurationStatus]:
+        return self._duration_status
+
+    @duration_status.setter
+    def duration_status(self, value: Optional[DurationStatus]):
+        self._duration_status = value
+
+    @property
+    def transcodes(self) -> Dict:
+        return self._transcodes
+
+    @transcodes.setter
+    def transcodes(self, value: Dict):
+        self._transcodes = value
+
     @property
     def type(self) -> ContentType:
         return self._type
@@ -124,6 +145,8 @@ class Content:
                f"updated_at='{self.updated_at}',\n" \
                f"folder_id='{self.folder_id}',\n" \
                f"duration='{self.duration}',\n" \
+               f"duration_status='{self.duration_status}',\n" \
+               f"transcodes='{self.transcodes}',\n" \
                f")"
 
     def to_json(self, edits: dict = {}) -> str:
@@ -147,6 +170,8 @@ class Content:
             "updated_at": self.updated_at,
             "folder_id": self.folder_id,
             "duration": self.duration,
+            "duration_status": self.duration_status.value if self.duration_status else None,
+            "transcodes": self.transcodes,
         }
 
         if with_virtual:
@@ -160,6 +185,22 @@ class Content:
             or self.type == ContentType.PICTURE
         )
 
+    def is_duration_pending(self) -> bool:
+        return self.duration_status == DurationStatus.PENDING
+
+    def get_transcode_status(self, profile: TranscodingProfile) -> Optional[TranscodeStatus]:
+        transcode = self._transcodes.get(profile.value)
+
+        return str_to_enum(transcode['status'], TranscodeStatus) if transcode else None
+
+    def get_transcode_location(self, profile: TranscodingProfile) -> Optional[str]:
+        transcode = self._transcodes.get(profile.value)
+
+        if not transcode or transcode['status'] != TranscodeStatus.READY.value:
+            return None
+
+        return transcode['location']
+
     def get_input_type(self) -> ContentInputType:
         return ContentType.get_input(self.type)
 
@@ -0,0 +1,62 @@
+import os
+
+from typing import Optional
+
+
+class MediaFile:
+
+    def __init__(self, path: str, size: int, mtime: float, etag: str, mimetype: Optional[str] = None, sendfile_uri: Optional[str] = None, mutable: bool = False):
+        self._path = path
+        self._size = size
+        self._mtime = mtime
+        self._etag = etag
+        self._mimetype = mimetype
+        self._sendfile_uri = sendfile_uri
+        self._mutable = mutable
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def mtime(self) -> float:
+        return self._mtime
+
+    @property
+    def etag(self) -> str:
+        return self._etag
+
+    @property
+    def mimetype(self) -> Optional[str]:
+        return self._mimetype
+
+    @property
+    def sendfile_uri(self) -> Optional[str]:
+        return self._sendfile_uri
+
+    @property
+    def mutable(self) -> bool:
+        return self._mutable
+
+    def is_fresh(self) -> bool:
+        try:
+            stat = os.stat(self._path)
+        except OSError:
+            return False
+
+        return stat.st_mtime == self._mtime and stat.st_size == self._size
+
+    def __str__(self) -> str:
+        return f"MediaFile(" \
+               f"path='{self.path}',\n" \
+               f"size='{self.size}',\n" \
+               f"mtime='{self.mtime}',\n" \
+               f"etag='{self.etag}',\n" \
+               f"mimetype='{self.mimetype}',\n" \
+               f"sendfile_uri='{self.sendfile_uri}',\n" \
+               f"mutable='{self.mutable}',\n" \
+               f")"
@@ -6,9 +6,10 @@ from typing import Optional, Union
 
 class NodePlayerGroup:
 
-    def __init__(self, name: str = 'Untitled', slug: str = 'untitled', playlist_id: Optional[int] = None, id: Optional[int] = None, created_by: Optional[str] = None, updated_by: Optional[str] = None, created_at: Optional[int] = None, updated_at: Optional[int] = None):
+    def __init__(self, name: str = 'Untitled', slug: str = 'untitled', playlist_id: Optional[int] = None, transcoding_profile: Optional[str] = None, id: Optional[int] = None, created_by: Optional[str] = None, updated_by: Optional[str] = None, created_at: Optional[int] = None, updated_at: Optional[int] = None):
         self._id = id if id else None
         self._playlist_id = playlist_id
+        self._transcoding_profile = transcoding_profile if transcoding_profile else None
         self._name = name
         self._slug = slug
         self._created_by = created_by if created_by else None
@@ -28,6 +29,14 @@ class NodePlayerGroup:
     def playlist_id(self, value: Optional[int]):
         self._playlist_id = value
 
+    @property
+    def transcoding_profile(self) -> Optional[str]:
+        return self._transcoding_profile
+
+    @transcoding_profile.setter
+    def transcoding_profile(self, value: Optional[str]):
+        self._transcoding_profile = value
+
     @property
     def name(self) -> str:
         return self._name
@@ -82,6 +91,7 @@ class NodePlayerGroup:
                f"name='{self.name}',\n" \
                f"slug='{self.slug}',\n" \
                f"playlist_id='{self.playlist_id}',\n" \
+               f"transcoding_profile='{self.transcoding_profile}',\n" \
                f"created_by='{self.created_by}',\n" \
                f"updated_by='{self.updated_by}',\n" \
                f"created_at='{self.created_at}',\n" \
@@ -102,6 +112,7 @@ class NodePlayerGroup:
             "name": self.name,
             "slug": self.slug,
             "playlist_id": self.playlist_id,
+            "transcoding_profile": self.transcoding_profile,
             "created_by": self.created_by,
             "updated_by": self.updated_by,
             "created_at": self.created_at,
@@ -6,13 +6,15 @@ from typing import Optional, Union
 
 class Playlist:
 
-    def __init__(self, name: str = 'Untitled', slug: str = 'untitled', id: Optional[int] = None, enabled: bool = False, fallback: bool = False, time_sync: bool = False, created_by: Optional[str] = None, updated_by: Optional[str] = None, created_at: Optional[int] = None, updated_at: Optional[int] = None):
+    def __init__(self, name: str = 'Untitled', slug: str = 'untitled', id: Optional[int] = None, enabled: bool = False, fallback: bool = False, time_sync: bool = False, duration: float = 0, slides_count: int = 0, created_by: Optional[str] = None, updated_by: Optional[str] = None, created_at: Optional[int] = None, updated_at: Optional[int] = None):
         self._id = id if id else None
         self._name = name
         self._slug = slug
         self._enabled = enabled
         self._fallback = fallback
         self._time_sync = time_sync
+        self._duration = duration if duration else 0
+        self._slides_count = slides_count if slides_count else 0
         self._created_by = created_by if created_by else None
         self._updated_by = updated_by if updated_by else None
         self._created_at = int(created_at if created_at else time.time())
@@ -46,6 +48,22 @@ class Playlist:
     def time_sync(self, value: bool):
         self._time_sync = bool(value)
 
+    @property
+    def duration(self) -> float:
+        return self._duration
+
+    @duration.setter
+    def duration(self, value: float):
+        self._duration = value
+
+    @property
+    def slides_count(self) -> int:
+        return self._slides_count
+
+    @slides_count.setter
+    def slides_count(self, value: int):
+        self._slides_count = value
+
     @property
     def created_by(self) -> str:
         return self._created_by
@@ -102,6 +120,8 @@ class Playlist:
                f"enabled='{self.enabled}',\n" \
                f"fallback='{self.fallback}',\n" \
                f"time_sync='{self.time_sync}',\n" \
+               f"duration='{self.duration}',\n" \
+               f"slides_count='{self.slides_count}',\n" \
                f"created_by='{self.created_by}',\n" \
                f"updated_by='{self.updated_by}',\n" \
                f"created_at='{self.created_at}',\n" \
@@ -124,6 +144,8 @@ class Playlist:
             "enabled": self.enabled,
             "fallback": self.fallback,
             "time_sync": self.time_sync,
+            "duration": self.duration,
+            "slides_count": self.slides_count,
             "created_by": self.created_by,
             "updated_by": self.updated_by,
             "created_at": self.created_at,
@@ -0,0 +1,136 @@
+import json
+import hashlib
+
+from datetime import datetime
+from typing import Optional, List, Dict, Tuple
+
+from src.util.utils import CronSchedule
+
+
+class PlaylistSnapshot:
+
+    MAX_RENDERED_VARIANTS = 32
+
+    def __init__(self, playlist_id: Optional[int] = None, time_sync: bool = False, slides: Optional[List[Tuple[Dict, Optional[CronSchedule], Optional[CronSchedule]]]] = None, notifications: Optional[List[Dict]] = None, preview_mode: bool = False, hard_refresh_request: int = 0, external_url: str = '', watched_dirs: Optional[Dict[str, float]] = None):
+        self._playlist_id = playlist_id
+        self._time_sync = time_sync
+        self._slides = slides if slides else []
+        self._notifications = notifications if notifications else []
+        self._preview_mode = preview_mode
+        self._hard_refresh_request = hard_refresh_request
+        self._external_url = external_url
+        self._watched_dirs = watched_dirs if watched_dirs else {}
+        self._rendered = {}
+        self._window = None
+
+    @property
+    def playlist_id(self) -> Optional[int]:
+        return self._playlist_id
+
+    @property
+    def time_sync(self) -> bool:
+        return self._time_sync
+
+    @property
+    def preview_mode(self) -> bool:
+        return self._preview_mode
+
+    @property
+    def hard_refresh_request(self) -> int:
+        return self._hard_refresh_request
+
+    @property
+    def external_url(self) -> str:
+        return self._external_url
+
+    @property
+    def watched_dirs(self) -> Dict[str, float]:
+        return self._watched_dirs
+
+    def __str__(self) -> str:
+        return f"PlaylistSnapshot(" \
+               f"playlist_id='{self.playlist_id}',\n" \
+               f"time_sync='{self.time_sync}',\n" \
+               f"preview_mode='{self.preview_mode}',\n" \
+               f"hard_refresh_request='{self.hard_refresh_request}',\n" \
+               f"slides='{len(self._slides)}',\n" \
+               f"notifications='{len(self._notifications)}',\n" \
+               f")"
+
+    def get_enabled_indexes(self, now: Optional[datetime] = None) -> Tuple[int, ...]:
+        now = now if now else datetime.now()
+        indexes = []
+
+        for index, (slide, schedule_start, schedule_end) in enumerate(self._slides):
+            if schedule_start and not schedule_start.is_after(now):
+                continue
+
+            if schedule_end and schedule_end.is_after(now):
+                continue
+
+            indexes.append(index)
+
+        return tuple(indexes)
+
+    def get_valid_until(self, now: Optional[datetime] = None) -> Optional[datetime]:
+        now = now if now else datetime.now()
+        valid_until = None
+
+        for slide, schedule_start, schedule_end in self._slides:
+            # Past its end date a slide never comes back, whatever its start says
+            if schedule_end and schedule_end.is_datetime_moment() and schedule_end.is_after(now):
+                continue
+
+            for schedule in (schedule_start, schedule_end):
+                transition = schedule.next_transition(now) if schedule else None
+
+                if transition and (valid_until is None or transition < valid_until):
+                    valid_until = transition
+
+        return valid_until
+
+    def get_window(self, now: Optional[datetime] = None) -> Tuple[Tuple[int, ...], Optional[datetime]]:
+        now = now if now else datetime.now()
+        window = self._window
+
+        # The enabled set can't change before the earliest schedule transition
+        if window and window[0] <= now and (window[2] is None or now < window[2]):
+            return window[1], window[2]
+
+        enabled_indexes = self.get_enabled_indexes(now)
+        valid_until = self.get_valid_until(now)
+        self._window = (now, enabled_indexes, valid_until)
+
+        return enabled_indexes, valid_until
+
+    def to_dict(self, now: Optional[datetime] = None) -> dict:
+        return self._build_dict(*self.get_window(now))
+
+    def to_json(self, now: Optional[datetime] = None) -> bytes:
+        return self.render(now)[0]
+
+    def render(self, now: Optional[datetime] = None) -> Tuple[bytes, str]:
+        window = self.get_window(now)
+        rendered = self._rendered.get(window)
+
+        if rendered is None:
+            body = json.dumps(self._build_dict(*window), sort_keys=True, separators=(',', ':')).encode('utf-8')
+            rendered = (body, hashlib.sha1(body).hexdigest())
+
+            if len(self._rendered) >= self.MAX_RENDERED_VARIANTS:
+                self._rendered = {}
+
+            self._rendered[window] = rendered
+
+        return rendered
+
+    def _build_dict(self, enabled_indexes: Tuple[int, ...], valid_until: Optional[datetime] = None) -> dict:
+        return {
+            'playlist_id': self._playlist_id,
+            'time_sync': self._time_sync,
+            'loop': [self._slides[index][0] for index in enabled_indexes],
+            'preview_mode': self._preview_mode,
+            'notifications': self._notifications,
+            'hard_refresh_request': self._hard_refresh_request,
+            'valid_until': int(valid_until.timestamp()) if valid_until else None
+        }
@@ -0,0 +1,76 @@
+import json
+import time
+
+from typing import Optional
+
+
+class ResumableUpload:
+
+    def __init__(self, id: str, filename: str, size: int, offset: int = 0, checksum: Optional[str] = None, folder_id: Optional[int] = None, created_at: Optional[int] = None):
+        self._id = id
+        self._filename = filename
+        self._size = int(size)
+        self._offset = int(offset)
+        self._checksum = checksum if checksum else None
+        self._folder_id = folder_id
+        self._created_at = int(created_at if created_at else time.time())
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @property
+    def filename(self) -> str:
+        return self._filename
+
+    @property
+    def size(self) -> int:
+        return self._size
+
+    @property
+    def offset(self) -> int:
+        return self._offset
+
+    @offset.setter
+    def offset(self, value: int):
+        self._offset = value
+
+    @property
+    def checksum(self) -> Optional[str]:
+        return self._checksum
+
+    @property
+    def folder_id(self) -> Optional[int]:
+        return self._folder_id
+
+    @property
+    def created_at(self) -> int:
+        return self._created_at
+
+    def is_complete(self) -> bool:
+        return self._offset == self._size
+
+    def __str__(self) -> str:
+        return f"ResumableUpload(" \
+               f"id='{self.id}',\n" \
+               f"filename='{self.filename}',\n" \
+               f"size='{self.size}',\n" \
+               f"offset='{self.offset}',\n" \
+               f"checksum='{self.checksum}',\n" \
+               f"folder_id='{self.folder_id}',\n" \
+               f"created_at='{self.created_at}',\n" \
+               f")"
+
+    def to_json(self) -> str:
+        return json.dumps(self.to_dict())
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "filename": self.filename,
+            "size": self.size,
+            "offset": self.offset,
+            "checksum": self.checksum,
+            "folder_id": self.folder_id,
+            "created_at": self.created_at,
+        }
@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class DurationStatus(Enum):
+
+    PENDING = 'pending'
+    READY = 'ready'
+    FAILED = 'failed'
@@ -0,0 +1,8 @@
+from enum import Enum
+
+
+class TranscodeStatus(Enum):
+
+    PENDING = 'pending'
+    READY = 'ready'
+    FAILED = 'failed'
@@ -0,0 +1,35 @@
+from enum import Enum
+from typing import Optional, List
+
+from src.model.enum.OperatingSystem import OperatingSystem
+
+
+class TranscodingProfile(Enum):
+
+    ORIGINAL = 'original'
+    H264_1080P = '1080p_h264'
+    LOW_720P = '720p_low'
+
+    @staticmethod
+    def get_ffmpeg_args(value: Enum) -> Optional[List[str]]:
+        if value == TranscodingProfile.H264_1080P:
+            return [
+                '-vf', "scale=w='if(gte(iw,ih),min(1920,iw),-2)':h='if(gte(iw,ih),-2,min(1920,ih))'",
+                '-c:v', 'libx264', '-profile:v', 'baseline', '-level:v', '4.0', '-preset', 'veryfast', '-crf', '23', '-maxrate', '6M', '-bufsize', '12M', '-pix_fmt', 'yuv420p',
+                '-c:a', 'aac', '-b:a', '128k', '-ac', '2'
+            ]
+        elif value == TranscodingProfile.LOW_720P:
+            return [
+                '-vf', "scale=w='if(gte(iw,ih),min(1280,iw),-2)':h='if(gte(iw,ih),-2,min(1280,ih))'",
+                '-c:v', 'libx264', '-profile:v', 'main', '-level:v', '3.1', '-preset', 'veryfast', '-crf', '28', '-maxrate', '2M', '-bufsize', '4M', '-pix_fmt', 'yuv420p',
+                '-c:a', 'aac', '-b:a', '96k', '-ac', '2'
+            ]
+
+        return None
+
+    @staticmethod
+    def get_default_for_operating_system(value: Optional[Enum]) -> Optional[Enum]:
+        if value == OperatingSystem.RASPBIAN:
+            return TranscodingProfile.H264_1080P
+
+        return None
@@ -1,4 +1,6 @@
-from typing import Dict
+import os
+
+from typing import Dict, Optional
 
 from src.manager.PlaylistManager import PlaylistManager
 from src.manager.SlideManager import SlideManager
@@ -12,10 +14,22 @@ from src.manager.LangManager import LangManager
 from src.manager.DatabaseManager import DatabaseManager
 from src.manager.ConfigManager import ConfigManager
 from src.manager.LoggingManager import LoggingManager
+from src.manager.PlaylistCacheManager import PlaylistCacheManager
+from src.manager.ExternalStorageManager import ExternalStorageManager
+from src.manager.MediaCacheManager import MediaCacheManager
+from src.manager.VideoProbeManager import VideoProbeManager
+from src.manager.UploadManager import UploadManager
+from src.manager.ImageDerivativeManager import ImageDerivativeManager
+from src.manager.ThumbnailManager import ThumbnailManager
+from src.manager.TranscodeManager import TranscodeManager
+from src.model.enum.TranscodingProfile import TranscodingProfile
+from src.constant.WebDirConstant import WebDirConstant
 
 
 class ModelStore:
 
+    PLAYER_VARIABLES = ['refresh_player_request', 'external_url']
+
     def __init__(self, kernel, get_plugins: Dict):
         self._get_plugins = get_plugins
         self._kernel = kernel
@@ -28,22 +42,44 @@ class ModelStore:
 
         # Pure
         self._lang_manager = LangManager()
-        self._database_manager = DatabaseManager()
+        self._database_manager = DatabaseManager(config_manager=self._config_manager)
+        self._playlist_cache_manager = PlaylistCacheManager()
+        self._external_storage_manager = ExternalStorageManager(on_change=self.on_playlist_change, on_file_change=self.on_external_storage_change)
+        self._media_cache_manager = MediaCacheManager()
+        self._upload_manager = UploadManager()
+        self._image_derivative_manager = ImageDerivativeManager(config_manager=self._config_manager, on_evict=self._media_cache_manager.invalidate, derivative_dir=os.path.join(
+            kernel.get_application_dir(),
+            WebDirConstant.FOLDER_STATIC,
+            WebDirConstant.FOLDER_STATIC_WEB_UPLOADS,
+            ImageDerivativeManager.DERIVATIVE_DIR
+        ))
+        self._thumbnail_manager = ThumbnailManager(config_manager=self._config_manager, thumbnail_dir=os.path.join(
+            kernel.get_application_dir(),
+            WebDirConstant.FOLDER_STATIC,
+            WebDirConstant.FOLDER_STATIC_WEB_UPLOADS,
+            WebDirConstant.FOLDER_STATIC_WEB_THUMBNAILS
+        ))
+        self._video_probe_manager = VideoProbeManager(config_manager=self._config_manager, on_probe=self.on_video_probe)
+        self._transcode_manager = TranscodeManager(config_manager=self._config_manager, on_transcode=self.on_transcode)
 
         # Dynamics
         self._user_manager = UserManager(lang_manager=self._lang_manager, database_manager=self._database_manager, on_user_delete=self.on_user_delete)
-        self._variable_manager = VariableManager(lang_manager=self._lang_manager, database_manager=self._database_manager, user_manager=self._user_manager, config_manager=self._config_manager)
+        self._variable_manager = VariableManager(lang_manager=self._lang_manager, database_manager=self._database_manager, user_manager=self._user_manager, config_manager=self._config_manager, on_change=self.on_variable_change)
         self._lang_manager.set_lang(self.variable().map().get('lang').as_string())
 
         # Model
         self._folder_manager = FolderManager(lang_manager=self._lang_manager, database_manager=self._database_manager, user_manager=self._user_manager, variable_manager=self._variable_manager)
-        self._node_player_manager = NodePlayerManager(lang_manager=self._lang_manager, database_manager=self._database_manager, user_manager=self._user_manager, variable_manager=self._variable_manager)
-        self._node_player_group_manager = NodePlayerGroupManager(lang_manager=self._lang_manager, database_manager=self._database_manager, user_manager=self._user_manager, variable_manager=self._variable_manager)
-        self._playlist_manager = PlaylistManager(lang_manager=self._lang_manager, database_manager=self._database_manager, user_manager=self._user_manager, variable_manager=self._variable_manager)
-        self._slide_manager = SlideManager(lang_manager=self._lang_manager, database_manager=self._database_manager, user_manager=self._user_manager, variable_manager=self._variable_manager)
-        self._content_manager = ContentManager(lang_manager=self._lang_manager, database_manager=self._database_manager, user_manager=self._user_manager, variable_manager=self._variable_manager, config_manager=self._config_manager)
+        self._node_player_manager = NodePlayerManager(lang_manager=self._lang_manager, database_manager=self._database_manager, user_manager=self._user_manager, variable_manager=self._variable_manager, on_change=self.on_fleet_change)
+        self._node_player_group_manager = NodePlayerGroupManager(lang_manager=self._lang_manager, database_manager=self._database_manager, user_manager=self._user_manager, variable_manager=self._variable_manager, on_change=self.on_fleet_change)
+        self._slide_manager = SlideManager(lang_manager=self._lang_manager, database_manager=self._database_manager, user_manager=self._user_manager, variable_manager=self._variable_manager, on_change=self.on_playlist_change)
+        self._content_manager = ContentManager(lang_manager=self._lang_manager, database_manager=self._database_manager, user_manager=self._user_manager, variable_manager=self._variable_manager, config_manager=self._config_manager, on_change=self.on_content_change, video_probe_manager=self._video_probe_manager, thumbnail_manager=self._thumbnail_manager, transcode_manager=self._transcode_manager)
+        self._playlist_manager = PlaylistManager(lang_manager=self._lang_manager, database_manager=self._database_manager, user_manager=self._user_manager, variable_manager=self._variable_manager, on_change=self.on_playlist_change)
         self._variable_manager.reload()
 
+        # Resume probes interrupted by a restart
+        self._content_manager.reprobe_durations(pending_only=not self._config_manager.map().get('reprobe_videos'))
+        self._content_manager.retranscode()
+
     def logging(self) -> LoggingManager:
         return self._logging_manager
 
@@ -65,6 +101,30 @@ class ModelStore:
     def playlist(self) -> PlaylistManager:
         return self._playlist_manager
 
+    def playlist_cache(self) -> PlaylistCacheManager:
+        return self._playlist_cache_manager
+
+    def external_storage(self) -> ExternalStorageManager:
+        return self._external_storage_manager
+
+    def media_cache(self) -> MediaCacheManager:
+        return self._media_cache_manager
+
+    def image_derivative(self) -> ImageDerivativeManager:
+        return self._image_derivative_manager
+
+    def thumbnail(self) -> ThumbnailManager:
+        return self._thumbnail_manager
+
+    def upload(self) -> UploadManager:
+        return self._upload_manager
+
+    def video_probe(self) -> VideoProbeManager:
+        return self._video_probe_manager
+
+    def transcode(self) -> TranscodeManager:
+        return self._transcode_manager
+
     def node_player(self) -> NodePlayerManager:
         return self._node_player_manager
 
@@ -91,3 +151,31 @@ class ModelStore:
         self._slide_manager.forget_for_user(user_id)
         self._content_manager.forget_for_user(user_id)
         self._user_manager.forget_for_user(user_id)
+
+    def on_playlist_change(self) -> None:
+        self._playlist_cache_manager.invalidate()
+
+    def on_content_change(self) -> None:
+        self._media_cache_manager.invalidate()
+        self.on_playlist_change()
+
+    def on_external_storage_change(self, directory: str) -> None:
+        self._media_cache_manager.forget_directory(directory)
+
+    def on_video_probe(self, content_uuid: str, duration: Optional[float]) -> None:
+        self._content_manager.set_probed_duration(content_uuid, duration)
+
+    def on_transcode(self, source_location: str, profile: TranscodingProfile, location: Optional[str]) -> None:
+        self._content_manager.set_transcoded(source_location, profile, location)
+
+    def on_fleet_change(self) -> None:
+        self._node_player_group_manager.invalidate_host_map()
+        # Open playlist streams wake up and resolve their player again
+        self.on_playlist_change()
+
+    def on_variable_change(self, name: str) -> None:
+        if name == 'external_url':
+            self._external_storage_manager.invalidate()
+
+        if name in self.PLAYER_VARIABLES:
+            self.on_playlist_change()
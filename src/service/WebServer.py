@@ -49,7 +49,7 @@ class WebServer:
             self._app,
             host=self._model_store.config().map().get('bind'),
             port=self._model_store.config().map().get('port'),
-            threads=100,
+            threads=int(self._model_store.config().map().get('threads')),
             max_request_body_size=self.get_max_upload_size(),
         )
 
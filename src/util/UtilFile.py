@@ -1,7 +1,14 @@
 import os
+import re
 import uuid
 import math
 import shutil
+import hashlib
+
+from typing import BinaryIO, Optional, Callable
+
+STORED_FILENAME_PATTERN = re.compile(r'^(\.transcodes/)?[0-9a-f]{64}(-[0-9a-z_]+)?(\.[0-9a-z]+)?$')
+STORE_CHUNK_SIZE = 1024 * 1024
 
 
 def randomize_filename(old_filename: str) -> str:
@@ -10,6 +17,54 @@ def randomize_filename(old_filename: str) -> str:
     return f"{new_uuid}{extension}"
 
 
+def get_stored_filename(digest: str, filename: str) -> str:
+    _, extension = os.path.splitext(filename)
+    return f"{digest}{extension.lower()}"
+
+
+def is_stored_filename(filename: str) -> bool:
+    return STORED_FILENAME_PATTERN.match(filename) is not None
+
+
+def get_file_digest(path: str) -> str:
+    digest = hashlib.sha256()
+
+    with open(path, 'rb') as file:
+        for data in iter(lambda: file.read(STORE_CHUNK_SIZE), b''):
+            digest.update(data)
+
+    return digest.hexdigest()
+
+
+def store_stream(stream: BinaryIO, upload_dir: str, filename: str, store: Optional[Callable[[str, str, str, Optional[str]], str]] = None) -> str:
+    digest = hashlib.sha256()
+    tmp_path = os.path.join(upload_dir, ".{}.tmp".format(uuid.uuid4().hex))
+
+    try:
+        # The digest is computed while the upload is written, never by reading it back
+        with open(tmp_path, 'wb') as file:
+            for data in iter(lambda: stream.read(STORE_CHUNK_SIZE), b''):
+                file.write(data)
+                digest.update(data)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return (store if store else store_file)(tmp_path, upload_dir, filename, digest.hexdigest())
+
+
+def store_file(path: str, upload_dir: str, filename: str, digest: Optional[str] = None) -> str:
+    object_path = os.path.join(upload_dir, get_stored_filename(digest if digest else get_file_digest(path), filename))
+
+    # Identical bytes land on the same name, a file uploaded twice is stored once
+    if os.path.exists(object_path):
+        os.unlink(path)
+    else:
+        os.replace(path, object_path)
+
+    return object_path
+
+
 def convert_size(size_bytes):
     if size_bytes == 0:
         return "0B"
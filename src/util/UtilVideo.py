@@ -1,44 +1,120 @@
-import struct
 import subprocess
 import json
 import logging
 import os
-from typing import Optional
-from moviepy.editor import VideoFileClip
+from typing import Optional, List
 
-"""
-def mp4_duration_with_ffprobe(filename):
-    import subprocess, json
 
-    result = subprocess.check_output(
-            f'ffprobe -v quiet -show_streams -select_streams v:0 -of json "{filename}"',
-            shell=True).decode()
-    fields = json.loads(result)['streams'][0]
+def get_video_duration_with_ffprobe(file_path: str, ffprobe: str = 'ffprobe', timeout: int = 30) -> Optional[float]:
+    file_path = os.path.abspath(file_path)
+
+    if not os.path.isfile(file_path):
+        logging.error(f"File not found: {file_path}")
+        return None
+
+    try:
+        result = subprocess.run(
+            [ffprobe, '-v', 'error', '-show_entries', 'format=duration:stream=duration', '-of', 'json', file_path],
+            capture_output=True,
+            timeout=timeout,
+            check=True
+        )
+        fields = json.loads(result.stdout.decode())
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired, ValueError) as e:
+        logging.error(f"Error getting duration with ffprobe for file {file_path}: {e}")
+        return None
+
+    # Some containers (webm, mkv) only carry a duration on their streams
+    durations = [fields.get('format', {}).get('duration')] + [stream.get('duration') for stream in fields.get('streams', [])]
 
-    if 'tags' in fields and 'DURATION' in fields['tags']:
-        return round(float(fields['tags']['DURATION']), 2)
+    for duration in durations:
+        try:
+            if duration is not None and float(duration) > 0:
+                logging.debug(f"Duration for {file_path}: {duration} seconds")
+                return round(float(duration), 2)
+        except ValueError:
+            continue
+
+    return None
 
-    if 'duration' in fields:
-        return round(float(fields['duration']), 2)
 
-    return 0
-"""
 def get_video_duration_with_moviepy(file_path: str) -> Optional[float]:
+    from moviepy.editor import VideoFileClip
 
     # Ensure the file path is absolute
     file_path = os.path.abspath(file_path)
-    
+
     # Check if the file exists
     if not os.path.isfile(file_path):
         logging.error(f"File not found: {file_path}")
         return None
 
     try:
-        # Load the video file using moviepy
-        clip = VideoFileClip(file_path)
-        duration = clip.duration
+        # Closing the clip stops its ffmpeg reader process
+        with VideoFileClip(file_path) as clip:
+            duration = clip.duration
         logging.debug(f"Duration for {file_path}: {duration} seconds")
         return duration
     except Exception as e:
         logging.error(f"Error getting duration with moviepy for file {file_path}: {e}")
-    return None
\ No newline at end of file
+    return None
+
+
+def get_video_duration(file_path: str, ffprobe: str = 'ffprobe', timeout: int = 30) -> Optional[float]:
+    try:
+        return get_video_duration_with_ffprobe(file_path, ffprobe=ffprobe, timeout=timeout)
+    except FileNotFoundError:
+        logging.warning(f"ffprobe not found at '{ffprobe}', falling back to moviepy")
+
+    return get_video_duration_with_moviepy(file_path)
+
+
+def get_video_frame_with_ffmpeg(file_path: str, position: float = 1.0, width: int = 640, ffmpeg: str = 'ffmpeg', timeout: int = 30) -> Optional[bytes]:
+    file_path = os.path.abspath(file_path)
+
+    if not os.path.isfile(file_path):
+        logging.error(f"File not found: {file_path}")
+        return None
+
+    # Seeking before the input only decodes from the nearest keyframe, short clips get their first frame instead
+    for seek in ([position, 0] if position > 0 else [0]):
+        try:
+            result = subprocess.run(
+                [ffmpeg, '-v', 'error', '-ss', str(seek), '-i', file_path, '-frames:v', '1', '-vf', f'scale={width}:-2', '-f', 'image2pipe', '-c:v', 'mjpeg', '-'],
+                capture_output=True,
+                timeout=timeout,
+                check=True
+            )
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            logging.error(f"Error extracting frame with ffmpeg for file {file_path}: {e}")
+            return None
+
+        if result.stdout:
+            return result.stdout
+
+    return None
+
+
+def transcode_video_with_ffmpeg(file_path: str, output_path: str, args: List[str], ffmpeg: str = 'ffmpeg', timeout: int = 3600) -> bool:
+    file_path = os.path.abspath(file_path)
+
+    if not os.path.isfile(file_path):
+        logging.error(f"File not found: {file_path}")
+        return False
+
+    try:
+        # Only the first video and audio streams are kept, players don't need subtitles or data tracks
+        subprocess.run(
+            [ffmpeg, '-v', 'error', '-y', '-i', file_path, '-map', '0:v:0', '-map', '0:a:0?'] + args + ['-movflags', '+faststart', '-f', 'mp4', output_path],
+            capture_output=True,
+            timeout=timeout,
+            check=True
+        )
+    except subprocess.CalledProcessError as e:
+        logging.error(f"Error transcoding file {file_path} with ffmpeg: {e.stderr.decode(errors='replace').strip()}")
+        return False
+    except subprocess.TimeoutExpired as e:
+        logging.error(f"Error transcoding file {file_path} with ffmpeg: {e}")
+        return False
+
+    return True
@@ -9,12 +9,18 @@ import platform
 import urllib.parse
 
 from datetime import datetime, timedelta
-from typing import Optional, List, Dict
+from functools import lru_cache
+from typing import Optional, List, Dict, Tuple, Union
 from enum import Enum
 from cron_descriptor import ExpressionDescriptor
 from cron_descriptor.Exception import FormatException, WrongArgumentException, MissingFieldException
 
 CAMEL_CASE_TO_SNAKE_CASE_PATTERN = re.compile(r'(?<!^)(?=[A-Z])')
+CRON_DATETIME_MOMENT_PATTERN = re.compile(r'^(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+\*\s+(\d+)$')
+CRON_WEEK_MOMENT_PATTERN = re.compile(r'^(\d+)\s+(\d+)\s+\*\s+\*\s+(\d+)$')
+CRON_YEAR_MOMENT_PATTERN = re.compile(r'^(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+\*\s+\*$')
+CRON_MONTH_MOMENT_PATTERN = re.compile(r'^(\d+)\s+(\d+)\s+(\d+)\s+\*\s+\*\s+\*$')
+CRON_DAY_MOMENT_PATTERN = re.compile(r'^(\d+)\s+(\d+)\s+\*\s+\*\s+\*\s+\*$')
 
 
 def is_wrapped_by(s: str, head: str = '', tail: str = '') -> bool:
@@ -84,34 +90,28 @@ def str_weekdaytime_to_cron(weekday: int, time_str: str) -> str:
 
 
 def is_cron_in_datetime_moment(expression: str) -> bool:
-    pattern = re.compile(r'^(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+\*\s+(\d+)$')
-    return bool(pattern.match(expression))
+    return bool(CRON_DATETIME_MOMENT_PATTERN.match(expression))
 
 
 def is_cron_in_week_moment(expression: str) -> bool:
-    pattern = re.compile(r'^(\d+)\s+(\d+)\s+\*\s+\*\s+(\d+)$')
-    return bool(pattern.match(expression))
+    return bool(CRON_WEEK_MOMENT_PATTERN.match(expression))
 
 
 def is_cron_in_year_moment(expression: str) -> bool:
-    pattern = re.compile(r'^(\d+)\s+(\d+)\s+(\d+)\s+(\d+)\s+\*\s+\*$')
-    return bool(pattern.match(expression))
+    return bool(CRON_YEAR_MOMENT_PATTERN.match(expression))
 
 
 def is_cron_in_month_moment(expression: str) -> bool:
-    pattern = re.compile(r'^(\d+)\s+(\d+)\s+(\d+)\s+\*\s+\*\s+\*$')
-    return bool(pattern.match(expression))
+    return bool(CRON_MONTH_MOMENT_PATTERN.match(expression))
 
 
 def is_cron_in_day_moment(expression: str) -> bool:
-    pattern = re.compile(r'^(\d+)\s+(\d+)\s+\*\s+\*\s+\*\s+\*$')
-    return bool(pattern.match(expression))
+    return bool(CRON_DAY_MOMENT_PATTERN.match(expression))
 
 
 def is_now_after_cron_date_time_moment(expression: str) -> bool:
     minutes, hours, day, month, _, year = expression.split(' ')
-    formatted_date_time = f"{year}-{month.zfill(2)}-{day.zfill(2)} {hours.zfill(2)}:{minutes.zfill(2)}"
-    start_date = datetime.strptime(formatted_date_time, '%Y-%m-%d %H:%M')
+    start_date = datetime(int(year), int(month), int(day), int(hours), int(minutes))
     return datetime.now() >= start_date
 
 
@@ -129,6 +129,113 @@ def is_now_after_cron_week_moment(cron_expression: str) -> bool:
     return False
 
 
+class CronSchedule:
+
+    KIND_DATETIME = 'datetime'
+    KIND_WEEK = 'week'
+
+    def __init__(self, expression: str, kind: str, moment: Optional[Union[datetime, Tuple[int, int, int]]] = None):
+        self._expression = expression
+        self._kind = kind
+        self._moment = moment
+        self._week_offset = self._get_week_offset(kind, moment)
+
+    @property
+    def expression(self) -> str:
+        return self._expression
+
+    @property
+    def kind(self) -> str:
+        return self._kind
+
+    @property
+    def moment(self) -> Optional[Union[datetime, Tuple[int, int, int]]]:
+        return self._moment
+
+    def is_datetime_moment(self) -> bool:
+        return self._kind == self.KIND_DATETIME
+
+    def is_week_moment(self) -> bool:
+        return self._kind == self.KIND_WEEK
+
+    def is_after(self, now: datetime) -> bool:
+        if self._moment is None:
+            return False
+
+        if self.is_datetime_moment():
+            return now >= self._moment
+
+        day_of_week, hours, minutes = self._moment
+
+        if day_of_week < 1 or day_of_week > 7:
+            return False
+
+        return (now.isoweekday(), now.hour, now.minute, now.second, now.microsecond) >= (day_of_week, hours, minutes, 0, 0)
+
+    def next_transition(self, now: datetime) -> Optional[datetime]:
+        if self._moment is None:
+            return None
+
+        if self.is_datetime_moment():
+            return self._moment if self._moment > now else None
+
+        if self._week_offset is None:
+            return None
+
+        week_start = (now - timedelta(days=now.isoweekday() - 1)).replace(hour=0, minute=0, second=0, microsecond=0)
+        moment = week_start + self._week_offset
+
+        # Week moments hold from their moment until the week rolls over on monday
+        return moment if now < moment else week_start + timedelta(days=7)
+
+    @staticmethod
+    def _get_week_offset(kind: str, moment: Optional[Union[datetime, Tuple[int, int, int]]]) -> Optional[timedelta]:
+        if kind != CronSchedule.KIND_WEEK or moment is None:
+            return None
+
+        day_of_week, hours, minutes = moment
+
+        # Out of range hours and minutes are tolerated by is_after, find the first instant it accepts
+        if minutes > 59:
+            hours, minutes = hours + 1, 0
+
+        if hours > 23:
+            day_of_week, hours, minutes = day_of_week + 1, 0, 0
+
+        if day_of_week < 1 or day_of_week > 7:
+            return None
+
+        return timedelta(days=day_of_week - 1, hours=hours, minutes=minutes)
+
+
+@lru_cache(maxsize=4096)
+def compile_cron_schedule(expression: Optional[str]) -> Optional[CronSchedule]:
+    if not expression:
+        return None
+
+    if is_cron_in_datetime_moment(expression):
+        minutes, hours, day, month, _, year = expression.split()
+
+        try:
+            moment = datetime(int(year), int(month), int(day), int(hours), int(minutes))
+        except ValueError:
+            moment = None
+
+        return CronSchedule(expression, CronSchedule.KIND_DATETIME, moment)
+
+    if is_cron_in_week_moment(expression):
+        minutes, hours, _, _, day_of_week = expression.split()
+
+        # Same validity rule as the cron descriptor, which only accepts a literal 7 for sunday
+        if day_of_week != '7' and int(day_of_week) > 6:
+            return None
+
+        return CronSchedule(expression, CronSchedule.KIND_WEEK, (int(day_of_week), int(hours), int(minutes)))
+
+    return None
+
+
+@lru_cache(maxsize=1024)
 def get_safe_cron_descriptor(expression: str, use_24hour_time_format=True, locale_code: Optional[str] = None) -> str:
     if is_cron_in_datetime_moment(expression):
         [minutes, hours, day, month, _, year] = expression.split(' ')